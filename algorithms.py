@@ -27,3 +27,130 @@ def generate_random_parameters(power_axes: np.array):
             parameters[0][k] = 0
 
     return parameters
+
+
+# candidate recipes in batches, for planners that score many candidates per call
+RANDOM = "random"
+LATIN_HYPERCUBE = "lhs"
+SOBOL = "sobol"
+
+SOBOL_BITS = 30
+# primitive polynomials (degree s, coefficients a) and initial direction numbers m of the Sobol dimensions
+# after the first, from the new-joe-kuo-6.21201 table of Joe and Kuo
+SOBOL_DIRECTIONS = [
+    (1, 0, [1]), (2, 1, [1, 3]), (3, 1, [1, 3, 1]), (3, 2, [1, 1, 1]), (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]), (5, 2, [1, 1, 5, 5, 17]), (5, 4, [1, 1, 5, 5, 5]), (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]), (5, 13, [1, 1, 1, 3, 11]), (5, 14, [1, 3, 5, 5, 31]),
+    (6, 1, [1, 3, 3, 9, 7, 49]), (6, 13, [1, 1, 1, 15, 21, 21]), (6, 16, [1, 3, 1, 13, 27, 49]),
+    (6, 19, [1, 1, 1, 15, 7, 5]), (6, 22, [1, 3, 1, 15, 13, 25]), (6, 25, [1, 1, 5, 5, 19, 61]),
+    (7, 1, [1, 3, 7, 11, 23, 15, 103]), (7, 4, [1, 3, 7, 13, 13, 15, 69]),
+]
+
+
+def parameter_limits(power_axes: np.array) -> tuple:
+    '''
+    Lower and upper limits (both included) of the setpoints of a recipe step
+
+    Parameters
+    ----------
+    power_axes : np.array
+        Mask of the active power axes
+
+    Returns
+    -------
+    tuple
+        (lower, upper) arrays of [power1, power2, power3, pressure], 0 on the inactive axes
+    '''
+    active = np.append(np.asarray(power_axes, dtype=bool)[:3], True)
+    lower = np.array([power_min, power_min, power_min, pressure_min])
+    upper = np.array([power1_max, power2_max, power3_max, pressure_max])
+    return np.where(active, lower, 0), np.where(active, upper, 0)
+
+
+def sample_candidates(n: int, power_axes: np.array, steps: int = 1, method: str = RANDOM,
+                      rng: np.random.Generator = None) -> np.ndarray:
+    '''
+    Draws n candidate recipes at once, within the limits of parameter_limits
+
+    Parameters
+    ----------
+    n : int
+        Number of candidate recipes
+    power_axes : np.array
+        Mask of the active power axes, the setpoints of the inactive axes are 0
+    steps : int, optional
+        Steps per recipe, by default 1
+    method : str, optional
+        Design of the candidates: RANDOM (independent uniform draws), LATIN_HYPERCUBE (every setpoint
+        range split in n strata that are each drawn once) or SOBOL (randomly shifted Sobol sequence,
+        n preferably a power of 2), by default RANDOM
+    rng : np.random.Generator, optional
+        Source of randomness, seed it for reproducible candidates, by default a new unseeded generator
+
+    Returns
+    -------
+    np.ndarray
+        Integer array of shape (n, steps, 5), rows [power1, power2, power3, pressure, recording_time]
+        like those of generate_random_parameters; candidates[k].tolist() is a recipe of Python ints
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    lower, upper = parameter_limits(power_axes)
+    varied = np.flatnonzero(upper > lower)
+    dimensions = steps * len(varied)
+
+    if method == RANDOM:
+        design = rng.random((n, dimensions))
+    elif method == LATIN_HYPERCUBE:
+        design = latin_hypercube(n, dimensions, rng)
+    elif method == SOBOL:
+        design = sobol(n, dimensions, rng)
+    else:
+        raise ValueError("Unknown candidate design: " + str(method))
+
+    # the unit design spread over the integer setpoints, each as likely as with random.randint
+    span = (upper - lower + 1)[varied]
+    values = lower[varied] + np.minimum(np.floor(design.reshape(n, steps, -1) * span), span - 1).astype(int)
+    candidates = np.zeros((n, steps, 5), dtype=int)
+    candidates[:, :, :4] = lower
+    candidates[:, :, varied] = values
+    candidates[:, :, 4] = recording_time
+    return candidates
+
+
+def latin_hypercube(n: int, dimensions: int, rng: np.random.Generator) -> np.ndarray:
+    '''n points in [0, 1)^dimensions with one point in each of the n strata of every dimension'''
+    strata = rng.permuted(np.tile(np.arange(n), (dimensions, 1)), axis=1).T
+    return (strata + rng.random((n, dimensions))) / n
+
+
+def sobol(n: int, dimensions: int, rng: np.random.Generator) -> np.ndarray:
+    '''First n points of the Sobol sequence in [0, 1)^dimensions, shifted by a random digital shift'''
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError("Sobol candidates are limited to " + str(len(SOBOL_DIRECTIONS) + 1) + " setpoints")
+    if n > 2 ** SOBOL_BITS:
+        raise ValueError("Too many Sobol candidates: " + str(n))
+    directions = sobol_directions(dimensions)
+    index = np.arange(n, dtype=np.int64)
+    gray = index ^ (index >> 1)
+    points = np.zeros((n, dimensions), dtype=np.int64)
+    for bit in range(max(int(n - 1).bit_length(), 1)):
+        points ^= ((gray >> bit) & 1)[:, None] * directions[:, bit]
+    points ^= rng.integers(0, 2 ** SOBOL_BITS, dimensions)
+    return points / 2 ** SOBOL_BITS
+
+
+def sobol_directions(dimensions: int) -> np.ndarray:
+    '''Direction integers of shape (dimensions, SOBOL_BITS)'''
+    directions = np.zeros((dimensions, SOBOL_BITS), dtype=np.int64)
+    # first dimension: van der Corput sequence in base 2
+    directions[0] = [1 << (SOBOL_BITS - 1 - bit) for bit in range(SOBOL_BITS)]
+    for dimension, (degree, a, m) in enumerate(SOBOL_DIRECTIONS[:dimensions - 1], start=1):
+        v = [m[bit] << (SOBOL_BITS - 1 - bit) for bit in range(degree)]
+        for bit in range(degree, SOBOL_BITS):
+            value = v[bit - degree] ^ (v[bit - degree] >> degree)
+            for k in range(1, degree):
+                if (a >> (degree - 1 - k)) & 1:
+                    value ^= v[bit - k]
+            v.append(value)
+        directions[dimension] = v
+    return directions
@@ -1,17 +1,22 @@
+import asyncio
 import time
-import os
-from pywinauto.application import WindowSpecification
 import campaign_parameters as cp
-import control_eklipse as ce
 import system_parameters as sp
 import numpy as np
 import validate as vd
 import workflow_control as wc
 import experiment_series as es
 import algorithms
+import setpoints
+import scheduler
+import waiting
+import orchestration
 
-path = r"C:\\Program Files (x86)\\KJLC\\eKLipse"
-os.chdir(path)
+# the eKLipse application through pywinauto, or control_eklipse on the simulated GUI of eklipse_simulator
+if cp.EKLIPSE_BACKEND == "simulator":
+    import eklipse_simulator as ce
+else:
+    import control_eklipse as ce
 
 class BeaSupervisor:
     def __init__(self, power_pad: bool, power_axes: np.array) -> None:
@@ -24,18 +29,17 @@ class BeaSupervisor:
         power_axes : np.array
             Array specifying active power axes
         '''
-        self.eklipse_window: WindowSpecification
+        self.eklipse_window = None  # application window, set by start_or_connect_to_eklipse
         self.power_pad: bool = power_pad
         self.power_axes: np.array = power_axes
+        self.monitor = None  # recipe monitor of the eKLipse window, see recipe_monitor()
 
     def start_or_connect_to_eklipse(self):
         '''Start application or connect to running instance.
         '''
-        path = r"C:\\Program Files (x86)\\KJLC\\eKLipse"
-        os.chdir(path)
         try:
             self.eklipse_window = ce.connect_to_instance_of_eklipse()
-            self.eklipse_window.child_window(auto_id="Automation").click()
+            ce.go_to_automation_tab(self.eklipse_window)
             print("application is already running, connected!")
         except Exception as e:
             print("application is not running, starting!")
@@ -60,6 +64,20 @@ class BeaSupervisor:
         stack_light_status = ce.check_stack_light_status(self.eklipse_window)
         return stack_light_status == target_status
 
+    def recipe_monitor(self):
+        '''Recipe monitor of the eKLipse window, printing every change of the recipe state
+
+        Returns
+        -------
+        RecipeMonitor
+            Monitor of the current eKLipse window
+        '''
+        monitor = ce.recipe_monitor(self.eklipse_window)
+        if monitor is not self.monitor:
+            monitor.add_listener(print_recipe_state)
+            self.monitor = monitor
+        return monitor
+
     def run_recipe(self, recipe_name: str, wait_for_step=99) -> bool:
         '''activating one of the recipe buttons to the right hand side, and then waiting for the recipe to complete
 
@@ -76,13 +94,15 @@ class BeaSupervisor:
             Recipe ran
         '''
         # for speed, this function assumes that stacklights have been checked before calling it!
-        ce.go_to_automation_tab(self.eklipse_window)
         print("Requesting to run recipe " + recipe_name + "...")
-        self.eklipse_window.child_window(auto_id=recipe_name).click()
+        ce.start_recipe(self.eklipse_window, recipe_name)
         # recipe_stage = "not running yet"
-        time.sleep(5)
-        is_blue = self.confirm_stack_light_status(
-            self.eklipse_window, sp.STACK_LIGHT_GREEN_STEADY_BLUE)
+        # wait for the stack light to turn steady blue (sampled every cp.RECIPE_MONITOR_INTERVAL seconds)
+        start = time.monotonic()
+        state = self.recipe_monitor().wait_for(
+            lambda state: state.stack_light == sp.STACK_LIGHT_GREEN_STEADY_BLUE, cp.RECIPE_START_TIMEOUT)
+        is_blue = state is not None
+        waiting.histogram("start recipe").record(time.monotonic() - start, timed_out=not is_blue)
         if (is_blue):
             # recipe_stage = "running"
             print(recipe_name + " running...")
@@ -90,15 +110,14 @@ class BeaSupervisor:
             print(recipe_name + " did not start, checking stack light...")
             return False
 
-        finished = self.wait_for_recipe(
-            self.eklipse_window, recipe_name, wait_for_step)
+        finished = self.wait_for_recipe(recipe_name, wait_for_step)
         if finished:
             return True
 
         return False
 
-    def wait_for_recipe(self, recipe_name: str, wait_for_step=99) -> bool:
-        '''Waiting for recipe completion by checking the stack light status
+    def wait_for_recipe(self, recipe_name: str, wait_for_step=99, timeout: float = cp.RECIPE_WAIT_TIMEOUT) -> bool:
+        '''Waiting for recipe completion, woken by the recipe monitor when the recipe state changes
 
         Parameters
         ----------
@@ -106,6 +125,8 @@ class BeaSupervisor:
             Current running recipe
         wait_for_step : int, optional
             Step in recipe, by default 99
+        timeout : float, optional
+            Maximum time to wait in seconds, by default cp.RECIPE_WAIT_TIMEOUT
 
         Returns
         -------
@@ -113,32 +134,29 @@ class BeaSupervisor:
             If the recipe finished
         '''
         # waits for the recipe to complete, or for it to reach a specific step (wait_for_step)
-        iterations = cp.WAIT_RECIPE_ITERATIONS
-        wait_time = cp.WAIT_RECIPE_TIME
-        for i in range(iterations):
-            status = ce.check_stack_light_status(self.eklipse_window)
-            if (status == sp.STACK_LIGHT_GREEN_STEADY_BLUE):
-                step = ce.check_running_recipe_step(self.eklipse_window)
-                if step >= wait_for_step:
-                    print("recipe has reached or exceeded desired step (requested:" +
-                          str(wait_for_step) + ", actual: " + str(step) + ")")
-                    return True
-                # print(recipe_name + " still running...checking again in " + str(wait_time) + " seconds...")
-                print("...")
-                time.sleep(wait_time)
-            elif (status == sp.STACK_LIGHT_GREEN):
-                print(recipe_name + " completed")
-                return True
-            elif (status == sp.STACK_LIGHT_GREEN_FLASH_BLUE):
-                print(recipe_name + " has been paused")
-                # perform some action such as giving the use option to wait or not
-                return False
-            else:
-                print(recipe_name + " did not complete - check system status")
-                return False
-        print(recipe_name + " did not finish within expected timeframe of " +
-              str(iterations*wait_time) + " seconds. Check system status")
-        return False
+        start = time.monotonic()
+        state = self.recipe_monitor().wait_for(
+            lambda state: state.stack_light != sp.STACK_LIGHT_GREEN_STEADY_BLUE
+            or (state.step is not None and state.step >= wait_for_step), timeout)
+        waiting.histogram("wait for recipe").record(time.monotonic() - start, timed_out=state is None)
+        if state is None:
+            print(recipe_name + " did not finish within expected timeframe of " +
+                  str(timeout) + " seconds. Check system status")
+            return False
+        if (state.stack_light == sp.STACK_LIGHT_GREEN_STEADY_BLUE):
+            print("recipe has reached or exceeded desired step (requested:" +
+                  str(wait_for_step) + ", actual: " + str(state.step) + ")")
+            return True
+        elif (state.stack_light == sp.STACK_LIGHT_GREEN):
+            print(recipe_name + " completed")
+            return True
+        elif (state.stack_light == sp.STACK_LIGHT_GREEN_FLASH_BLUE):
+            print(recipe_name + " has been paused")
+            # perform some action such as giving the use option to wait or not
+            return False
+        else:
+            print(recipe_name + " did not complete - check system status")
+            return False
 
     def begin_sputter_process(self) -> bool:
         '''Begin sputtering
@@ -150,15 +168,14 @@ class BeaSupervisor:
         '''
         # check system ready
         print("Preparing to sputter - checking system status....")
-        is_stacklight_ok = self.confirm_stack_light_status(
-            self.eklipse_window, sp.STACK_LIGHT_GREEN)
+        is_stacklight_ok = self.confirm_stack_light_status(sp.STACK_LIGHT_GREEN)
         is_system_ready = ce.check_if_system_ready(self.eklipse_window)
 
         if (is_stacklight_ok and is_system_ready):
 
             # toggle gas injection valve:
             ce.set_parameter(self.eklipse_window, 1, sp.Check_GasInjValveOpen)
-            time.sleep(cp.GAS_INJ_TOGGLE_TIME)
+            ce.sleep(cp.GAS_INJ_TOGGLE_TIME)
             ce.set_parameter(self.eklipse_window, 0, sp.Check_GasInjValveOpen)
 
             process_permission = ce.set_parameter(
@@ -167,29 +184,27 @@ class BeaSupervisor:
                 print("process permission not granted - check system")
                 return False
 
-            started_OK = self.run_recipe(
-                self.eklipse_window, sp.RECIPE_PREPARE)
+            started_OK = self.run_recipe(sp.RECIPE_PREPARE)
 
             if not started_OK:
                 print("Could not prepare system for sputtering")
-                self.end_process(self.eklipse_window)
+                self.end_process()
                 return False
 
             # ignite targets (uses a pressure of 25 mTorr based on the defined Eklipse recipes, which also apply the ramp rates and pulse frequencies)
             for supply_number in cp.POWER_SUPPLIES[self.power_axes]:
                 print("Igniting target connected to power supply " +
                       str(supply_number))
-                ignited_OK = self.run_recipe(
-                    self.eklipse_window, sp.PS_IGNITION_RECIPES[supply_number-1])
+                ignited_OK = self.run_recipe(sp.PS_IGNITION_RECIPES[supply_number-1])
                 if not ignited_OK:
                     print(
                         "Could not ignite target connected to Power Supply " + str(supply_number))
-                    self.end_process(self.eklipse_window)
+                    self.end_process()
                     return False
 
             # reduce pressure to typical level for presputtering
             ce.set_pressure(self.eklipse_window, cp.PRESPUTT_PARAMS[3])
-            time.sleep(5)
+            ce.sleep(5)
             print("All specified targets ignited, ready to continue")
 
             return True
@@ -213,14 +228,15 @@ class BeaSupervisor:
             presputtering completed
         '''
         print("Pre-sputtering for " + str(ps_time) + " s")
-        time.sleep(ps_time)
+        ce.sleep(ps_time)
         # check if target voltages are within an acceptable range to the expected values.
+        voltage_signals = [sp.PS_READ_VOLTAGE_SIGNALS[cp.POWER_SUPPLIES[k]-1]
+                           for k in range(3) if self.power_axes[k]]
+        voltages = ce.read_parameters(self.eklipse_window, voltage_signals, max_age=0)
         for k in range(3):
             if self.power_axes[k]:
                 power_supply_index = cp.POWER_SUPPLIES[k]-1
-                ce.go_to_automation_tab(self.eklipse_window)
-                voltage = float(ce.read_parameter(
-                    self.eklipse_window, sp.PS_READ_VOLTAGE_SIGNALS[power_supply_index]))
+                voltage = float(voltages[sp.PS_READ_VOLTAGE_SIGNALS[power_supply_index]])
                 print("Voltage on Power Supply " +
                       str(cp.POWER_SUPPLIES[k]) + " = " + str(voltage) + " V,")
                 error_prc = 100 * \
@@ -241,13 +257,13 @@ class BeaSupervisor:
         SL = ce.check_stack_light_status(self.eklipse_window)
         print(SL)
         if SL == sp.STACK_LIGHT_GREEN:
-            ended = self.run_recipe(self.eklipse_window, sp.RECIPE_END_PROCESS)
+            ended = self.run_recipe(sp.RECIPE_END_PROCESS)
             if ended:
                 print("Process ended successfully")
                 return
             else:
                 print("Could not end process - check system")
-        elif SL == sp.STACK_LIGHT_GREEN_STEADY_BLUE or sp.STACK_LIGHT_GREEN_FLASH_BLUE:
+        elif SL in (sp.STACK_LIGHT_GREEN_STEADY_BLUE, sp.STACK_LIGHT_GREEN_FLASH_BLUE):
             paused = SL == sp.STACK_LIGHT_GREEN_FLASH_BLUE
             running_recipe = ce.check_running_recipe_name(self.eklipse_window)
             recipe_step = ce.check_running_recipe_step(self.eklipse_window)
@@ -258,8 +274,7 @@ class BeaSupervisor:
                         ce.resume_paused_recipe(self.eklipse_window)
                     ce.skip_recipe_step(self.eklipse_window)
                     print("Process ending...")
-                    self.wait_for_recipe(
-                        self.eklipse_window, sp.RECIPE_END_PROCESS)
+                    self.wait_for_recipe(sp.RECIPE_END_PROCESS)
                     return
                 else:
                     print("cannot end process at current stage - check system")
@@ -270,8 +285,7 @@ class BeaSupervisor:
                         ce.resume_paused_recipe(self.eklipse_window)
                     ce.skip_recipe_step(self.eklipse_window)
                     print("Process ending...")
-                    self.wait_for_recipe(
-                        self.eklipse_window, sp.RECIPE_END_PROCESS)
+                    self.wait_for_recipe(sp.RECIPE_END_PROCESS)
                     return
                 else:
                     print("cannot end process at current stage - check system")
@@ -298,29 +312,7 @@ class BeaSupervisor:
         int
             Ramp time in seconds
         '''
-        ramp_time = 0
-        power_ramp_times = [0, 0, 0]
-
-        if self.power_pad:
-            pad = cp.POWER_PADDING
-        else:
-            pad = 0
-
-        for n in range(3):
-            if (self.power_axes[n]):
-                diff = abs(old_parameters[n]-(new_parameters[n]+pad))
-                ramp = float(diff)/float(cp.RAMP_RATES[n])
-                power_ramp_times[n] = ramp
-        power_ramp_time = max(power_ramp_times)
-
-        pressure_ramp_time = 0
-        if (new_parameters[3] < old_parameters[3]):
-            pressure_ramp_time = 5
-            if (new_parameters[3] < (old_parameters[3]-15)):
-                pressure_ramp_time = 10
-
-        ramp_time_raw = max(power_ramp_time, pressure_ramp_time)
-        ramp_time = min(ramp_time_raw, 10)
+        ramp_time = setpoints.ramp_time(old_parameters, new_parameters, self.power_axes, self.power_pad)
         print("ramp time: " + str(ramp_time) + "s")
         return ramp_time
 
@@ -379,55 +371,67 @@ class BeaSupervisor:
             Setpoints successfully applied
         '''
 
-        set_power_result = True
-        set_pressure_result = True
         update_params = [True, True, True, True]
         for n in range(4):
             if old_parameters[n] == new_parameters[n]:
                 update_params[n] = False
         print("parameters to be updated: " + str(update_params))
 
-        # Apply pressure setting
+        # All changed setpoints are written back to back in one transaction; if one cannot be applied,
+        # the powers written so far are set back to zero
+        transaction = ce.setpoint_transaction(self.eklipse_window)
+
+        # Pressure setting (valve position and pressure, not rolled back)
         if update_params[3]:
-            set_pressure_result = ce.set_pressure(
-                self.eklipse_window, new_parameters[3])
-            if not set_pressure_result:
-                print("ramp_to_process_point(): Could not set pressure")
+            pressure_setpoints = setpoints.pressure_setpoints(new_parameters[3])
+            if pressure_setpoints is None:
+                print("ramp_to_process_point(): Could not set pressure, out of range")
                 return False
+            for signal, value in pressure_setpoints:
+                transaction.stage(signal, value, rollback_value=None)
 
-        ramp_time = self.calc_ramp_time(
-            self.power_axes, old_parameters, new_parameters, True)
-        # Apply power settings
-        # first set power higher than target value (WILL NEED TO EVALUATE IF THIS IS NEEDED AND HOW MUCH OF A DIFFERENCE)
-        if self.power_pad:
+        ramp_time = self.calc_ramp_time(old_parameters, new_parameters)
+
+        # Power settings: first set power higher than target value if padding, wait once for the combined
+        # ramp, then set at target value (WILL NEED TO EVALUATE IF THIS IS NEEDED AND HOW MUCH OF A DIFFERENCE)
+        stages = [cp.POWER_PADDING, 0] if self.power_pad else [0]
+        for pad in stages:
             for j in range(3):
                 if self.power_axes[j] and update_params[j]:
-                    set_power_result = ce.set_power(
-                        self.eklipse_window, new_parameters[j]+cp.POWER_PADDING, j+1)
-                    if not set_power_result:
-                        print(
-                            "ramp_to_process_point(): Power settings could not be applied")
+                    setpoint = setpoints.power_setpoint(new_parameters[j]+pad, j+1)
+                    if setpoint is None:
+                        print("ramp_to_process_point(): Power setting out of range")
+                        transaction.rollback()
                         return False
-            if set_power_result:
-                # time needed to ramp slowest target to requested value
-                time.sleep(ramp_time)
-
-        # then set at target value
-        for j in range(3):
-            if self.power_axes[j] and update_params[j]:
-                set_power_result = ce.set_power(
-                    self.eklipse_window, new_parameters[j], j+1)
-                if not set_power_result:
-                    print(
-                        "ramp_to_process_point(): Power settings could not be applied")
-                    return False
-
-        if not self.power_pad:
-            time.sleep(ramp_time)  # i.e. if we are not doing the power padding step, we need to wait here for the targets to ramp to the new value. If we were doing power padding, we have already waited for most of the change, and what remains is not much
+                    transaction.stage(*setpoint)
+            if not transaction.commit():
+                print("ramp_to_process_point(): Setpoints could not be applied")
+                return False
+            if pad > 0 or not self.power_pad:
+                # time needed to ramp slowest target to requested value. After padding, what remains of the
+                # change after setting the target values is not much
+                ce.sleep(ramp_time)
 
         return True
 
 
+def print_recipe_state(old_state, new_state):
+    '''Prints a change of the recipe state, called by the recipe monitor
+
+    Parameters
+    ----------
+    old_state : RecipeState
+        Previous state, None for the first sample
+    new_state : RecipeState
+        New state
+    '''
+    if new_state.recipe_name is None:
+        print("    Recipe monitor: stack light " + str(new_state.stack_light))
+    else:
+        print("    Recipe monitor: stack light " + str(new_state.stack_light) + ", " +
+              str(new_state.recipe_name) + " at step " + str(new_state.step))
+
+
 def open_or_close_all_shutters(power_axes: list[bool], operation: str):
     '''Open or close all shutters
 
@@ -443,7 +447,7 @@ def open_or_close_all_shutters(power_axes: list[bool], operation: str):
             ce.operate_target_shutter(BEA.eklipse_window, operation, j+1)
 
 
-def execute_step_in_recipe(BEA: BeaSupervisor, series: es.ExperimentSeries, step_number: int, step_setpoints: list[int], old_setpoints: list[list[int]], metadata: dict):
+def execute_step_in_recipe(BEA: BeaSupervisor, series: es.ExperimentSeries, step_number: int, step_setpoints: list[int], old_setpoints: list[list[int]], metadata: dict, recordings=None, monitor=None) -> str:
     '''Execute one step in a recipe
 
     Parameters
@@ -454,6 +458,15 @@ def execute_step_in_recipe(BEA: BeaSupervisor, series: es.ExperimentSeries, step
     step_setpoints : list[int]
     old_setpoints : list[list[int]]
     metadata : dict
+    recordings : RecordingIndex, optional
+        Index of the RecordingData folder, used to find the CSV file of this step
+    monitor : streaming.SteadinessMonitor, optional
+        Monitor used to end the dwell as soon as the readings are steady
+
+    Returns
+    -------
+    str
+        Path of the recorded CSV file (None if not found or the step failed)
     '''
     print("Run ID:" + " TBC " + ", step: " + str(step_number))
     # Generate and add step metadata
@@ -473,7 +486,8 @@ def execute_step_in_recipe(BEA: BeaSupervisor, series: es.ExperimentSeries, step
         open_or_close_all_shutters(BEA.power_axes, operation="open")
 
     # Dwell, record data
-    ce.record_data(BEA.eklipse_window, step_setpoints[4])
+    recording = ce.record_data(
+        BEA.eklipse_window, step_setpoints[4], recordings, monitor)
 
     # Check still running (i.e. that the main recipe has not timed out)
     step = ce.check_running_recipe_step(BEA.eklipse_window)
@@ -488,9 +502,11 @@ def execute_step_in_recipe(BEA: BeaSupervisor, series: es.ExperimentSeries, step
     if series.samples:
         open_or_close_all_shutters(BEA.power_axes, operation="close")
 
+    return recording
+
 
 def perform_series(do_presputter: bool, samples: bool, power_axes: np.array,
-                   max_runs: int, power_pad: bool, metadata: dict, algorithm):
+                   max_runs: int, power_pad: bool, metadata: dict, algorithm, pipelined: bool = cp.PIPELINED_SERIES):
     '''Run an entire series
 
     Parameters
@@ -507,22 +523,65 @@ def perform_series(do_presputter: bool, samples: bool, power_axes: np.array,
     metadata : dict
     algorithm : function
         What function to be used to generate new parameter values
+    pipelined : bool, optional
+        Validate steps and plan the next recipe while the series goes on, by default cp.PIPELINED_SERIES
     '''
+    asyncio.run(perform_series_async(do_presputter, samples, power_axes, max_runs, power_pad, metadata, algorithm,
+                                     max_pending=cp.PIPELINE_MAX_PENDING if pipelined else 0))
+
+
+async def perform_series_async(do_presputter: bool, samples: bool, power_axes: np.array,
+                               max_runs: int, power_pad: bool, metadata: dict, algorithm,
+                               max_pending: int = cp.PIPELINE_MAX_PENDING):
+    '''Run an entire series, with all eKLipse control on one thread and validation and planning
+    overlapping it (see orchestration.py)
+
+    Parameters
+    ----------
+    do_presputter, samples, power_axes, max_runs, power_pad, metadata, algorithm
+        See perform_series
+    max_pending : int, optional
+        Steps that may wait for validation while the series goes on, 0 for a sequential series,
+        by default cp.PIPELINE_MAX_PENDING
+    '''
+    pipeline = orchestration.SeriesPipeline(ce.init_ui_thread, max_pending=max_pending)
+    try:
+        await run_series(pipeline, do_presputter, samples, power_axes, max_runs, power_pad, metadata, algorithm)
+    finally:
+        await pipeline.close()
+        if hasattr(algorithm, "close"):
+            # e.g. the planner processes of a planning_service.PlanningService, once no step is observed anymore
+            algorithm.close()
+    # time spent per stage of the series
+    print("Series stages:")
+    pipeline.report()
+    if hasattr(algorithm, "report"):
+        # e.g. recipes planned ahead by a planning_service.PlanningService
+        algorithm.report()
+
+
+async def run_series(pipeline: orchestration.SeriesPipeline, do_presputter: bool, samples: bool,
+                     power_axes: np.array, max_runs: int, power_pad: bool, metadata: dict, algorithm):
+    '''Runs of a series, see perform_series_async'''
 
     BEA = BeaSupervisor(power_pad, power_axes)
+    await pipeline.ui(BEA.start_or_connect_to_eklipse)
 
     series_ID = wc.get_next_series_id()
-    base_pressure = ce.read_parameter(BEA.eklipse_window, sp.BASE_PRESSURE)
+    base_pressure = await pipeline.ui(ce.read_parameter, BEA.eklipse_window, sp.BASE_PRESSURE)
 
     series = es.ExperimentSeries(
-        BEA, samples, base_pressure, do_presputter)
+        samples, base_pressure, do_presputter, algorithm=getattr(algorithm, "name", "Random"), series_ID=series_ID)
 
     presputter_setpoints = cp.PRESPUTT_PARAMS + [cp.PRESPUTT_TIME]
     recipe = [presputter_setpoints]
     series.set_recipe(recipe)
 
-    validator = vd.Validator()
-    ce.setup_data_recording(BEA.eklipse_window, series.samples)
+    validator = vd.Validator(path_CSV=ce.RECORDING_PATH)
+    if hasattr(algorithm, "observe"):
+        # planners learning from the validated steps (e.g. planner.GaussianProcessPlanner)
+        validator.add_listener(algorithm.observe)
+    await pipeline.ui(ce.setup_data_recording, BEA.eklipse_window, series.samples)
 
     series_metadata = series.create_series_metadata()
     metadata.update(series_metadata)
@@ -533,23 +592,23 @@ def perform_series(do_presputter: bool, samples: bool, power_axes: np.array,
 
         if series.samples:
             # substrate holder removed, vent LL, ask for sample number, pump LL, reload
-            series.substrate_ID = BEA.exchange(new_substrate=True)
+            series.substrate_ID = await pipeline.ui(BEA.exchange, new_substrate=True)
             series.set_source_ignited(False)
             if series.substrate_ID == "FAIL":
                 return
 
         if not series.sources_ignited:
-            ready = BEA.begin_sputter_process()
+            ready = await pipeline.ui(BEA.begin_sputter_process)
             if ready:
                 series.set_source_ignited(True)
             else:
                 print("Could not start series, check system status")
-                BEA.end_process()
+                await pipeline.ui(BEA.end_process)
                 return
 
         # note that without samples, the target shutters will be open, otherwise they will be closed, and the sample at max height with substrate shutter open
         if series.do_presputter and not series.presputtered:
-            presputter_result = BEA.presputter(cp.PRESPUTT_TIME)
+            presputter_result = await pipeline.ui(BEA.presputter, cp.PRESPUTT_TIME)
             series.set_presputtered(presputter_result)
             if series.presputtered:
                 print("Presputtering completed with voltages reaching expected values")
@@ -570,64 +629,116 @@ def perform_series(do_presputter: bool, samples: bool, power_axes: np.array,
         metadata["Pre-sputter description"] = presputter_info
 
         if series.samples:
-            ready = BEA.run_recipe(sp.RECIPE_SPUTTER_SAMPLE,
-                                   wait_for_step=sp.MAIN_RECIPE_DWELL_STEP_SAMPLE)
+            ready = await pipeline.ui(BEA.run_recipe, sp.RECIPE_SPUTTER_SAMPLE,
+                                      wait_for_step=sp.MAIN_RECIPE_DWELL_STEP_SAMPLE)
         else:
             ready = True
             if i == 0:
-                ready = BEA.run_recipe(sp.RECIPE_SPUTTER_NO_SAMPLE,
-                                       wait_for_step=sp.MAIN_RECIPE_DWELL_STEP_NO_SAMPLE)
+                ready = await pipeline.ui(BEA.run_recipe, sp.RECIPE_SPUTTER_NO_SAMPLE,
+                                          wait_for_step=sp.MAIN_RECIPE_DWELL_STEP_NO_SAMPLE)
 
         if not ready:
             print("Could not start series, check system status")
-            BEA.end_process()
+            await pipeline.ui(BEA.end_process)
             return
 
         if series.get_new_recipe:
             # use try/except when getting new parameters, if the function does not work use default cp.PRESPUTT_PARAMS
-            series.set_recipe(algorithm(power_axes))
+            # planned during the previous run (or computed now for the first run)
+            series.set_recipe(await pipeline.next_recipe(algorithm, power_axes))
+            if cp.REORDER_RECIPE_STEPS and not series.samples:
+                # steps without samples are independent, with samples they deposit layers in the given order
+                series.set_recipe(order_recipe(series.get_recipe(), presputter_setpoints, BEA))
             # !!!! should be function to get next set of new_parameters, returns a list of lists, with each sub-list having format power, power, power, pressure, dwell time
             print("The following parameters will be applied:")
             # could be nice to add names to the columns/rows of the recipe
             print(series.get_recipe())
 
-        series.update_run_metadata(
-            metadata, series.substrate_ID)
+        series.update_run_metadata(metadata)
 
         # now iterate through the steps of each recipe (rows in dataframe)
         old_setpoints = presputter_setpoints
         step_number = 1
 
         for step_setpoints in series.recipe:
-            execute_step_in_recipe(
-                BEA, series, step_number, step_setpoints, old_setpoints, metadata)
-            data_ok = validator.validate(metadata)
+            # with samples, the dwell time sets the deposition and must not be cut short
+            monitor = None
+            if cp.STOP_RECORDING_WHEN_STEADY and not series.samples:
+                monitor = validator.steadiness_monitor()
+            recording = await pipeline.ui(
+                execute_step_in_recipe, BEA, series, step_number, step_setpoints, old_setpoints, metadata, validator.recordings, monitor)
+            # validated while the next step ramps and dwells; the metadata is copied as the series goes on changing it
             # might be that we want differnt validators for different "algorithms"
-
-            # based on our experience, don't need to have the "did not stabilise, repeat" category. Just save and move on
-            if data_ok:
-                print("***Data saved***")
-            else:
-                print("Recording failed (e.g. readings did not settle) - Data not saved")
-            # call data validator to check and save data, check if run should be repeated or not.
-            # output from Emirs function - True if steady state was reached (or "unstable" process detected). False if the settings should be repeated
+            await pipeline.validate(validator.validate, dict(metadata), recording, report=report_validation)
 
             step_number += 1
             old_setpoints = step_setpoints
         series.get_new_recipe = True
+        if i + 1 < max_runs:
+            # plan the next recipe while the next run is prepared
+            pipeline.plan_ahead(algorithm, power_axes)
         # goes to next run in the series
 
+    # wait for the validations and queued results to be written to the database
+    await pipeline.drain()
+    await pipeline.work(validator.close)
+    # time spent waiting for eKLipse, per operation
+    print("Control path waits:")
+    waiting.report()
+
     if samples:
         print(
             "Series ended after reaching maximum allowed number of runs (or recipe timeout)")
-        BEA.exchange()
+        await pipeline.ui(BEA.exchange, new_substrate=False)
         return  # process should already have ended
 
     print("Series ended after reaching maximum allowed number of runs (or recipe timeout); ending process...")
-    BEA.end_process()
+    await pipeline.ui(BEA.end_process)
     return
 
 
+def order_recipe(recipe: list, start: list, BEA: BeaSupervisor) -> list:
+    '''Orders the steps of a recipe for the least ramp time from the start setpoints (see scheduler.py)
+
+    Parameters
+    ----------
+    recipe : list
+        Steps returned by the algorithm
+    start : list
+        Setpoints before the first step
+    BEA : BeaSupervisor
+        Supervisor with the active power axes and power padding
+
+    Returns
+    -------
+    list
+        Reordered recipe
+    '''
+    ordered = scheduler.order_steps(recipe, start, BEA.power_axes, BEA.power_pad)
+    if ordered != recipe:
+        saved = scheduler.total_ramp_time(recipe, start, BEA.power_axes, BEA.power_pad) - \
+            scheduler.total_ramp_time(ordered, start, BEA.power_axes, BEA.power_pad)
+        print("Recipe steps reordered, " + str(round(saved, 1)) + " s less ramp time")
+    return ordered
+
+
+def report_validation(data_ok: bool):
+    '''Prints the outcome of a step validation
+
+    Parameters
+    ----------
+    data_ok : bool
+        Result of Validator.validate, None if the validation failed
+    '''
+    # based on our experience, don't need to have the "did not stabilise, repeat" category. Just save and move on
+    if data_ok:
+        print("***Data saved***")
+    else:
+        print("Recording failed (e.g. readings did not settle) - Data not saved")
+    # call data validator to check and save data, check if run should be repeated or not.
+    # output from Emirs function - True if steady state was reached (or "unstable" process detected). False if the settings should be repeated
+
+
 if __name__ == "__main__":
     perform_series(do_presputter=True, samples=False, power_pad=True, power_axes=np.array([False, True, True]), max_runs=100, metadata=cp.CAMPAIGN_METADATA,
                    algorithm=algorithms.generate_random_parameters)
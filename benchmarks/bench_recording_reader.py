@@ -0,0 +1,80 @@
+'''
+Benchmark of recording ingestion: the original pd.read_csv + rename + Validator.process_df path against
+recording_reader.read_recording (float64 and float32), on large synthetic eKLipse recordings.
+Reports parse time and peak memory (tracemalloc) of each path.
+
+Run from the repository root:  python -m benchmarks.bench_recording_reader
+'''
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import system_parameters as sp
+import recording_reader as rr
+import validate as vd
+
+
+def synthetic_recording(file_path: str, rows: int, seed: int = 0):
+    '''Writes a recording with all signals of the current setup, sampled at RECORDING_INTERVAL_NO_SAMPLE'''
+    rng = np.random.default_rng(seed)
+    signals = {}
+    for signal, column in rr.RECORDING_COLUMNS.items():
+        if 'QCM' in column:
+            signals[signal] = 5e6 + rng.normal(0, 1, rows)
+        else:
+            signals[signal] = 100 + rng.normal(0, 5, rows)
+    rr.write_recording(file_path, pd.Timestamp("2024-03-14 10:15:32.100"),
+                       np.arange(rows) * cp.RECORDING_INTERVAL_NO_SAMPLE, signals,
+                       interval=cp.RECORDING_INTERVAL_NO_SAMPLE)
+
+
+def read_legacy(file_path: str):
+    '''Original ingestion path of Validator.getLastExperiment'''
+    df = pd.read_csv(file_path, skiprows=[0, 1])
+    df.rename(columns=cp.RECORDING_NAMES, inplace=True)
+    df.rename(columns=sp.BASIC_PARAMETERS_TS, inplace=True)
+    return vd.Validator.process_df(None, df)
+
+
+def measure(function, *args):
+    '''Returns (result, seconds, peak MB)'''
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def run(sizes: list[int]):
+    print("parser engine: " + rr.ENGINE)
+    print("{:>9} {:>16} {:>10} {:>10} {:>10} {:>8}".format(
+        "rows", "path", "time [s]", "peak [MB]", "frame [MB]", "same"))
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in sizes:
+            file_path = os.path.join(folder, "recording_" + str(rows) + ".csv")
+            synthetic_recording(file_path, rows)
+
+            (_, legacy_df), seconds, peak = measure(read_legacy, file_path)
+            print("{:>9} {:>16} {:>10.3f} {:>10.1f} {:>10.1f} {:>8}".format(
+                rows, "legacy", seconds, peak, legacy_df.memory_usage(deep=True).sum() / 1e6, ""))
+
+            for dtype in [np.float64, np.float32]:
+                (_, df), seconds, peak = measure(rr.read_recording, file_path, dtype)
+                same = str(df.equals(legacy_df)) if dtype == np.float64 else "n/a"
+                print("{:>9} {:>16} {:>10.3f} {:>10.1f} {:>10.1f} {:>8}".format(
+                    rows, "reader " + np.dtype(dtype).name, seconds, peak,
+                    df.memory_usage(deep=True).sum() / 1e6, same))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,95 @@
+'''
+Benchmark of whole series on the eKLipse simulator (eklipse_simulator.py): perform_series with every stage
+of a step run in turn against the pipelined series of orchestration.py, on the same random recipes.
+Reports the real time per step next to the simulated process time (ramps, dwells and GUI waits) per step; with a
+finite --speed, the pipelined series should approach the process time divided by the speed. The default
+one-step recipes are those of algorithms.generate_random_parameters; there the last step of a run is
+validated while the next run starts, with --steps 4 also while the following steps of the run go on.
+Results are stored in an in-memory collection, no database is needed.
+
+Run from the repository root:  python -m benchmarks.bench_series --speed 50
+'''
+
+import argparse
+import asyncio
+import importlib
+import random
+import tempfile
+import time
+import types
+import numpy as np
+import campaign_parameters as cp
+import database_client as dc
+import workflow_control as wc
+import algorithms
+
+
+class MemoryCollection:
+    '''Stands in for the MongoDB collection of the Validator'''
+
+    def __init__(self):
+        self.docs = []
+        self.name = "benchmark"
+        self.database = types.SimpleNamespace(client=self, name="benchmark")
+
+    def create_indexes(self, indexes):
+        pass
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+def random_recipe(steps: int):
+    '''Recipe algorithm giving a number of random steps'''
+    return lambda power_axes: [algorithms.generate_random_parameters(power_axes)[0] for _ in range(steps)]
+
+
+def run_series(bea_supervisor, runs: int, steps: int, max_pending: int, seed: int) -> tuple:
+    '''Returns (real seconds, simulated seconds, stored results) of one series'''
+    simulator = bea_supervisor.ce
+    simulator.instance = None
+    random.seed(seed)
+    collection = MemoryCollection()
+    dc.get_collection = lambda database, name: collection
+    start = time.perf_counter()
+    asyncio.run(bea_supervisor.perform_series_async(
+        do_presputter=True, samples=False, power_axes=np.array([False, True, True]), max_runs=runs,
+        power_pad=True, metadata=dict(cp.CAMPAIGN_METADATA), algorithm=random_recipe(steps),
+        max_pending=max_pending))
+    return time.perf_counter() - start, simulator.instance.clock.time(), len(collection.docs)
+
+
+def run(runs: int, steps: int, speed: float, seed: int):
+    cp.EKLIPSE_BACKEND = "simulator"
+    cp.SIMULATOR_SPEED = speed
+    cp.SIMULATOR_SEED = seed
+    bea_supervisor = importlib.import_module("bea_supervisor")
+    wc.get_next_series_id = lambda: "000"
+    bea_supervisor.es.ExperimentSeries.promt_series_description = lambda series: None
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        bea_supervisor.ce.RECORDING_PATH = folder
+        for name, max_pending in [("sequential", 0), ("pipelined", cp.PIPELINE_MAX_PENDING)]:
+            results.append((name,) + run_series(bea_supervisor, runs, steps, max_pending, seed))
+
+    n_steps = runs * steps
+    print("{:>12} {:>10} {:>16} {:>18} {:>8}".format(
+        "series", "real [s]", "real/step [ms]", "process/step [s]", "stored"))
+    for name, real, simulated, stored in results:
+        print("{:>12} {:>10.2f} {:>16.1f} {:>18.1f} {:>8}".format(
+            name, real, 1000 * real / n_steps, simulated / n_steps, stored))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=1, help="steps per recipe")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="simulated seconds per real second (default: no waiting)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.runs, args.steps, args.speed, args.seed)
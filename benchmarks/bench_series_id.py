@@ -0,0 +1,55 @@
+'''
+Benchmark of series ID allocation (workflow_control.get_next_series_id): latency of one allocation in a
+single process, and throughput with several processes allocating from the same tracker file at once,
+checking that no ID is handed out twice. The tracker file is created in a temporary folder.
+
+Run from the repository root:  python -m benchmarks.bench_series_id --allocations 1000 --processes 4
+'''
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+import workflow_control as wc
+
+
+def allocate(folder: str, allocations: int) -> tuple:
+    '''Returns (allocated IDs, seconds per allocation)'''
+    wc.path = folder
+    ids = []
+    latencies = []
+    for _ in range(allocations):
+        start = time.perf_counter()
+        ids.append(wc.get_next_series_id())
+        latencies.append(time.perf_counter() - start)
+    return ids, latencies
+
+
+def run(allocations: int, processes: int):
+    with tempfile.TemporaryDirectory() as folder:
+        _, latencies = allocate(folder, allocations)
+        latencies = 1e6 * np.array(latencies)
+        print("single process: {:.0f} us median, {:.0f} us p99 per allocation".format(
+            np.median(latencies), np.percentile(latencies, 99)))
+
+        wc.path = folder
+        wc.reset_series_id()
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            results = pool.starmap(allocate, [(folder, allocations)] * processes)
+        elapsed = time.perf_counter() - start
+        ids = [series_id for process_ids, _ in results for series_id in process_ids]
+        latencies = 1e6 * np.concatenate([process_latencies for _, process_latencies in results])
+        print("{} processes: {:.0f} us median, {:.0f} us p99 per allocation, {:.0f} allocations/s "
+              "(including process start), {} duplicate IDs".format(
+                  processes, np.median(latencies), np.percentile(latencies, 99), len(ids) / elapsed,
+                  len(ids) - len(set(ids))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--allocations", type=int, default=1000, help="allocations per process")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    run(args.allocations, args.processes)
@@ -0,0 +1,88 @@
+'''
+Benchmark of settling detection: the original pandas tail().std() loop from Validator.validate against the
+vectorized settling.find_settle_index, on synthetic recordings sampled at RECORDING_INTERVAL_NO_SAMPLE.
+The worst case for the loop is an unsettled recording, where every candidate index is checked.
+
+Run from the repository root:  python -m benchmarks.bench_settling
+'''
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import settling
+
+
+THRESHOLDS = {
+    'Actual_pressure_[mTorr]': 0.1,
+    "Voltage_Ax1_[V]": 1,
+    "Voltage_Ax2_[V]": 1,
+    "Voltage_Ax3_[V]": 1
+}
+T = 0.5
+T_D = 0.3
+
+
+def synthetic_recording(rows: int, settled: bool, seed: int = 0) -> pd.DataFrame:
+    '''Creates a recording with exponentially settling pressure and voltages (or a drifting one if not settled)'''
+    rng = np.random.default_rng(seed)
+    time_stamp = np.arange(rows) * cp.RECORDING_INTERVAL_NO_SAMPLE
+    decay = np.exp(-np.arange(rows) / (0.2*rows)) if settled else np.linspace(1, 0, rows)
+    df = pd.DataFrame({"Time Stamp": time_stamp})
+    df['Actual_pressure_[mTorr]'] = np.round(5 + 2*decay + rng.normal(0, 0.01, rows), 3)
+    for k, v in enumerate(cp.PRESPUTT_VS):
+        df["Voltage_Ax" + str(k+1) + "_[V]"] = np.round(v + 50*decay + rng.normal(0, 0.3, rows), 3)
+    return df
+
+
+def legacy_settle_index(df: pd.DataFrame, n_candidates: int, time_limit: float):
+    '''Original loop; stops early after time_limit seconds and returns (index, iterations done)'''
+    rows = len(df)
+    start = time.perf_counter()
+    for j in range(0, n_candidates):
+        if all(df[p].tail(rows-j).std() <= THRESHOLDS[p] for p in THRESHOLDS.keys()):
+            return j, j+1
+        if time.perf_counter() - start > time_limit:
+            return None, j+1
+    return None, n_candidates
+
+
+def run(sizes: list[int], time_limit: float):
+    print("{:>9} {:>8} {:>12} {:>12} {:>10} {:>8}".format(
+        "rows", "settled", "loop [s]", "vector [s]", "speedup", "same"))
+    for rows in sizes:
+        for settled in [True, False]:
+            df = synthetic_recording(rows, settled)
+            n_candidates = int(T*rows) + int(T_D*rows)
+
+            start = time.perf_counter()
+            values = df[list(THRESHOLDS)].to_numpy(dtype=np.float64)
+            index = settling.find_settle_index(values, list(THRESHOLDS.values()), n_candidates)
+            vector_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            legacy_index, iterations = legacy_settle_index(df, n_candidates, time_limit)
+            loop_time = time.perf_counter() - start
+
+            # The loop is extrapolated from the iterations done when it hits the time limit
+            finished = legacy_index is not None or iterations == n_candidates
+            if finished:
+                same = str(legacy_index == index)
+            else:
+                remaining = n_candidates if index is None else index + 1
+                loop_time = loop_time / iterations * remaining
+                same = "n/a"
+            print("{:>9} {:>8} {:>11.3f}{} {:>12.4f} {:>9.0f}x {:>8}".format(
+                rows, str(settled), loop_time, " " if finished else "*", vector_time,
+                loop_time / vector_time, same))
+    print("* extrapolated from the iterations completed within the time limit")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--time-limit", type=float, default=10,
+                        help="seconds to let the original loop run before extrapolating")
+    args = parser.parse_args()
+    run(args.sizes, args.time_limit)
@@ -1,3 +1,6 @@
+import math
+import os
+import tempfile
 import numpy as np
 import system_parameters as sp
 
@@ -28,16 +31,109 @@ RECORDING_INTERVAL_NO_SAMPLE = 0.1
 RECORDING_TIME = 10
 PRESPUTT_TIME = 30  # seconds
 PRE_SPUTT_V_ERROR = 3  # %
-PWA_READ_WAIT_TIME = 0.2  # s
-PWA_SET_WAIT_TIME = 0.5  # s
-BLUE_FLASH_REPEATS = 10
+PWA_READ_WAIT_TIME = 0.2  # s, maximum wait for the Actual field to show a newly selected signal
+PWA_SET_WAIT_TIME = 0.5  # s, maximum wait for the Request field to show a newly selected signal
+PWA_SELECT_MIN_WAIT = 0.1  # s, minimum wait after selecting a signal before a changed field counts as the new signal
+WAIT_POLL_INTERVAL = 0.02  # s, polling interval of waiting.wait_until on the control path
+EKLIPSE_START_TIMEOUT = 60  # s, maximum wait for the eKLipse window after starting the application
+EKLIPSE_CONNECT_TIMEOUT = 20  # s, maximum wait for the eKLipse window after connecting
+PANEL_OPEN_TIMEOUT = 5  # s, maximum wait for a panel (e.g. Recording Setup) to open
+RECIPE_START_TIMEOUT = 15  # s, maximum wait for the stack light to show a started recipe
+BLUE_FLASH_REPEATS = 10  # maximum number of blue light samples per stack light check
 BLUE_FLASH_WAIT = 0.1  # s
-WAIT_RECIPE_ITERATIONS = 20
-WAIT_RECIPE_TIME = 5  # s
+BLUE_FLASH_PERIOD = 0.9  # s, period (on + off) of the flashing blue light, the span of the 10 samples of the original check
+# equal samples must span more than the longest phase of a flash, or a paused recipe (flashing blue) can pass for a
+# running one (steady blue): half a period to confirm the value of the previous check, a whole period otherwise
+BLUE_STEADY_SAMPLES = min(math.ceil(round(BLUE_FLASH_PERIOD / BLUE_FLASH_WAIT, 6)) + 1, BLUE_FLASH_REPEATS)
+BLUE_STEADY_SAMPLES_PRIOR = math.floor(round(BLUE_FLASH_PERIOD / 2 / BLUE_FLASH_WAIT, 6)) + 2
+RECIPE_MONITOR_INTERVAL = 1  # s, sampling interval of the recipe monitor while waiting for a recipe
+RECIPE_MONITOR_MAX_FAILURES = 5  # failed samples in a row after which a wait for a recipe raises the error
+RECIPE_WAIT_TIMEOUT = 100  # s, maximum wait for a recipe to finish or reach a step, as the former 20 checks 5 s apart (None = no limit)
 GAS_INJ_TOGGLE_TIME = 2  # s
 POWER_PADDING = 5  # W
 POWER_PADDING_WAIT = 2  # s
 
+# maximum age of cached signal values in control_eklipse.read_parameter (0 = always read from eKLipse)
+# cached values are dropped whenever control_eklipse.set_parameter writes a signal
+SIGNAL_CACHE_DEFAULT_MAX_AGE = 1  # s
+SIGNAL_CACHE_MAX_AGE = {
+    sp.Check_GasInjValveOpen: 2,
+    sp.Check_GasIsoValveOpen: 2,
+    **{signal: 2 for signal in sp.PS_STATUS_SIGNALS},
+    sp.Check_StackLight_Red: 0.5,
+    sp.Check_StackLight_Yellow: 0.5,
+    sp.Check_StackLight_Green: 0.5,
+    sp.Check_StackLight_Blue: 0  # flashes are detected from consecutive reads
+}
+
+# steadiness criteria used by the Validator, per recorded column: {criterion name: threshold}
+# available criteria (see settling.py): "suffix_std" [column unit], "slope" [column unit/s],
+# "drift" [fraction of mean], "change_point" [z-score of mean shift between adjacent windows]
+SIGMA_V = 1  # V
+SIGMA_P = 0.1  # mTorr
+STEADINESS_CRITERIA = {
+    "Actual_pressure_[mTorr]": {"suffix_std": SIGMA_P},
+    "Voltage_Ax1_[V]": {"suffix_std": SIGMA_V},
+    "Voltage_Ax2_[V]": {"suffix_std": SIGMA_V},
+    "Voltage_Ax3_[V]": {"suffix_std": SIGMA_V}
+}
+STEADY_TIME_FRACTION = 0.5  # experiments must settle within this fraction of the recording (t)
+DRAG_TIME_FRACTION = 0.3  # experiments settling within t + t_d are rerun (t_d)
+STEADINESS_WINDOW = 20  # samples, window length of the "slope" and "change_point" criteria
+STOP_RECORDING_WHEN_STEADY = True  # end the dwell once the criteria are met (only for runs without samples)
+STREAMING_POLL_INTERVAL = 0.5  # s, how often the growing recording is checked during the dwell
+STREAMING_MIN_TIME = 3  # s, minimum recorded time before the dwell can be ended early
+
+# database connection (see database_client.py)
+DB_URI = "mongodb://localhost:27017"
+DB_NAME = "BERTHA-Data"
+DB_COLLECTION = "Working Data"
+DB_MAX_POOL_SIZE = 10
+DB_SERVER_SELECTION_TIMEOUT_MS = 5000
+DB_CONNECT_TIMEOUT_MS = 5000
+DB_WRITE_CONCERN = 1
+
+# storage of recorded time series in the database (see document_format.py)
+# "lists" (one list per column, the schema of the existing documents) or "columnar" (opt-in, packed binary
+# arrays in one "Time series" field: analysis code must read them with document_format.load_time_series)
+DB_STORAGE_FORMAT = "lists"
+DB_STORAGE_DTYPE = np.float32  # dtype of the measured columns in the columnar format
+DB_STORAGE_COMPRESSION = None  # None or "zlib"
+
+# background database writes of validated results (see result_writer.py)
+DB_BACKGROUND_WRITES = True
+DB_WRITER_QUEUE_SIZE = 100  # documents kept in memory before spilling to the journal
+DB_WRITER_BATCH_SIZE = 20  # documents per insert_many
+DB_WRITER_FLUSH_INTERVAL = 1  # s
+DB_WRITER_RETRY_INTERVAL = 30  # s, between attempts to replay the journal while the database is unreachable
+DB_JOURNAL_PATH = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "BEA_unsaved_results.bson")
+
+# overlapping of eKLipse control, validation and recipe planning within a series (see orchestration.py)
+PIPELINED_SERIES = True  # False runs every stage of a step in turn
+PIPELINE_WORKERS = 2  # threads for validation and recipe planning
+PIPELINE_MAX_PENDING = 2  # recorded steps waiting for validation before the series waits for them
+REORDER_RECIPE_STEPS = True  # run the steps of recipes without samples in the order with the least ramp time (see scheduler.py)
+
+# Gaussian-process recipe planner (see planner.py)
+PLANNER_INITIAL_RUNS = 5  # observed steps before the planner leaves its initial Sobol design
+PLANNER_CANDIDATES = 2048  # candidate setpoints scored per planned step
+PLANNER_LENGTH_SCALE = 0.2  # kernel length scale, as a fraction of each setpoint range
+PLANNER_NOISE = 0.05  # observation noise variance, relative to the variance of the objective
+PLANNER_UCB_BETA = 2.0  # weight of the predicted standard deviation in the upper confidence bound
+PLANNER_SEED = None  # seed of the candidates, None for different candidates in every series
+
+# planning of the next recipe in a separate process (see planning_service.py)
+PLANNING_DEADLINE = 10  # s, longest wait for the planner before a random recipe is used instead
+PLANNING_PROCESSES = 1
+PLANNING_START_METHOD = "spawn"
+
+# eKLipse backend of bea_supervisor: "eklipse" (the application through pywinauto) or "simulator" (see eklipse_simulator.py)
+EKLIPSE_BACKEND = os.environ.get("BEA_EKLIPSE_BACKEND", "eklipse")
+SIMULATOR_SPEED = None  # simulated seconds per real second, None to run without waiting
+SIMULATOR_SEED = 0  # seed of the simulated measurement noise
+SIMULATOR_RECORDING_PATH = os.path.join(tempfile.gettempdir(), "eklipse_simulator", "RecordingData")
+
 CAMPAIGN_METADATA = {
     "Campaign code": CAMP_CODE,  # taken from some function
     "Campaign description": CAMP_DESC,
@@ -1,15 +1,84 @@
-from pywinauto.application import Application, WindowSpecification
-from pywinauto import Desktop
+try:
+    from pywinauto.application import Application, WindowSpecification
+    from pywinauto import Desktop
+except ImportError:
+    # without pywinauto the module runs on a simulated GUI only (see use_backend, eklipse_simulator.py)
+    Application = Desktop = None
+    WindowSpecification = object
+try:
+    from _ctypes import COMError
+except ImportError:
+    COMError = OSError
+import threading
 import time
 import os
 import system_parameters as sp
 import campaign_parameters as cp
 import validate as vd
+from recording_index import RecordingIndex
+from signal_cache import SignalCache
+from ui_navigator import UINavigator
+from ui_handles import HandleRegistry
+from waiting import wait_until
+import stack_light
+import setpoints
+from recipe_monitor import RecipeMonitor, RecipeState
 
 path = r"C:\\Program Files (x86)\\KJLC\\eKLipse"
-os.chdir(path)
+if os.path.isdir(path):
+    os.chdir(path)
+# folder eKLipse writes the recording CSV files to
+RECORDING_PATH = path + r"\\Log\\RecordingData"
 BACKEND = "uia"  # uia or win32
 EKLIPSE_WINDOW_NAME = "Kurt J Lesker Company eKLipse Version: 20220224.3.0.149"
+RECORDING_FILE_TIMEOUT = 5  # s, time to wait for the recording file to appear after recording
+READ_FAILED = "Failed to read value"
+
+# values read by read_parameter, reused while younger than cp.SIGNAL_CACHE_MAX_AGE (see signal_cache.py)
+signal_cache = SignalCache()
+# navigation state and cached control handles per application window (see ui_navigator.py, ui_handles.py)
+navigators = {}
+# raised by calls on controls that eKLipse has recreated (uia: COMError, win32: InvalidWindowHandle)
+STALE_HANDLE_ERRORS = (COMError, RuntimeError)
+# blue light state found by the previous stack light check (see stack_light.py)
+blue_light = stack_light.BlueLightDetector()
+# (red, yellow, green) found by the previous stack light check
+last_lights = None
+# recording followed by record_data while it is written (streaming.RecordingTail), used by read_parameters
+live_recording = None
+# held while the recipe monitor thread uses eKLipse (see recipe_monitor.py)
+ui_lock = threading.RLock()
+# (application window, recipe monitor) per application window
+recipe_monitors = {}
+# desktop, clock and sleep the GUI logic runs on, replaced by use_backend (None: pywinauto and real time)
+desktop = None
+clock = time.monotonic
+wait = None
+
+
+def use_backend(backend_desktop=None, backend_clock=time.monotonic, backend_sleep=None) -> None:
+    '''Runs the GUI logic on another desktop and clock, e.g. the simulated GUI of eklipse_simulator
+
+    Parameters
+    ----------
+    backend_desktop : optional
+        Desktop used to find the Recipe Monitor window and popups, by default None (pywinauto Desktop)
+    backend_clock : callable, optional
+        Clock of the process, by default time.monotonic
+    backend_sleep : callable, optional
+        Waits for the process, by default None (time.sleep)
+    '''
+    global desktop, clock, wait, last_lights
+    for _, monitor in recipe_monitors.values():
+        monitor.stop()
+    recipe_monitors.clear()
+    navigators.clear()
+    desktop, clock, wait = backend_desktop, backend_clock, backend_sleep
+    signal_cache.clock = clock
+    signal_cache.invalidate()
+    blue_light.reset()
+    last_lights = None
+    set_live_recording(None)
 
 
 def start_eklipse() -> WindowSpecification:
@@ -22,12 +91,31 @@ def start_eklipse() -> WindowSpecification:
     '''
 
     eklipse_instance = Application(backend=BACKEND).start("eKlipse.exe")
-    time.sleep(20)
     eklipse_window = eklipse_instance.window(title=EKLIPSE_WINDOW_NAME)
-    # main_window = timings.wait_until_passes(20, 0.5, lambda: eklipse_instance.window(title=EKLIPSE_WINDOW_NAME))
+    wait_until(lambda: window_ready(eklipse_window), cp.EKLIPSE_START_TIMEOUT, interval=0.5,
+               operation="start eKLipse", clock=clock, sleep=sleep)
     return eklipse_window
 
 
+def window_ready(window: WindowSpecification) -> bool:
+    '''Check if a window exists and is visible, without waiting
+
+    Parameters
+    ----------
+    window : WindowSpecification
+        Window to check
+
+    Returns
+    -------
+    bool
+        Window is ready
+    '''
+    try:
+        return window.exists(timeout=0) and window.is_visible()
+    except Exception:
+        return False
+
+
 def logInToEklipse(eklipse_window: WindowSpecification) -> None:
     '''Login to Eklipse
 
@@ -64,9 +152,10 @@ def connect_to_instance_of_eklipse() -> WindowSpecification:
     '''
 
     eklipse_instance = Application().connect(path="eKlipse.exe")
-    time.sleep(10)
-    eklipse_instance.window(title=EKLIPSE_WINDOW_NAME).maximize().set_focus()
     eklipse_window = eklipse_instance.window(title=EKLIPSE_WINDOW_NAME)
+    wait_until(lambda: window_ready(eklipse_window), cp.EKLIPSE_CONNECT_TIMEOUT, interval=0.5,
+               operation="connect eKLipse", clock=clock, sleep=sleep)
+    eklipse_window.maximize().set_focus()
     return eklipse_window
 
 
@@ -92,89 +181,150 @@ def is_application_connected(eklipse_window) -> bool:
         return False
 
 
+def navigator(eklipse_window: WindowSpecification) -> UINavigator:
+    '''Navigation state of an application window, created on first use
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+
+    Returns
+    -------
+    UINavigator
+        Navigator tracking the active tab and selected signal of the window
+    '''
+    key = id(eklipse_window)
+    if key not in navigators or navigators[key].eklipse_window is not eklipse_window:
+        navigators[key] = UINavigator(eklipse_window, gui_desktop(), STALE_HANDLE_ERRORS, clock, sleep)
+    return navigators[key]
+
+
+def gui_desktop():
+    '''Desktop the Recipe Monitor window and popups are found on (see use_backend)'''
+    return desktop if desktop is not None else Desktop(BACKEND)
+
+
+def handles(eklipse_window: WindowSpecification) -> HandleRegistry:
+    '''Cached handles to the controls of an application window
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+
+    Returns
+    -------
+    HandleRegistry
+        Handles by auto_id, e.g. handles(eklipse_window)["Actual"]
+    '''
+    return navigator(eklipse_window).handles
+
+
+def sleep(seconds: float):
+    '''Waits for the process (the simulator backend waits in simulated time)
+
+    Parameters
+    ----------
+    seconds : float
+        Time to wait
+    '''
+    if wait is not None:
+        wait(seconds)
+    else:
+        time.sleep(seconds)
+
+
 def go_to_automation_tab(eklipse_window: WindowSpecification) -> None:
-    '''Go to the automation tab in Eklipse
+    '''Go to the automation tab in Eklipse (IO Item Editor), skipped if it is already active
 
     Parameters
     ----------
     eklipse_window : WindowSpecification
         Application window in connected state
     '''
-    eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(
-        title="Automation", auto_id="Automation").click()
-    go_to_io_item_editor_tab(eklipse_window)
+    navigator(eklipse_window).go_to_io_item_editor()
 
 
 def go_to_io_item_editor_tab(eklipse_window: WindowSpecification) -> None:
-    '''<go to item editor tab in Eklipse
+    '''<go to item editor tab in Eklipse, skipped if it is already active
 
     Parameters
     ----------
     eklipse_window : WindowSpecification
         Application window in connected state
     '''
-    eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(
-        title="IO Item Editor", auto_id="IO Item Editor").click()
+    navigator(eklipse_window).go_to_io_item_editor()
+
+
+def start_recipe(eklipse_window: WindowSpecification, recipe_name: str) -> None:
+    '''Click on the button of a recipe in the Automation tab
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+    recipe_name : str
+        auto_id of the recipe button
+    '''
+    go_to_automation_tab(eklipse_window)
+    eklipse_window.child_window(auto_id=recipe_name).click()
 
 
-def check_running_recipe_name(eklipse_window: WindowSpecification) -> str:
+def check_running_recipe_name(eklipse_window: WindowSpecification, verbose: bool = True) -> str:
     '''Check the name of running recipe
 
     Parameters
     ----------
     eklipse_window : WindowSpecification
         Application window in connected state
+    verbose : bool, optional
+        Print the result, by default True
 
     Returns
     -------
     str
         Name of recipe
     '''
-    # go_to_automation_tab(eklipse_window)
-    eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(auto_id="Monitor").click()
-    desktop = Desktop(BACKEND)
-    recipe_monitor = desktop.window(auto_id="RecipeMonitor")
-    if recipe_monitor.exists:
-        field = recipe_monitor.child_window(
-            auto_id="NameOfRecipe").wrapper_object()
+    recipe_monitor = navigator(eklipse_window).recipe_monitor()
+    if recipe_monitor is not None:
+        field = navigator(eklipse_window).recipe_monitor_handles["NameOfRecipe"]
         recipe_name = field.get_value()
-        print("    Detected recipe name: " +
-              recipe_name + " in Recipe Monitor window")
+        if verbose:
+            print("    Detected recipe name: " +
+                  recipe_name + " in Recipe Monitor window")
         return recipe_name
     else:
-        print("    Could not read recipe monitor")
+        if verbose:
+            print("    Could not read recipe monitor")
         return "False"
 
 
-def check_running_recipe_step(eklipse_window: WindowSpecification) -> int:
+def check_running_recipe_step(eklipse_window: WindowSpecification, verbose: bool = True) -> int:
     '''Check what step the recipe is at
 
     Parameters
     ----------
     eklipse_window : WindowSpecification
         Application window in connected state
+    verbose : bool, optional
+        Print the result, by default True
 
     Returns
     -------
     int
         Current recip step
     '''
-    # go_to_automation_tab(eklipse_window)
-    eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(auto_id="Monitor").click()
-    desktop = Desktop(BACKEND)
-    recipe_monitor = desktop.window(auto_id="RecipeMonitor")
-    if recipe_monitor.exists:
-        field = recipe_monitor.child_window(
-            auto_id="StepNumber").wrapper_object()
+    recipe_monitor = navigator(eklipse_window).recipe_monitor()
+    if recipe_monitor is not None:
+        field = navigator(eklipse_window).recipe_monitor_handles["StepNumber"]
         step_number = int(field.get_value())
-        print("    Recipe at step " + str(step_number))
+        if verbose:
+            print("    Recipe at step " + str(step_number))
         return step_number
     else:
-        print("    Could not read recipe step")
+        if verbose:
+            print("    Could not read recipe step")
         return -1
 
 
@@ -191,13 +341,9 @@ def resume_paused_recipe(eklipse_window: WindowSpecification) -> bool:
     bool
         If resumed
     '''
-    # go_to_automation_tab(eklipse_window)
-    eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(auto_id="Monitor").click()
-    desktop = Desktop(BACKEND)
-    recipe_monitor = desktop.window(auto_id="RecipeMonitor")
-    if recipe_monitor.exists:
-        recipe_monitor.child_window(auto_id="ResumeRecipe").click()
+    recipe_monitor = navigator(eklipse_window).recipe_monitor()
+    if recipe_monitor is not None:
+        navigator(eklipse_window).recipe_monitor_handles["ResumeRecipe"].click()
         print("    Recipe resumed")
         return True
     else:
@@ -218,13 +364,9 @@ def skip_recipe_step(eklipse_window: WindowSpecification) -> bool:
     bool
         Step skipped
     '''
-    # go_to_automation_tab(eklipse_window)
-    eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(auto_id="Monitor").click()
-    desktop = Desktop(BACKEND)
-    recipe_monitor = desktop.window(auto_id="RecipeMonitor")
-    if recipe_monitor.exists:
-        recipe_monitor.child_window(auto_id="SkipRecipeStep").click()
+    recipe_monitor = navigator(eklipse_window).recipe_monitor()
+    if recipe_monitor is not None:
+        navigator(eklipse_window).recipe_monitor_handles["SkipRecipeStep"].click()
         print("    Recipe step skipped")
         return True
     else:
@@ -249,7 +391,9 @@ def setup_data_recording(eklipse_window: WindowSpecification, samples: bool) ->
 
     go_to_automation_tab(eklipse_window)
     eklipse_window.child_window(auto_id="Recording Setup").click()
-    time.sleep(1)
+    navigator(eklipse_window).leave_io_item_editor("Recording Setup")
+    wait_until(lambda: eklipse_window.child_window(auto_id="RemoveAll").exists(timeout=0),
+               cp.PANEL_OPEN_TIMEOUT, operation="open Recording Setup", clock=clock, sleep=sleep)
     eklipse_window.child_window(auto_id="RemoveAll").click()
     eklipse_window.child_window(
         auto_id="ListViewSavedSets").select(sp.BASIC_PARAMETER_SET)
@@ -270,14 +414,35 @@ def setup_data_recording(eklipse_window: WindowSpecification, samples: bool) ->
     eklipse_window.child_window(auto_id="RecordingInterval").type_keys(
         str(interval))  # + "{ENTER}")
     eklipse_window.child_window(auto_id="Generate").click()
-    desktop = Desktop(BACKEND)
-    popup_window = desktop.window(auto_id="eKLipseSmallMSGBOX")
+    popup_window = gui_desktop().window(auto_id="eKLipseSmallMSGBOX")
     popup_window.type_keys("{ENTER}")
     go_to_io_item_editor_tab(eklipse_window)
 
 
-def read_parameter(eklipse_window: WindowSpecification, signal_name: str) -> str:
-    '''Reading the value of parameters
+def read_parameter(eklipse_window: WindowSpecification, signal_name: str, max_age: float = None) -> str:
+    '''Reading the value of parameters, from the signal cache if a recent enough value was read before
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+    signal_name : str
+        Signal to read
+    max_age : float, optional
+        Maximum age in seconds of a cached value (0 always reads from eKLipse), by default the
+        policy of the signal in cp.SIGNAL_CACHE_MAX_AGE
+
+    Returns
+    -------
+    str
+        Signal value
+    '''
+    return signal_cache.read(signal_name, lambda signal: read_parameter_from_window(eklipse_window, signal),
+                             max_age, failed=READ_FAILED)
+
+
+def read_parameter_from_window(eklipse_window: WindowSpecification, signal_name: str) -> str:
+    '''Reading the value of parameters from the IO Item Editor (no cache)
 
     Parameters
     ----------
@@ -291,22 +456,86 @@ def read_parameter(eklipse_window: WindowSpecification, signal_name: str) -> str
     str
         Signal value
     '''
-    go_to_automation_tab(eklipse_window)
     try:
-        # select wanted signal
-        eklipse_window.child_window(
-            auto_id=sp.CHOOSE_SIGNAL_BOX_ID).select(signal_name)
-        time.sleep(cp.PWA_READ_WAIT_TIME)
+        # select wanted signal (skipped if it is still selected from the previous read or write)
+        actual = handles(eklipse_window)["Actual"]
+        navigator(eklipse_window).select_signal(signal_name, cp.PWA_READ_WAIT_TIME, watch=actual.window_text)
         # read the value
-        value = eklipse_window.child_window(auto_id="Actual").window_text()
+        value = actual.window_text()
         # print("read_parameter() returned " + value + " for " + signal_name)
         return value
     except Exception as e:
         print("    Could not read parameter value: ", type(e).__name__)
-        return "Failed to read value"
+        navigator(eklipse_window).invalidate()
+        return READ_FAILED
 
 
-def set_parameter(eklipse_window: WindowSpecification, new_value: int, signal_name: str) -> bool:
+def read_parameters(eklipse_window: WindowSpecification, signals: list[str], max_age: float = None,
+                    recording=None) -> dict:
+    '''Reading the values of several parameters with one navigation to the IO Item Editor
+
+    Values are taken, in this order, from the signal cache, from the recording that is being written
+    (if the signal is recorded) and from the IO Item Editor. The signal that is still selected is read
+    first, and every other signal needs one selection and a wait for the Actual field to show it
+    (at most PWA_READ_WAIT_TIME).
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+    signals : list[str]
+        Signals to read
+    max_age : float, optional
+        Maximum age in seconds of cached values (0 reads all signals from eKLipse), by default the
+        policy of each signal in cp.SIGNAL_CACHE_MAX_AGE
+    recording : streaming.RecordingTail, optional
+        Recording being written, by default the one followed by record_data (if any)
+
+    Returns
+    -------
+    dict
+        Signal name -> value, in the order of signals (READ_FAILED for signals that could not be read)
+    '''
+    values = {}
+    for signal in signals:
+        if signal not in values:
+            values[signal] = signal_cache.get(signal, max_age)
+    missing = [signal for signal, value in values.items() if value is None]
+
+    # Signals in the recording: the last row read by the steadiness monitor is at most one
+    # poll interval (cp.STREAMING_POLL_INTERVAL) old
+    if recording is None:
+        recording = live_recording
+    if missing and recording is not None and max_age != 0:
+        recorded = recording.latest_values()
+        for signal in missing:
+            if signal in recorded:
+                values[signal] = format(recorded[signal], 'g')
+                signal_cache.put(signal, values[signal])
+        missing = [signal for signal in missing if values[signal] is None]
+
+    if missing:
+        nav = navigator(eklipse_window)
+        # The signal that is still selected needs no selection and no wait
+        missing.sort(key=lambda signal: signal != nav.selected_signal)
+        nav.go_to_io_item_editor()
+        for signal in missing:
+            read_time = signal_cache.clock()
+            try:
+                actual = handles(eklipse_window)["Actual"]
+                nav.select_signal(signal, cp.PWA_READ_WAIT_TIME, navigate=False, watch=actual.window_text)
+                values[signal] = actual.window_text()
+                signal_cache.put(signal, values[signal], read_time)
+            except Exception as e:
+                print("    Could not read parameter value: ", type(e).__name__)
+                values[signal] = READ_FAILED
+                nav.invalidate()
+                nav.go_to_io_item_editor()
+
+    return {signal: values[signal] for signal in signals}
+
+
+def set_parameter(eklipse_window: WindowSpecification, new_value: int, signal_name: str, reset_on_failure: bool = True) -> bool:
     '''Set value of specified signal
 
     Parameters
@@ -317,38 +546,57 @@ def set_parameter(eklipse_window: WindowSpecification, new_value: int, signal_na
         New value to set
     signal_name : str
         Signal name
+    reset_on_failure : bool, optional
+        Set the signal to zero if the change cannot be verified (False when a SetpointTransaction
+        rolls back instead), by default True
 
     Returns
     -------
     bool
         Value is set
     '''
-    go_to_automation_tab(eklipse_window)
     if new_value > sp.MAX_PARAM:
         print("    Requested value in set_parameter was above maximum allowed (" +
               str(sp.MAX_PARAM) + ")")
         return False
-    eklipse_window.child_window(
-        auto_id=sp.CHOOSE_SIGNAL_BOX_ID).select(signal_name)
-    time.sleep(cp.PWA_SET_WAIT_TIME)
-    eklipse_window.child_window(
-        auto_id=sp.REQUEST_EDIT_BOX_ID).set_edit_text('')
-    eklipse_window.child_window(auto_id=sp.REQUEST_EDIT_BOX_ID).type_keys(
-        str(new_value) + "{ENTER}")
+    # A write can change any read back signal (setpoints, status, interlocks), so drop all cached values
+    signal_cache.invalidate()
+    request_box = handles(eklipse_window)[sp.REQUEST_EDIT_BOX_ID]
+    navigator(eklipse_window).select_signal(signal_name, cp.PWA_SET_WAIT_TIME, watch=request_box.window_text)
+    request_box.set_edit_text('')
+    request_box.type_keys(str(new_value) + "{ENTER}")
     verified = verify_parameter(eklipse_window, new_value)
     if verified:
         print("    "+signal_name + " was changed to", new_value)
         return True
+    elif not reset_on_failure:
+        print("    Change of "+signal_name + " could not be verified")
+        return False
     else:
         print("    Change of "+signal_name +
               " could not be verified, setting to zero")
-        eklipse_window.child_window(
-            auto_id=sp.REQUEST_EDIT_BOX_ID).set_edit_text('')
-        eklipse_window.child_window(
-            auto_id=sp.REQUEST_EDIT_BOX_ID).type_keys("0" + "{ENTER}")
+        request_box.set_edit_text('')
+        request_box.type_keys("0" + "{ENTER}")
         return False
 
 
+def setpoint_transaction(eklipse_window: WindowSpecification) -> setpoints.SetpointTransaction:
+    '''Transaction that applies several setpoints back to back and rolls them back if one fails
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+
+    Returns
+    -------
+    setpoints.SetpointTransaction
+        Transaction writing through set_parameter
+    '''
+    return setpoints.SetpointTransaction(
+        lambda signal, value: set_parameter(eklipse_window, value, signal, reset_on_failure=False))
+
+
 def set_power(eklipse_window: WindowSpecification, new_value: int, power_axis: int) -> bool:
     '''Set the power of the source specified
 
@@ -368,12 +616,10 @@ def set_power(eklipse_window: WindowSpecification, new_value: int, power_axis: i
     '''
 
     # this function allows up to 10W extra to be applied to accomodate power padding, but any functions providing power values to BEA supervisor should still respect the MAX_POWERS values.
-    power_padding = min(cp.POWER_PADDING, 10)
-    power_supply_index = cp.POWER_SUPPLIES[power_axis-1]-1
-    if (new_value <= (cp.MAX_POWERS[power_axis-1]+power_padding)):
+    setpoint = setpoints.power_setpoint(new_value, power_axis)
+    if setpoint is not None:
 
-        go_next = set_parameter(eklipse_window, new_value,
-                                sp.PS_SET_OUTPUT_SIGNALS[power_supply_index])
+        go_next = set_parameter(eklipse_window, new_value, setpoint[0])
 
         if go_next:
             print("    Set power " + str(new_value) + " W on " +
@@ -383,7 +629,6 @@ def set_power(eklipse_window: WindowSpecification, new_value: int, power_axis: i
             print("    Failed to set power " + str(new_value) + " W on " +
                   str(cp.MATERIALS[power_axis-1]) + ", power supply " + str(cp.POWER_SUPPLIES[power_axis-1]))
             return False
-        # power_supply_index is the index of the power supply in the arrays of power supply information in system_parameters
 
     else:
         print("    Could not set power value, out of range or other error")
@@ -406,26 +651,15 @@ def set_pressure(eklipse_window: WindowSpecification, new_value: int) -> bool:
         Pressure is set
     '''
 
-    valve_position = sp.valve_position_1
-    if (new_value >= sp.pressure_lower_1 and new_value <= sp.pressure_upper_1):
-        valve_position = sp.valve_position_1
-
-    elif (new_value >= sp.pressure_lower_2 and new_value <= sp.pressure_upper_2):
-        valve_position = sp.valve_position_2
-
-    elif (new_value >= sp.pressure_lower_3 and new_value <= sp.pressure_upper_3):
-        valve_position = sp.valve_position_3
-
-    else:
+    # valve position for the pressure range, then the pressure
+    pressure_setpoints = setpoints.pressure_setpoints(new_value)
+    if pressure_setpoints is None:
         print("    Requested pressure " + str(new_value) + "mTorr out of range")
         return False
-    go_next = set_parameter(eklipse_window, valve_position, sp.SET_VALVE_POS)
-    if go_next:
-        go_next = set_parameter(
-            eklipse_window, new_value, sp.SET_SPUTTER_PRESSURE)
-        if go_next:
-            return True
-    return False
+    for signal, value in pressure_setpoints:
+        if not set_parameter(eklipse_window, value, signal):
+            return False
+    return True
 
 
 def verify_parameter(eklipse_window: WindowSpecification, new_value: int) -> bool:
@@ -443,12 +677,10 @@ def verify_parameter(eklipse_window: WindowSpecification, new_value: int) -> boo
     bool
         Paramerter is verified
     '''
-    value = int(eklipse_window.child_window(
-        auto_id=sp.REQUEST_EDIT_BOX_ID).window_text())
-    if (value != new_value):
-        return False
-    else:
-        return True
+    request_box = handles(eklipse_window)[sp.REQUEST_EDIT_BOX_ID]
+    # the Request field may take a moment to show the typed value
+    return bool(wait_until(lambda: int(request_box.window_text()) == new_value, cp.PWA_SET_WAIT_TIME,
+                           ignore=(ValueError,), operation="verify parameter", clock=clock, sleep=sleep))
 
 
 def operate_target_shutter(eklipse_window: WindowSpecification, state: str, power_axis: int):
@@ -486,12 +718,11 @@ def check_if_system_ready(eklipse_window: WindowSpecification) -> bool:
         System is ready
     '''
 
-    go_to_automation_tab(eklipse_window)
     signals = [sp.Check_GasInjValveOpen,
                sp.Check_GasIsoValveOpen] + sp.PS_STATUS_SIGNALS
 
-    def map_status(signal): return int(read_parameter(eklipse_window, signal))
-    status = list(map(map_status, signals))
+    values = read_parameters(eklipse_window, signals)
+    status = [int(values[signal]) for signal in signals]
 
     if (sum(status) > 0):
         print("    Checks indicate a process may be running or paused, not ready")
@@ -501,7 +732,7 @@ def check_if_system_ready(eklipse_window: WindowSpecification) -> bool:
         return True
 
 
-def check_stack_light_status(eklipse_window: WindowSpecification, check_blue: bool = True) -> str:
+def check_stack_light_status(eklipse_window: WindowSpecification, check_blue: bool = True, verbose: bool = True) -> str:
     '''Checking the staus of the stack light. Possible combinations are RED, YELLOW, GREEN, GREEN + steady BLUE, GREEN + flashing BLUE
 
     Parameters
@@ -510,6 +741,8 @@ def check_stack_light_status(eklipse_window: WindowSpecification, check_blue: bo
         Application window in connected state
     check_blue : bool, optional
         Check for "BLUE" light, by default True
+    verbose : bool, optional
+        Print the status, by default True
 
     Returns
     -------
@@ -517,53 +750,133 @@ def check_stack_light_status(eklipse_window: WindowSpecification, check_blue: bo
         Stack light status
     '''
 
-    go_to_automation_tab(eklipse_window)
-    green_light = int(read_parameter(
-        eklipse_window, sp.Check_StackLight_Green)) == 1
-    red_light = int(read_parameter(
-        eklipse_window, sp.Check_StackLight_Red)) == 1
-    yellow_light = int(read_parameter(
-        eklipse_window, sp.Check_StackLight_Yellow)) == 1
+    global last_lights
+    # Read in order of priority and stop at the first light that decides the status
+    red_light = int(read_parameter(eklipse_window, sp.Check_StackLight_Red)) == 1
+    yellow_light = not red_light and int(read_parameter(eklipse_window, sp.Check_StackLight_Yellow)) == 1
+    green_light = not (red_light or yellow_light) and int(
+        read_parameter(eklipse_window, sp.Check_StackLight_Green)) == 1
+    last_lights = (red_light, yellow_light, green_light)
 
     if red_light:
-        print("    Status is RED (Abort) - check system!")
+        blue_light.reset()
+        if verbose:
+            print("    Status is RED (Abort) - check system!")
         return sp.STACK_LIGHT_RED
     elif yellow_light:
-        print("    Status is YELLOW (Interlock triggered) - check system!")
+        blue_light.reset()
+        if verbose:
+            print("    Status is YELLOW (Interlock triggered) - check system!")
         return sp.STACK_LIGHT_YELLOW
     elif green_light:
         if (check_blue):
-            eklipse_window.child_window(auto_id=sp.CHOOSE_SIGNAL_BOX_ID).select(
-                sp.Check_StackLight_Blue)
-            time.sleep(cp.PWA_READ_WAIT_TIME)
-            blue_readings = []
-            flashes = 0
-            for i in range(cp.BLUE_FLASH_REPEATS):
-                blue_readings.append(
-                    int(eklipse_window.child_window(auto_id="Actual").window_text()))
-                if (i > 0):
-                    if (blue_readings[i] != blue_readings[i-1]):
-                        flashes += 1
-                time.sleep(cp.BLUE_FLASH_WAIT)
-
-            # print(blue_readings)
-            # print(flashes)
-
-            if (flashes > 1):
-                print("    Status is FLASHING BLUE (process running and paused)")
+            # Blue flashes are detected from consecutive reads of the Actual field, bypassing the cache
+            actual = handles(eklipse_window)["Actual"]
+            navigator(eklipse_window).select_signal(sp.Check_StackLight_Blue, cp.PWA_READ_WAIT_TIME,
+                                                    watch=actual.window_text)
+            blue = blue_light.detect(lambda: int(actual.window_text()),
+                                     lambda: sleep(cp.BLUE_FLASH_WAIT))
+
+            if blue == stack_light.BLUE_FLASHING:
+                if verbose:
+                    print("    Status is FLASHING BLUE (process running and paused)")
                 return sp.STACK_LIGHT_GREEN_FLASH_BLUE
-            elif blue_readings[-1] == 1:
-                print("    Status is BLUE (process running)")
+            elif blue == stack_light.BLUE_ON:
+                if verbose:
+                    print("    Status is BLUE (process running)")
                 return sp.STACK_LIGHT_GREEN_STEADY_BLUE
-            elif blue_readings[-1] == 0:
-                print("    Status is GREEN (ready)")
+            else:
+                if verbose:
+                    print("    Status is GREEN (ready)")
                 return sp.STACK_LIGHT_GREEN
     else:
-        print("    Could not determine system status")
+        blue_light.reset()
+        if verbose:
+            print("    Could not determine system status")
         return sp.STACK_LIGHT_UNDEFINED
 
 
-def record_data(eklipse_window: WindowSpecification, recording_time: int):
+def sample_recipe_state(eklipse_window: WindowSpecification) -> RecipeState:
+    '''Quietly reads the stack light, and the name and step of the recipe if one is running or paused
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+
+    Returns
+    -------
+    RecipeState
+        Current recipe state
+    '''
+    status = check_stack_light_status(eklipse_window, verbose=False)
+    recipe_name = None
+    step = None
+    if status in (sp.STACK_LIGHT_GREEN_STEADY_BLUE, sp.STACK_LIGHT_GREEN_FLASH_BLUE):
+        recipe_name = check_running_recipe_name(eklipse_window, verbose=False)
+        step = check_running_recipe_step(eklipse_window, verbose=False)
+    return RecipeState(status, recipe_name, step, clock())
+
+
+def recipe_monitor(eklipse_window: WindowSpecification) -> RecipeMonitor:
+    '''Recipe monitor of an application window, created on first use
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+
+    Returns
+    -------
+    RecipeMonitor
+        Monitor sampling sample_recipe_state every cp.RECIPE_MONITOR_INTERVAL seconds while a thread waits
+    '''
+    key = id(eklipse_window)
+    if key not in recipe_monitors or recipe_monitors[key][0] is not eklipse_window:
+        monitor = RecipeMonitor(lambda: sample_recipe_state(eklipse_window), cp.RECIPE_MONITOR_INTERVAL,
+                                ui_lock, init_ui_thread, clock=clock, sleep=wait)
+        recipe_monitors[key] = (eklipse_window, monitor)
+    return recipe_monitors[key][1]
+
+
+def init_ui_thread():
+    '''Initialises COM in the current thread, needed in every thread that uses the uia backend'''
+    try:
+        import comtypes
+    except ImportError:
+        return
+    comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+
+
+def stack_light_changed(eklipse_window: WindowSpecification) -> bool:
+    '''Cheap check if the stack light may have changed since the last check_stack_light_status,
+    from one read of each light (a flashing blue light is reported as unchanged)
+
+    Parameters
+    ----------
+    eklipse_window : WindowSpecification
+        Application window in connected state
+
+    Returns
+    -------
+    bool
+        True if the status should be checked again with check_stack_light_status
+    '''
+    if last_lights is None:
+        return True
+    values = read_parameters(eklipse_window, [sp.Check_StackLight_Red, sp.Check_StackLight_Yellow,
+                                              sp.Check_StackLight_Green, sp.Check_StackLight_Blue], max_age=0)
+    try:
+        red, yellow, green, blue = (int(value) == 1 for value in values.values())
+    except ValueError:
+        return True
+    lights = (red, yellow and not red, green and not (red or yellow))
+    if lights != last_lights:
+        return True
+    return green and not (red or yellow) and not blue_light.unchanged(int(blue))
+
+
+def record_data(eklipse_window: WindowSpecification, recording_time: int, recordings: RecordingIndex = None, monitor=None) -> str:
     '''Record data
 
     Parameters
@@ -572,14 +885,57 @@ def record_data(eklipse_window: WindowSpecification, recording_time: int):
         Window of running application
     recording_time : int
         Time to record in seconds
+    recordings : RecordingIndex, optional
+        Index of the RecordingData folder, used to find the file of this recording, by default None
+    monitor : streaming.SteadinessMonitor, optional
+        If given (together with recordings), the recording is followed while it is written and
+        stopped as soon as the steadiness criteria are met, by default None
+
+    Returns
+    -------
+    str
+        Path of the recorded CSV file (None if no index is given or the file was not found)
     '''
     eklipse_window.wrapper_object().set_focus()
     act_record_time = min(recording_time, sp.MAX_RECORDING_TIME)
-    eklipse_window.child_window(auto_id="RecordingButton").click()
+    if recordings is not None:
+        recordings.mark()
+    handles(eklipse_window)["RecordingButton"].click()
     print("Recording data... (recording time: " + str(act_record_time), "s)")
-    time.sleep(act_record_time)
-    eklipse_window.child_window(auto_id="RecordingButton").click()
+    if monitor is None or recordings is None:
+        sleep(act_record_time)
+    else:
+        end_time = clock() + act_record_time
+        try:
+            while clock() < end_time:
+                sleep(min(cp.STREAMING_POLL_INTERVAL, max(end_time - clock(), 0)))
+                if monitor.tail is None:
+                    file_path = recordings.recording_since_mark()
+                    if file_path is not None:
+                        monitor.follow(file_path)
+                        set_live_recording(monitor.tail)
+                if monitor.poll() is not None:
+                    print("Readings settled after " + str(monitor.settle_time) + " s, ending recording")
+                    break
+        finally:
+            set_live_recording(None)
+    handles(eklipse_window)["RecordingButton"].click()
     print("Recorded OK")
+    if recordings is not None:
+        return recordings.recording_since_mark(timeout=RECORDING_FILE_TIMEOUT)
+    return None
+
+
+def set_live_recording(recording):
+    '''Sets the recording read_parameters can take recorded signals from (None when not recording)
+
+    Parameters
+    ----------
+    recording : streaming.RecordingTail
+        Recording that is being written
+    '''
+    global live_recording
+    live_recording = recording
 
 
 def record_toggle(eklipse_window: WindowSpecification):
@@ -591,4 +947,4 @@ def record_toggle(eklipse_window: WindowSpecification):
         Application window in connected state
     '''
     eklipse_window.wrapper_object().set_focus()
-    eklipse_window.child_window(auto_id="RecordingButton").click()
+    handles(eklipse_window)["RecordingButton"].click()
@@ -0,0 +1,109 @@
+'''
+Process-wide MongoDB client registry.
+MongoClient objects hold a connection pool and monitoring threads, so one client is shared by all
+validators and analysis scripts in a process instead of constructing a new one per Validator. Clients
+are created lazily (no connection until the first operation) with the pool size, timeouts and write
+concern from campaign_parameters. Collection handles come with the indexes used by the common queries
+(series ID, campaign code, date, settled flag), created once per collection on first use.
+'''
+
+import threading
+from pymongo import MongoClient, IndexModel, ASCENDING
+from pymongo.errors import PyMongoError
+import campaign_parameters as cp
+
+INDEXES = [
+    IndexModel([("Series ID", ASCENDING)]),
+    IndexModel([("Campaign code", ASCENDING), ("Date", ASCENDING)]),
+    IndexModel([("Date", ASCENDING)]),
+    IndexModel([("Settled", ASCENDING)])
+]
+
+_clients = {}
+_indexed_collections = set()
+_lock = threading.Lock()
+
+
+def get_client(uri: str = cp.DB_URI, **options) -> MongoClient:
+    '''Shared client for the given URI and options
+
+    Parameters
+    ----------
+    uri : str, optional
+        MongoDB connection string, by default cp.DB_URI
+    **options
+        MongoClient options overriding the campaign defaults
+
+    Returns
+    -------
+    MongoClient
+        Client shared by all callers with the same URI and options
+    '''
+    settings = {
+        "maxPoolSize": cp.DB_MAX_POOL_SIZE,
+        "serverSelectionTimeoutMS": cp.DB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": cp.DB_CONNECT_TIMEOUT_MS,
+        "w": cp.DB_WRITE_CONCERN,
+        "connect": False,
+        **options
+    }
+    key = (uri, tuple(sorted(settings.items())))
+    with _lock:
+        if key not in _clients:
+            _clients[key] = MongoClient(uri, **settings)
+        return _clients[key]
+
+
+def get_collection(database: str = cp.DB_NAME, collection: str = cp.DB_COLLECTION, client: MongoClient = None):
+    '''Collection handle on the shared client (no connection is made until it is used)
+
+    Parameters
+    ----------
+    database : str, optional
+        Database name, by default cp.DB_NAME
+    collection : str, optional
+        Collection name, by default cp.DB_COLLECTION
+    client : MongoClient, optional
+        Client to use, by default the shared client from get_client()
+
+    Returns
+    -------
+    Collection
+    '''
+    if client is None:
+        client = get_client()
+    return client[database][collection]
+
+
+def ensure_indexes(collection) -> bool:
+    '''Create the query indexes on a collection, once per process
+
+    Parameters
+    ----------
+    collection : Collection
+
+    Returns
+    -------
+    bool
+        True if the indexes exist, False if the database could not be reached (try again later)
+    '''
+    key = (id(collection.database.client), collection.database.name, collection.name)
+    if key in _indexed_collections:
+        return True
+    try:
+        collection.create_indexes(INDEXES)
+    except PyMongoError as e:
+        print("    Could not create database indexes: ", type(e).__name__)
+        return False
+    with _lock:
+        _indexed_collections.add(key)
+    return True
+
+
+def close_all():
+    '''Close all shared clients'''
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _indexed_collections.clear()
@@ -0,0 +1,115 @@
+'''
+Document formats for storing recorded time series in the database.
+In the "lists" format every column of the recording is stored as a list of numbers next to the metadata,
+which BSON encodes as one boxed value per sample. In the "columnar" format the time series are stored
+as packed little-endian binary arrays in a single "Time series" field, optionally zlib compressed:
+
+    "Time series": {"Format": "columnar", "Rows": n, "Compression": None or "zlib",
+                    "Dtypes": {column: "<f4", ...}, "Columns": {column: Binary, ...}}
+
+load_time_series reads either format back as NumPy arrays; uncompressed columns are returned as
+read-only views on the document buffers without copying.
+'''
+
+import zlib
+import numpy as np
+from bson.binary import Binary
+
+FORMAT_LISTS = "lists"
+FORMAT_COLUMNAR = "columnar"
+TIME_SERIES_FIELD = "Time series"
+
+
+def column_dtype(column: str, dtype=np.float32) -> np.dtype:
+    '''Storage dtype of a column: time stamps and QCM frequencies always keep float64 precision'''
+    if column == "Time Stamp" or 'QCM' in column:
+        return np.dtype('<f8')
+    return np.dtype(dtype).newbyteorder('<')
+
+
+def pack_time_series(df, dtype=np.float32, compression: str = None) -> dict:
+    '''
+    Packs the columns of a processed recording into binary arrays
+
+    Parameters
+    ----------
+    df: processed dataframe with experiment data
+    dtype: storage dtype of the measured columns (float32 or float64)
+    compression: None or "zlib"
+
+    Returns
+    -------
+    fields: dict with the "Time series" field, to be merged into the database document
+    '''
+    if compression not in (None, "zlib"):
+        raise ValueError("Unknown compression: " + str(compression))
+
+    dtypes = {}
+    columns = {}
+    for column in df.columns:
+        stored_dtype = column_dtype(column, dtype)
+        buffer = np.ascontiguousarray(df[column].to_numpy(), dtype=stored_dtype).tobytes()
+        if compression == "zlib":
+            buffer = zlib.compress(buffer, 1)
+        dtypes[column] = stored_dtype.str
+        columns[column] = Binary(buffer)
+
+    return {TIME_SERIES_FIELD: {
+        "Format": FORMAT_COLUMNAR,
+        "Rows": len(df),
+        "Compression": compression,
+        "Dtypes": dtypes,
+        "Columns": columns
+    }}
+
+
+def time_series_fields(df, storage_format: str = FORMAT_LISTS, dtype=np.float32, compression: str = None) -> dict:
+    '''
+    Time series fields of a database document in the given storage format
+
+    Parameters
+    ----------
+    df: processed dataframe with experiment data
+    storage_format: "lists" (one list per column) or "columnar" (packed binary arrays), by default "lists"
+    dtype: storage dtype of the measured columns in the columnar format
+    compression: None or "zlib", for the columnar format
+
+    Returns
+    -------
+    fields: dict to be merged into the database document
+    '''
+    if storage_format == FORMAT_LISTS:
+        return df.to_dict('list')
+    if storage_format == FORMAT_COLUMNAR:
+        return pack_time_series(df, dtype, compression)
+    raise ValueError("Unknown storage format: " + str(storage_format))
+
+
+def load_time_series(doc: dict, columns: list[str] = None) -> dict:
+    '''
+    Loads the time series of a database document in either storage format
+
+    Parameters
+    ----------
+    doc: document as returned by the database
+    columns: columns to load, by default all (columnar format) or all list-valued fields (lists format)
+
+    Returns
+    -------
+    time_series: dict of column name -> NumPy array (read-only views for uncompressed columnar documents)
+    '''
+    if TIME_SERIES_FIELD in doc:
+        time_series = doc[TIME_SERIES_FIELD]
+        if columns is None:
+            columns = list(time_series["Columns"])
+        arrays = {}
+        for column in columns:
+            buffer = time_series["Columns"][column]
+            if time_series["Compression"] == "zlib":
+                buffer = zlib.decompress(buffer)
+            arrays[column] = np.frombuffer(buffer, dtype=time_series["Dtypes"][column])
+        return arrays
+
+    if columns is None:
+        columns = [key for key, value in doc.items() if isinstance(value, list)]
+    return {column: np.asarray(doc[column], dtype=np.float64) for column in columns}
@@ -0,0 +1,659 @@
+'''
+In-process simulator of the sputter system and of the eKLipse GUI, so whole series can be run and tested
+without Windows, eKLipse or pywinauto. Select it with cp.EKLIPSE_BACKEND = "simulator" (or the
+BEA_EKLIPSE_BACKEND environment variable).
+
+The simulation replaces pywinauto, not control_eklipse: SimulatedEklipse is the application window, with
+the controls control_eklipse uses (tabs, the signal combo box, the Actual and Request fields, the recipe
+buttons, the Recording Setup panel and the recording button), and SimulatedDesktop finds the Recipe Monitor
+window and popups. The functions of this module are those of control_eklipse, running on the simulated
+window with the simulated clock (control_eklipse.use_backend), so the signal cache, the UI navigator,
+read_parameters, verify_parameter, the blue light detection and the threaded recipe monitor are the ones
+of the real system. Only start_eklipse, connect_to_instance_of_eklipse, sleep and operate_target_shutter
+are replaced.
+
+The process model is simple:
+- power outputs ramp to their setpoints at cp.RAMP_RATES once a target is ignited
+- the capman pressure follows its setpoint, and plasma voltages settle to a power and pressure dependent
+  value (cp.PRESPUTT_VS at the presputter conditions), both with a first order lag
+- readings carry gaussian measurement noise from a seeded generator
+- recipes run through timed steps and drive the stack light (steady blue while running, flashing with
+  cp.BLUE_FLASH_PERIOD when paused)
+- while recording, the recorded signals are written to RECORDING_PATH in the RecordingData CSV format
+  (recording_reader.write_recording) as the simulated time passes
+Time is simulated by a SimulatedClock, cp.SIMULATOR_SPEED times faster than real time, or without any
+waiting if the speed is None. Without waiting, a run is deterministic for a given cp.SIMULATOR_SEED.
+'''
+
+import math
+import os
+import time
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import system_parameters as sp
+import recording_reader as rr
+import control_eklipse
+from control_eklipse import (READ_FAILED, init_ui_thread, logInToEklipse, go_to_automation_tab,  # noqa: F401
+                             go_to_io_item_editor_tab, start_recipe, check_running_recipe_name,
+                             check_running_recipe_step, resume_paused_recipe, skip_recipe_step,
+                             setup_data_recording, read_parameter, read_parameters, set_parameter,
+                             setpoint_transaction, set_power, set_pressure, check_if_system_ready,
+                             check_stack_light_status, stack_light_changed, sample_recipe_state, recipe_monitor,
+                             record_data, record_toggle)
+from ui_navigator import AUTOMATION_TAB, IO_ITEM_EDITOR_TAB, RECIPE_MONITOR_ID
+
+# folder the simulated recordings are written to
+RECORDING_PATH = cp.SIMULATOR_RECORDING_PATH
+# date and time of the start of a simulation
+START_DATETIME = pd.Timestamp("2024-01-01 08:00:00")
+RECORDING_SETUP_TAB = "Recording Setup"
+
+MAIN_RECIPE_DWELL_TIME = 7200  # s, the main recipes time out after their dwell step
+# button auto_id -> (recipe name shown in the Recipe Monitor, step durations in s)
+RECIPES = {
+    sp.RECIPE_PREPARE: ("Prep for Sputtering", [5, 10]),
+    **{recipe: (recipe, [5, 5]) for recipe in sp.PS_IGNITION_RECIPES},
+    sp.RECIPE_SPUTTER_NO_SAMPLE: (sp.MAIN_RECIPE_NAME_NO_SAMPLE + " Sample)", [2, 2, 2, MAIN_RECIPE_DWELL_TIME, 10]),
+    sp.RECIPE_SPUTTER_SAMPLE: (sp.MAIN_RECIPE_NAME_SAMPLE + " Sample)", [2, 2, 2, 30, MAIN_RECIPE_DWELL_TIME, 10]),
+    sp.RECIPE_END_PROCESS: ("End Process", [10]),
+    sp.RECIPE_VENTLL: ("Vent Load Lock", [30]),
+    sp.RECIPE_PUMPLL: ("Pump Load Lock", [60]),
+    sp.RECIPE_LOAD: ("Load Sample", [20]),
+    sp.RECIPE_UNLOAD: ("Unload Sample", [20])
+}
+
+PRESSURE_TIME_CONSTANT = 2  # s
+VOLTAGE_TIME_CONSTANT = 1.5  # s
+IGNITION_PRESSURE = 25  # mTorr, set by the Prep for Sputtering recipe
+BASE_PRESSURE = 5e-7  # Torr
+QCM_START_FREQUENCY = 6e6  # Hz
+QCM_RATE = 0.02  # Hz per W s of the target in front of the QCM
+# standard deviation of the measurement noise
+NOISE = {"power": 0.1, "voltage": 0.2, "pressure": 0.01, "flow": 0.05, "qcm": 0.5}
+# QCM frequency signals, in the order of the power axes they face
+QCM_SIGNALS = ["PC Source 2 Freq", "PC Source 4 Freq", "PC Source 6 Freq"]
+STACK_LIGHT_SIGNALS = [sp.Check_StackLight_Red, sp.Check_StackLight_Yellow,
+                       sp.Check_StackLight_Green, sp.Check_StackLight_Blue]
+
+# the running simulation, None until start_eklipse
+instance = None
+
+
+class SimulatedClock:
+    def __init__(self, speed: float = None) -> None:
+        '''
+        Initialize a SimulatedClock object
+
+        Parameters
+        ----------
+        speed : float, optional
+            Simulated seconds per real second, by default None (sleeping only advances the simulated time)
+        '''
+        self.speed = speed
+        self.now = 0.0
+        self.real_start = time.monotonic()
+
+    def time(self) -> float:
+        '''Simulated seconds since the start of the simulation'''
+        if self.speed is None:
+            return self.now
+        return (time.monotonic() - self.real_start) * self.speed
+
+    def sleep(self, seconds: float):
+        '''Wait for a number of simulated seconds'''
+        if seconds <= 0:
+            return
+        if self.speed is None:
+            # at least one step of the float, a wait of the remaining 1e-17 s must not stall a polling loop
+            self.now = max(self.now + seconds, math.nextafter(self.now, math.inf))
+        else:
+            time.sleep(seconds / self.speed)
+
+    def sleep_until(self, simulated_time: float):
+        '''Wait until the simulated time has been reached'''
+        self.sleep(simulated_time - self.time())
+
+
+class SimulatedControl:
+    def __init__(self, window, auto_id: str) -> None:
+        '''
+        Initialize a SimulatedControl object, a control of a simulated window found by child_window.
+        It has the pywinauto wrapper methods control_eklipse uses and hands them to its window.
+
+        Parameters
+        ----------
+        window : SimulatedWindow
+            Window of the control
+        auto_id : str
+            auto_id of the control
+        '''
+        self.window = window
+        self.auto_id = auto_id
+
+    def wrapper_object(self):
+        return self
+
+    def exists(self, timeout: float = None) -> bool:
+        return self.window.exists()
+
+    def is_visible(self) -> bool:
+        return self.window.control_visible(self.auto_id)
+
+    def set_focus(self):
+        return self
+
+    def click(self):
+        self.window.on_click(self.auto_id)
+
+    def select(self, item: str):
+        self.window.on_select(self.auto_id, item)
+
+    def selected_text(self) -> str:
+        return self.window.selections.get(self.auto_id)
+
+    def window_text(self) -> str:
+        return self.window.control_text(self.auto_id)
+
+    def get_value(self) -> str:
+        return self.window.control_text(self.auto_id)
+
+    def set_edit_text(self, text: str):
+        self.window.on_edit(self.auto_id, text)
+
+    def set_text(self, text: str):
+        self.window.on_edit(self.auto_id, text)
+
+    def type_keys(self, keys: str):
+        self.window.on_keys(self.auto_id, keys)
+
+
+class SimulatedWindow:
+    def __init__(self, is_open: bool = True) -> None:
+        '''
+        Initialize a SimulatedWindow object, a window of the simulated GUI with the pywinauto window
+        methods control_eklipse uses. Subclasses handle the clicks, selections and keys of the controls.
+
+        Parameters
+        ----------
+        is_open : bool, optional
+            The window exists, by default True
+        '''
+        self.is_open = is_open
+        self.controls = {}  # auto_id -> SimulatedControl
+        self.selections = {}  # auto_id -> item selected in a combo or list box
+
+    def child_window(self, auto_id: str = None, **criteria) -> SimulatedControl:
+        if auto_id not in self.controls:
+            self.controls[auto_id] = SimulatedControl(self, auto_id)
+        return self.controls[auto_id]
+
+    def wrapper_object(self):
+        return self
+
+    def exists(self, timeout: float = None) -> bool:
+        return self.is_open
+
+    def is_visible(self) -> bool:
+        return self.is_open
+
+    def set_focus(self):
+        return self
+
+    def maximize(self):
+        return self
+
+    def type_keys(self, keys: str):
+        self.on_keys(None, keys)
+
+    def control_visible(self, auto_id: str) -> bool:
+        return self.is_open
+
+    def control_text(self, auto_id: str) -> str:
+        return ""
+
+    def on_click(self, auto_id: str):
+        '''A control was clicked'''
+
+    def on_select(self, auto_id: str, item: str):
+        self.selections[auto_id] = item
+
+    def on_edit(self, auto_id: str, text: str):
+        '''The text of a control was replaced'''
+
+    def on_keys(self, auto_id: str, keys: str):
+        '''Keys were typed into a control (auto_id None: into the window)'''
+
+
+class SimulatedRecording:
+    def __init__(self, file_path: str, start: pd.Timestamp, start_time: float, interval: float,
+                 signals: list) -> None:
+        '''
+        Initialize a SimulatedRecording object, a recording being written by SimulatedEklipse
+
+        Parameters
+        ----------
+        file_path : str
+            CSV file the rows are appended to
+        start : pd.Timestamp
+            Date and time of the first sample
+        start_time : float
+            Simulated time of the first sample
+        interval : float
+            Recording interval in seconds
+        signals : list
+            Recorded eKLipse signals
+        '''
+        self.file_path = file_path
+        self.start = start
+        self.start_time = start_time
+        self.interval = interval
+        self.signals = signals
+        self.rows = 0  # rows sampled so far
+        rr.write_recording(file_path, start, [], {signal: [] for signal in signals}, interval)
+
+    def next_time(self) -> float:
+        '''Simulated time of the next sample'''
+        return self.start_time + self.rows * self.interval
+
+    def write(self, rows: list):
+        '''Append sampled rows (lists of values of the recorded signals)'''
+        seconds = np.arange(self.rows - len(rows), self.rows) * self.interval
+        columns = np.array(rows).T
+        rr.write_recording(self.file_path, self.start, seconds,
+                           {signal: columns[index] for index, signal in enumerate(self.signals)},
+                           self.interval, append=True)
+
+
+class SimulatedEklipse(SimulatedWindow):
+    def __init__(self, speed: float = cp.SIMULATOR_SPEED, seed: int = cp.SIMULATOR_SEED) -> None:
+        '''
+        Initialize a SimulatedEklipse object, usually through start_eklipse. It is the process model and
+        the application window of the simulated GUI.
+
+        Parameters
+        ----------
+        speed : float, optional
+            Simulated seconds per real second, None to run without waiting, by default cp.SIMULATOR_SPEED
+        seed : int, optional
+            Seed of the measurement noise, by default cp.SIMULATOR_SEED
+        '''
+        super().__init__()
+        self.clock = SimulatedClock(speed)
+        self.rng = np.random.default_rng(seed)
+        self.time = 0.0  # simulated time the process state is at
+        self.values = {}  # values of set signals (setpoints, valves, shutters, ...)
+        self.ignited = [False] * len(sp.PS_SET_OUTPUT_SIGNALS)
+        self.powers = np.zeros(len(sp.PS_SET_OUTPUT_SIGNALS))
+        self.voltages = np.zeros(len(sp.PS_SET_OUTPUT_SIGNALS))
+        self.pressure = 0.0
+        self.qcm_frequencies = np.full(3, QCM_START_FREQUENCY)
+        self.recipe = None  # button auto_id of the running recipe
+        self.recipe_step = 0  # index of the running step
+        self.step_end = None  # simulated time the running step ends
+        self.paused_remaining = None  # time left of the running step while paused
+        # GUI state
+        self.tab = None  # active tab
+        self.typed = ""  # text typed into the Request field
+        self.recorded_signals = list(rr.RECORDING_COLUMNS)  # recording set, kept from earlier sessions
+        self.recording_interval = cp.RECORDING_INTERVAL_NO_SAMPLE
+        self.setup_signals = []  # recording set being edited in the Recording Setup tab
+        self.setup_interval = self.recording_interval
+        self.recording = None  # SimulatedRecording while recording
+        self.recordings = 0
+        self.recipe_monitor_window = SimulatedRecipeMonitorWindow(self)
+
+    def sleep(self, seconds: float):
+        '''Wait for a number of simulated seconds, the process (and a recording) keeps up with the clock'''
+        self.clock.sleep(seconds)
+        self.advance()
+
+    # process model
+
+    def advance(self, until: float = None):
+        '''Bring the process state to a simulated time, by default the current time of the clock'''
+        until = self.clock.time() if until is None else until
+        rows = []
+        while True:
+            running = self.recipe is not None and self.paused_remaining is None
+            step_end = self.step_end if running else math.inf
+            sample_time = self.recording.next_time() if self.recording is not None else math.inf
+            if step_end <= until and step_end <= sample_time:
+                self._evolve(step_end)
+                self._next_recipe_step()
+            elif sample_time < until:
+                # a sample is taken once its time has passed, so a recording of T seconds has T / interval rows
+                self._evolve(sample_time)
+                rows.append([self.measure(signal) for signal in self.recording.signals])
+                self.recording.rows += 1
+            else:
+                break
+        self._evolve(until)
+        if rows:
+            self.recording.write(rows)
+
+    def _evolve(self, until: float):
+        dt = until - self.time
+        if dt <= 0:
+            return
+        for index, signal in enumerate(sp.PS_SET_OUTPUT_SIGNALS):
+            target = self.values.get(signal, 0) if self.ignited[index] else 0
+            max_change = self._ramp_rate(index) * dt
+            self.powers[index] += np.clip(target - self.powers[index], -max_change, max_change)
+        pressure_setpoint = self.values.get(sp.SET_SPUTTER_PRESSURE, 0) if self.values.get(sp.Check_GasIsoValveOpen) else 0
+        self.pressure += (pressure_setpoint - self.pressure) * (1 - math.exp(-dt / PRESSURE_TIME_CONSTANT))
+        for index in range(len(self.voltages)):
+            target = self._plasma_voltage(index)
+            self.voltages[index] += (target - self.voltages[index]) * (1 - math.exp(-dt / VOLTAGE_TIME_CONSTANT))
+        for axis in range(3):
+            self.qcm_frequencies[axis] -= QCM_RATE * self.powers[cp.POWER_SUPPLIES[axis]-1] * dt
+        self.time = until
+
+    @staticmethod
+    def _axis(index: int) -> int:
+        '''Power axis (0-2) of a power supply index, None if the supply is not used in the campaign'''
+        axes = [axis for axis in range(3) if cp.POWER_SUPPLIES[axis]-1 == index]
+        return axes[0] if axes else None
+
+    def _ramp_rate(self, index: int) -> float:
+        axis = self._axis(index)
+        return cp.RAMP_RATES[axis] if axis is not None else 10
+
+    def _plasma_voltage(self, index: int) -> float:
+        '''Steady voltage of a target: cp.PRESPUTT_VS at the presputter power and pressure'''
+        power = self.powers[index]
+        if not self.ignited[index] or power <= 0:
+            return 0.0
+        axis = self._axis(index)
+        reference_voltage = cp.PRESPUTT_VS[axis] if axis is not None else 300
+        reference_power = cp.PRESPUTT_PARAMS[axis] if axis is not None else 50
+        pressure = max(self.pressure, 0.5)
+        return reference_voltage * math.sqrt(power / reference_power) * (cp.PRESPUTT_PARAMS[3] / pressure) ** 0.1
+
+    def measure(self, signal: str) -> float:
+        '''Current (noisy) reading of a signal'''
+        if signal in sp.PS_READ_POWER_SIGNALS:
+            return self._noisy(self.powers[sp.PS_READ_POWER_SIGNALS.index(signal)], "power")
+        if signal in sp.PS_READ_VOLTAGE_SIGNALS:
+            return self._noisy(self.voltages[sp.PS_READ_VOLTAGE_SIGNALS.index(signal)], "voltage")
+        if signal == "PC Capman Pressure":
+            return self._noisy(self.pressure, "pressure")
+        if signal == sp.ACT_FLOW_RATE:
+            return self._noisy(4 * self.pressure, "flow")
+        if signal in QCM_SIGNALS:
+            return self.qcm_frequencies[QCM_SIGNALS.index(signal)] + self.rng.normal(0, NOISE["qcm"])
+        if signal == sp.BASE_PRESSURE:
+            return BASE_PRESSURE
+        if signal in STACK_LIGHT_SIGNALS:
+            return self._stack_lights()[signal]
+        return self.values.get(signal, 0)
+
+    def _noisy(self, value: float, kind: str) -> float:
+        # nothing to measure without plasma or gas
+        if value == 0:
+            return 0.0
+        return max(value + self.rng.normal(0, NOISE[kind]), 0.0)
+
+    def _stack_lights(self) -> dict:
+        blue = 0
+        if self.recipe is not None:
+            # paused: the blue light flashes with cp.BLUE_FLASH_PERIOD
+            blue = 1 if self.paused_remaining is None else int(self.time / (cp.BLUE_FLASH_PERIOD / 2)) % 2
+        return {sp.Check_StackLight_Red: 0, sp.Check_StackLight_Yellow: 0,
+                sp.Check_StackLight_Green: 1, sp.Check_StackLight_Blue: blue}
+
+    def write(self, signal: str, value):
+        '''Set a signal'''
+        self.advance()
+        self.values[signal] = value
+
+    def datetime(self) -> pd.Timestamp:
+        '''Date and time of the current simulated time'''
+        return START_DATETIME + pd.Timedelta(seconds=self.clock.time())
+
+    # recipes
+
+    def start_recipe(self, recipe: str) -> bool:
+        '''Start a recipe, as its button in the Automation tab does'''
+        self.advance()
+        if self.recipe is not None or recipe not in RECIPES:
+            return False
+        self.recipe = recipe
+        self.recipe_step = 0
+        self.step_end = self.time + RECIPES[recipe][1][0]
+        self.paused_remaining = None
+        return True
+
+    def _next_recipe_step(self):
+        self.recipe_step += 1
+        steps = RECIPES[self.recipe][1]
+        if self.recipe_step < len(steps):
+            self.step_end += steps[self.recipe_step]
+            return
+        finished, self.recipe = self.recipe, None
+        self.step_end = None
+        self._finish_recipe(finished)
+
+    def _finish_recipe(self, recipe: str):
+        '''State the process is left in by a recipe'''
+        if recipe == sp.RECIPE_PREPARE:
+            self.values[sp.Check_GasIsoValveOpen] = 1
+            self.values[sp.SET_SPUTTER_PRESSURE] = IGNITION_PRESSURE
+        elif recipe in sp.PS_IGNITION_RECIPES:
+            index = sp.PS_IGNITION_RECIPES.index(recipe)
+            axis = self._axis(index)
+            self.ignited[index] = True
+            self.values[sp.PS_STATUS_SIGNALS[index]] = 1
+            self.values[sp.PS_SET_OUTPUT_SIGNALS[index]] = cp.PRESPUTT_PARAMS[axis] if axis is not None else 50
+        elif recipe in (sp.RECIPE_SPUTTER_NO_SAMPLE, sp.RECIPE_SPUTTER_SAMPLE, sp.RECIPE_END_PROCESS):
+            self.ignited = [False] * len(self.ignited)
+            for signal in sp.PS_SET_OUTPUT_SIGNALS + sp.PS_STATUS_SIGNALS:
+                self.values[signal] = 0
+            self.values[sp.Check_GasIsoValveOpen] = 0
+            self.values[sp.SET_SPUTTER_PRESSURE] = 0
+            self.values["PC Start Process"] = 0
+
+    def pause_recipe(self):
+        '''Pause the running recipe, as an operator or an interlock would'''
+        self.advance()
+        if self.recipe is not None and self.paused_remaining is None:
+            self.paused_remaining = self.step_end - self.time
+
+    def resume_recipe(self) -> bool:
+        '''Resume a paused recipe'''
+        self.advance()
+        if self.paused_remaining is None:
+            return False
+        self.step_end = self.time + self.paused_remaining
+        self.paused_remaining = None
+        return True
+
+    def skip_recipe_step(self) -> bool:
+        '''End the running step of the recipe now'''
+        self.advance()
+        if self.recipe is None:
+            return False
+        if self.paused_remaining is not None:
+            self.paused_remaining = 0
+        else:
+            self.step_end = self.time
+            self.advance(self.time)
+        return True
+
+    # GUI
+
+    def control_visible(self, auto_id: str) -> bool:
+        if auto_id == sp.CHOOSE_SIGNAL_BOX_ID:
+            # the signal combo box is only shown in the IO Item Editor
+            return self.tab == IO_ITEM_EDITOR_TAB
+        return auto_id != "LogInPanel"
+
+    def control_text(self, auto_id: str) -> str:
+        signal = self.selections.get(sp.CHOOSE_SIGNAL_BOX_ID)
+        if signal is None:
+            return ""
+        self.advance()
+        if auto_id == "Actual":
+            return format(self.measure(signal), 'g')
+        if auto_id == sp.REQUEST_EDIT_BOX_ID:
+            return format(self.values.get(signal, 0), 'g')
+        return ""
+
+    def on_click(self, auto_id: str):
+        if auto_id in (AUTOMATION_TAB, IO_ITEM_EDITOR_TAB, RECORDING_SETUP_TAB):
+            self.tab = auto_id
+        elif auto_id in RECIPES:
+            if not self.start_recipe(auto_id):
+                print("    Simulator: recipe " + auto_id + " was not started (another recipe is running)")
+        elif auto_id == "Monitor":
+            self.recipe_monitor_window.is_open = True
+        elif auto_id == "RecordingButton":
+            self.toggle_recording()
+        elif auto_id == "RemoveAll":
+            self.setup_signals = []
+        elif auto_id == "cmdUseSelectedSet":
+            if self.selections.get("ListViewSavedSets") == sp.BASIC_PARAMETER_SET:
+                self.setup_signals += list(sp.BASIC_PARAMETERS_TS)
+        elif auto_id == "Add":
+            self.setup_signals.append(self.selections.get("ListBoxAvailableSignals"))
+        elif auto_id == "Generate":
+            self.recorded_signals = list(dict.fromkeys(self.setup_signals))
+            self.recording_interval = self.setup_interval
+
+    def on_edit(self, auto_id: str, text: str):
+        if auto_id == sp.REQUEST_EDIT_BOX_ID:
+            self.typed = text
+
+    def on_keys(self, auto_id: str, keys: str):
+        if auto_id == sp.REQUEST_EDIT_BOX_ID:
+            enter = keys.endswith("{ENTER}")
+            self.typed += keys[:-len("{ENTER}")] if enter else keys
+            if enter:
+                # the Request field writes the typed value to the selected signal
+                typed, self.typed = self.typed, ""
+                try:
+                    value = float(typed)
+                except ValueError:
+                    return
+                self.write(self.selections.get(sp.CHOOSE_SIGNAL_BOX_ID), int(value) if value.is_integer() else value)
+        elif auto_id == "RecordingInterval":
+            self.setup_interval = float(keys)
+
+    def toggle_recording(self):
+        '''Start or stop recording, as the recording button does'''
+        self.advance()
+        if self.recording is not None:
+            self.recording = None
+            return
+        os.makedirs(RECORDING_PATH, exist_ok=True)
+        self.recordings += 1
+        start = self.datetime()
+        file_path = os.path.join(RECORDING_PATH, "Recording_" + "{:05d}".format(self.recordings) + "_"
+                                 + start.strftime('%Y%m%d_%H%M%S') + ".csv")
+        self.recording = SimulatedRecording(file_path, start, self.time, self.recording_interval,
+                                            self.recorded_signals)
+
+
+class SimulatedRecipeMonitorWindow(SimulatedWindow):
+    def __init__(self, eklipse: SimulatedEklipse) -> None:
+        '''
+        Initialize a SimulatedRecipeMonitorWindow object, the Recipe Monitor window opened by the Monitor button
+
+        Parameters
+        ----------
+        eklipse : SimulatedEklipse
+            Simulated application
+        '''
+        super().__init__(is_open=False)
+        self.eklipse = eklipse
+
+    def control_text(self, auto_id: str) -> str:
+        eklipse = self.eklipse
+        eklipse.advance()
+        if auto_id == "NameOfRecipe":
+            return RECIPES[eklipse.recipe][0] if eklipse.recipe is not None else ""
+        if auto_id == "StepNumber":
+            # 1-based, 0 if no recipe is running
+            return str(eklipse.recipe_step + 1 if eklipse.recipe is not None else 0)
+        return ""
+
+    def on_click(self, auto_id: str):
+        if auto_id == "ResumeRecipe":
+            self.eklipse.resume_recipe()
+        elif auto_id == "SkipRecipeStep":
+            self.eklipse.skip_recipe_step()
+
+
+class SimulatedDesktop:
+    def __init__(self, eklipse: SimulatedEklipse) -> None:
+        '''
+        Initialize a SimulatedDesktop object, the pywinauto Desktop of the simulated GUI
+
+        Parameters
+        ----------
+        eklipse : SimulatedEklipse
+            Simulated application
+        '''
+        self.eklipse = eklipse
+
+    def window(self, auto_id: str = None, **criteria) -> SimulatedWindow:
+        '''The Recipe Monitor window, or a popup (message boxes are accepted by any key)'''
+        if auto_id == RECIPE_MONITOR_ID:
+            return self.eklipse.recipe_monitor_window
+        return SimulatedWindow()
+
+
+# the functions of control_eklipse that do not go through the GUI
+
+def start_eklipse() -> SimulatedEklipse:
+    '''Starts a new simulation, and runs control_eklipse on its GUI and clock
+
+    Returns
+    -------
+    SimulatedEklipse
+        Simulated application window, passed as eklipse_window to the other functions
+    '''
+    global instance
+    instance = SimulatedEklipse(cp.SIMULATOR_SPEED, cp.SIMULATOR_SEED)
+    control_eklipse.use_backend(SimulatedDesktop(instance), instance.clock.time, instance.sleep)
+    return instance
+
+
+def connect_to_instance_of_eklipse() -> SimulatedEklipse:
+    '''Connect to the running simulation
+
+    Returns
+    -------
+    SimulatedEklipse
+        Simulated application window
+
+    Raises
+    ------
+    RuntimeError
+        If no simulation was started
+    '''
+    if instance is None:
+        raise RuntimeError("eKLipse simulator is not running")
+    return instance
+
+
+def sleep(seconds: float):
+    '''Waits for the process, in simulated time
+
+    Parameters
+    ----------
+    seconds : float
+        Simulated time to wait
+    '''
+    if instance is None:
+        time.sleep(seconds)
+    else:
+        instance.sleep(seconds)
+
+
+def operate_target_shutter(eklipse_window: SimulatedEklipse, state: str, power_axis: int):
+    '''Open or close a single target shutter (power_axis 1-3), through control_eklipse.set_parameter
+    (control_eklipse.operate_target_shutter uses shutter signals system_parameters does not define)'''
+    ps = cp.POWER_SUPPLIES[power_axis-1]
+    set_parameter(eklipse_window, 1 if state == "open" else 0, "Power Supply " + str(ps) + " Shutter Open")
+    print("    PS" + str(ps) + " shutter " + ("opened" if state == "open" else "closed"))
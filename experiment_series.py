@@ -4,7 +4,8 @@ import datetime
 
 
 class ExperimentSeries:
-    def __init__(self, samples: bool, base_pressure: str, do_presputter: bool):
+    def __init__(self, samples: bool, base_pressure: str, do_presputter: bool, algorithm: str = "Random",
+                 series_ID: str = None):
         '''Initialize ExperimentSeries object
 
         Parameters
@@ -15,6 +16,10 @@ class ExperimentSeries:
             Base pressure in the sputtering chamber
         do_presputter : bool
             Do presputter
+        algorithm : str, optional
+            Name of the algorithm planning the recipes, by default "Random"
+        series_ID : str, optional
+            Series ID already allocated, by default None to allocate the next one (wc.get_next_series_id)
         '''
         self.samples = samples
         self.sources_ignited = False
@@ -24,8 +29,9 @@ class ExperimentSeries:
         self.recipe = []
         self.substrate_ID = "No substrate"
         self.series_description = ""
-        self.series_ID = wc.get_next_series_id()
+        self.series_ID = series_ID if series_ID is not None else wc.get_next_series_id()
         self.base_pressure = base_pressure
+        self.algorithm = algorithm
         self.date_time_string = str(datetime.datetime.now())
 
         self.promt_series_description()
@@ -53,7 +59,7 @@ class ExperimentSeries:
             "Pre-sputter description": "no presputtering",
             "Series start date/time": self.date_time_string,
             "Base pressure (start) [Torr]": self.base_pressure,
-            "SDL algorithm": "Random"
+            "SDL algorithm": self.algorithm
         }
         return series_metadata
 
@@ -0,0 +1,163 @@
+'''
+Asyncio orchestration of a series.
+perform_series used to run the stages of a step one after the other: ramp to the setpoints, record for the
+dwell time, then read and validate the recording and store the result before the next ramp could start,
+and the next recipe was only computed at the start of a run. SeriesPipeline lets these stages overlap.
+Everything that uses eKLipse runs on a single executor thread in the order it is awaited, so the UI
+automation stays serialized. Validation (CSV parsing, statistics, database writes) and recipe planning run
+on a worker pool while the next step ramps and dwells, so the cycle time of a step approaches its ramp
+plus dwell time. Only algorithms that learn from the validated steps (with an observe method) wait for the
+pending validations before planning, the others plan at once, as do algorithms that set waits_for_results
+to False because they plan from the steps validated so far (planning_service.PlanningService). At most max_pending recorded steps wait for validation; beyond that the series waits, so
+a slow database holds the series back instead of queueing recordings without limit.
+'''
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+import campaign_parameters as cp
+
+UI = "eKLipse control"
+VALIDATION = "validation"
+PLANNING = "planning"
+
+
+def waits_for_results(algorithm) -> bool:
+    '''If recipes of the algorithm are planned after the pending validations: algorithms that learn from
+    the results (observe method) unless they set waits_for_results to False'''
+    return getattr(algorithm, "waits_for_results", hasattr(algorithm, "observe"))
+
+
+class SeriesPipeline:
+    def __init__(self, ui_thread_init=None, workers: int = cp.PIPELINE_WORKERS,
+                 max_pending: int = cp.PIPELINE_MAX_PENDING) -> None:
+        '''
+        Initialize a SeriesPipeline object, used from a running event loop
+
+        Parameters
+        ----------
+        ui_thread_init : callable, optional
+            Called once in the UI thread before the first call (e.g. control_eklipse.init_ui_thread), by default None
+        workers : int, optional
+            Threads for validation and planning, by default cp.PIPELINE_WORKERS
+        max_pending : int, optional
+            Validations that may run behind the series, 0 to validate every step before the next one
+            and to plan recipes only when they are needed, by default cp.PIPELINE_MAX_PENDING
+        '''
+        self.ui_executor = ThreadPoolExecutor(1, thread_name_prefix="eKLipse-UI", initializer=ui_thread_init)
+        self.work_executor = ThreadPoolExecutor(max(workers, 1), thread_name_prefix="pipeline")
+        self.max_pending = max_pending
+        self.pending = set()  # validation tasks not finished
+        self.planning = None  # task computing the next recipe
+        self.busy = {UI: 0.0, VALIDATION: 0.0, PLANNING: 0.0}  # seconds spent per stage
+        self.started = time.monotonic()
+
+    async def ui(self, function, *args, **kwargs):
+        '''Run a function that uses eKLipse on the UI thread and return its result'''
+        return await self._run(self.ui_executor, UI, function, *args, **kwargs)
+
+    async def work(self, function, *args, stage: str = VALIDATION, **kwargs):
+        '''Run a function on the worker pool and return its result'''
+        return await self._run(self.work_executor, stage, function, *args, **kwargs)
+
+    async def validate(self, function, *args, report=None):
+        '''
+        Validate a recorded step behind the series
+
+        Parameters
+        ----------
+        function : callable
+            Validation function, e.g. Validator.validate, called with args on the worker pool
+        args
+            Arguments of the function (pass a copy of mutable metadata, the series goes on changing it)
+        report : callable, optional
+            Called on the event loop with the result of the validation, None if it raised, by default None
+        '''
+        if self.max_pending <= 0:
+            await self._validate(function, args, report)
+            return
+        while len(self.pending) >= self.max_pending:
+            await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+        task = asyncio.get_running_loop().create_task(self._validate(function, args, report))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def drain(self):
+        '''Wait for all pending validations'''
+        while self.pending:
+            await asyncio.wait(set(self.pending))
+
+    def plan_ahead(self, function, *args):
+        '''
+        Start computing the next recipe while the series goes on, after the pending validations if the
+        algorithm waits for their results (see waits_for_results)
+
+        Parameters
+        ----------
+        function : callable
+            Recipe algorithm, e.g. algorithms.generate_random_parameters, called with args on the worker pool
+        '''
+        if self.max_pending <= 0:
+            return
+        self.planning = asyncio.get_running_loop().create_task(self._plan(function, args))
+
+    async def next_recipe(self, function, *args):
+        '''
+        The recipe started by plan_ahead, or one computed now if none was started
+
+        Parameters
+        ----------
+        function : callable
+            Recipe algorithm, called with args if no recipe was planned ahead
+
+        Returns
+        -------
+        Recipe returned by the algorithm
+        '''
+        planning, self.planning = self.planning, None
+        if planning is not None:
+            return await planning
+        return await self._plan(function, args)
+
+    async def close(self):
+        '''Wait for pending validations and planning, then stop the executor threads'''
+        await self.drain()
+        if self.planning is not None:
+            self.planning.cancel()
+            self.planning = None
+        self.ui_executor.shutdown(wait=True)
+        self.work_executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        '''Busy time per stage and wall time in seconds since the pipeline was created'''
+        return {**self.busy, "wall": time.monotonic() - self.started}
+
+    def report(self):
+        '''Prints the busy time per stage; their sum above the wall time is the time saved by overlapping'''
+        stats = self.stats()
+        print("    " + ", ".join(stage + " " + str(round(seconds, 1)) + " s" for stage, seconds in stats.items()))
+
+    async def _run(self, executor, stage, function, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(function, *args, **kwargs))
+        finally:
+            self.busy[stage] += time.monotonic() - start
+
+    async def _validate(self, function, args, report):
+        try:
+            result = await self.work(function, *args)
+        except Exception as e:
+            print("    Validation failed: ", type(e).__name__, e)
+            result = None
+        if report is not None:
+            report(result)
+        return result
+
+    async def _plan(self, function, args):
+        if waits_for_results(function):
+            # a planner learning from the results needs the steps recorded so far to be validated
+            await self.drain()
+        return await self.work(function, *args, stage=PLANNING)
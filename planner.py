@@ -0,0 +1,249 @@
+'''
+Gaussian-process recipe planner, a drop-in for algorithms.generate_random_parameters in perform_series.
+The planner learns an objective of the validated steps (by default how quickly the process settles) as a
+function of the setpoints, and proposes the setpoints with the highest upper confidence bound among a
+batch of Sobol candidates (algorithms.sample_candidates). The kernel hyperparameters are fixed, so every
+validated step extends the inverse Cholesky factor of the kernel matrix by one row in O(n^2) instead of
+refactorizing it in O(n^3), and planning a step costs one matrix product over the candidates.
+Until enough steps are observed, it hands out the rows of one space-filling Sobol design instead.
+The planner observes the documents stored by the Validator (Validator.add_listener), and can be warm
+started from the documents of earlier series.
+'''
+
+import threading
+import numpy as np
+import campaign_parameters as cp
+import algorithms
+
+SETPOINT_FIELDS = ["Power_Ax1_setpoint_[W]", "Power_Ax2_setpoint_[W]",
+                   "Power_Ax3_setpoint_[W]", "Pressure_setpoint_[mTorr]"]
+
+
+def settling_objective(doc: dict):
+    '''Negative settling time [s] of a stored step, steps that never settled count the whole dwell time'''
+    if doc.get("Settled"):
+        return -float(doc["Settling time"])
+    return -float(doc["Dwell_time_[s]"])
+
+
+class GaussianProcess:
+    def __init__(self, length_scale: float = cp.PLANNER_LENGTH_SCALE, noise: float = cp.PLANNER_NOISE) -> None:
+        '''
+        Gaussian-process regression with a squared exponential kernel of unit variance on standardized
+        observations, updated one observation at a time
+
+        Parameters
+        ----------
+        length_scale : float, optional
+            Kernel length scale in the units of the inputs, by default cp.PLANNER_LENGTH_SCALE
+        noise : float, optional
+            Observation noise variance relative to the variance of the observations, by default cp.PLANNER_NOISE
+        '''
+        self.length_scale = length_scale
+        self.noise = noise
+        self.X = None
+        self.y = np.empty(0)
+        # inverse of the lower Cholesky factor of K(X, X) + noise * I
+        self.L_inv = np.empty((0, 0))
+
+    def __len__(self):
+        return len(self.y)
+
+    def kernel(self, A: np.ndarray, B: np.ndarray) -> np.ndarray:
+        distances = ((A[:, None, :] - B[None, :, :]) ** 2).sum(axis=-1)
+        return np.exp(-0.5 * distances / self.length_scale ** 2)
+
+    def add(self, x: np.ndarray, y: float):
+        '''
+        Adds one observation, extending the inverse Cholesky factor by one row
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Input of the observation
+        y : float
+            Observed value
+        '''
+        x = np.asarray(x, dtype=float)[None, :]
+        if self.X is None:
+            self.X = np.empty((0, x.shape[1]))
+        # [[L, 0], [l, d]] is the Cholesky factor with the new row, its inverse is [[L_inv, 0], [-l L_inv / d, 1 / d]]
+        l = self.L_inv @ self.kernel(self.X, x)[:, 0]
+        d = np.sqrt(max(1 + self.noise - l @ l, 1e-12))
+        n = len(self.y)
+        L_inv = np.zeros((n + 1, n + 1))
+        L_inv[:n, :n] = self.L_inv
+        L_inv[n, :n] = -(l @ self.L_inv) / d
+        L_inv[n, n] = 1 / d
+        self.L_inv = L_inv
+        self.X = np.vstack([self.X, x])
+        self.y = np.append(self.y, y)
+
+    def predict(self, X: np.ndarray) -> tuple:
+        '''
+        Posterior mean and standard deviation
+
+        Parameters
+        ----------
+        X : np.ndarray
+            Inputs, one per row
+
+        Returns
+        -------
+        tuple
+            (mean, std) arrays in the units of the observations
+        '''
+        if not len(self.y):
+            return np.zeros(len(X)), np.ones(len(X))
+        scale = self.y.std() or 1.0
+        offset = self.y.mean()
+        V = self.kernel(X, self.X) @ self.L_inv.T
+        mean = V @ (self.L_inv @ ((self.y - offset) / scale))
+        variance = np.maximum(1 - (V ** 2).sum(axis=1), 0)
+        return offset + scale * mean, scale * np.sqrt(variance)
+
+    def copy(self):
+        gp = GaussianProcess(self.length_scale, self.noise)
+        gp.X, gp.y, gp.L_inv = self.X, self.y, self.L_inv
+        return gp
+
+
+class GaussianProcessPlanner:
+    name = "Gaussian process (UCB)"
+
+    def __init__(self, objective=settling_objective, steps: int = 1, initial_runs: int = cp.PLANNER_INITIAL_RUNS,
+                 candidates: int = cp.PLANNER_CANDIDATES, beta: float = cp.PLANNER_UCB_BETA,
+                 seed: int = cp.PLANNER_SEED) -> None:
+        '''
+        Initialize a GaussianProcessPlanner object, used as the algorithm of perform_series
+
+        Parameters
+        ----------
+        objective : callable, optional
+            Value to maximize of a stored document, or None to ignore the document, by default settling_objective
+        steps : int, optional
+            Steps per planned recipe, by default 1
+        initial_runs : int, optional
+            Observed steps before leaving the initial Sobol design, by default cp.PLANNER_INITIAL_RUNS
+        candidates : int, optional
+            Candidate setpoints scored per planned step, by default cp.PLANNER_CANDIDATES
+        beta : float, optional
+            Weight of the predicted standard deviation in the upper confidence bound, by default cp.PLANNER_UCB_BETA
+        seed : int, optional
+            Seed of the candidates, by default cp.PLANNER_SEED
+        '''
+        self.objective = objective
+        self.steps = steps
+        self.initial_runs = initial_runs
+        self.candidates = candidates
+        self.beta = beta
+        self.rng = np.random.default_rng(seed)
+        # the initial design is generated from its own seed, so snapshots of the planner hand out the same rows
+        self.design_seed = int(self.rng.integers(2 ** 63))
+        self.designs = {}  # initial design per mask of active axes
+        self.gp = GaussianProcess()
+        # setpoints are scaled by the limits of all axes, so inactive axes (0 W) keep one place in the inputs
+        self.lower, self.upper = algorithms.parameter_limits(np.array([True, True, True]))
+        # observations arrive from the validation threads
+        self.lock = threading.Lock()
+
+    def __call__(self, power_axes: np.array) -> list:
+        '''
+        Plans the next recipe
+
+        Parameters
+        ----------
+        power_axes : np.array
+            Active power axes
+
+        Returns
+        -------
+        list
+            Recipe of Python ints, one [power1, power2, power3, pressure, recording_time] list per step
+        '''
+        with self.lock:
+            gp = self.gp.copy()
+        if len(gp) < self.initial_runs:
+            # the next rows of one space-filling Sobol design, one row per observed step
+            design = self.initial_design(power_axes)
+            return design[len(gp):len(gp) + self.steps].tolist()
+
+        recipe = []
+        for _ in range(self.steps):
+            candidates = algorithms.sample_candidates(
+                self.candidates, power_axes, method=algorithms.SOBOL, rng=self.rng)[:, 0]
+            x = self.scale(candidates)
+            mean, std = gp.predict(x)
+            best = int(np.argmax(mean + self.beta * std))
+            recipe.append(candidates[best].tolist())
+            # the following steps of the recipe assume the predicted result of this one
+            gp.add(x[best], mean[best])
+        return recipe
+
+    def initial_design(self, power_axes: np.array) -> np.ndarray:
+        '''
+        Setpoints of the initial design: initial_runs points of one Sobol sequence (one random shift), and
+        steps - 1 more so that the last initial recipe is complete
+
+        Parameters
+        ----------
+        power_axes : np.array
+            Active power axes
+
+        Returns
+        -------
+        np.ndarray
+            Integer array of shape (initial_runs + steps - 1, 5)
+        '''
+        key = tuple(bool(axis) for axis in power_axes)
+        if key not in self.designs:
+            self.designs[key] = algorithms.sample_candidates(
+                self.initial_runs + self.steps - 1, power_axes, method=algorithms.SOBOL,
+                rng=np.random.default_rng(self.design_seed))[:, 0]
+        return self.designs[key]
+
+    def __getstate__(self):
+        # snapshots for planning in another process (planning_service.py), each with its own candidates
+        with self.lock:
+            state = {**self.__dict__, "gp": self.gp.copy(), "rng": self.rng.spawn(1)[0]}
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def observe(self, doc: dict):
+        '''
+        Adds a stored step to the surrogate model (e.g. as listener of Validator.add_listener)
+
+        Parameters
+        ----------
+        doc : dict
+            Document of a validated step, with its setpoints and the fields read by the objective
+        '''
+        try:
+            setpoints = [doc[field] for field in SETPOINT_FIELDS]
+            value = self.objective(doc)
+        except (KeyError, TypeError, ValueError):
+            return
+        if value is None or not np.isfinite(value):
+            return
+        with self.lock:
+            self.gp.add(self.scale(np.array(setpoints)), value)
+
+    def load(self, documents):
+        '''
+        Warm start from stored steps, e.g. dc.get_collection(cp.DB_NAME, cp.DB_COLLECTION).find(query)
+
+        Parameters
+        ----------
+        documents : iterable
+            Documents of validated steps
+        '''
+        for doc in documents:
+            self.observe(doc)
+
+    def scale(self, setpoints: np.ndarray) -> np.ndarray:
+        '''Setpoints [power1, power2, power3, pressure, ...] scaled to [0, 1] within the limits of the algorithms'''
+        return (np.asarray(setpoints, dtype=float)[..., :4] - self.lower) / (self.upper - self.lower)
@@ -0,0 +1,186 @@
+'''
+Planning service computing the next recipe in a separate process while the series goes on.
+A PlanningService wraps a planner (e.g. planner.GaussianProcessPlanner) and is itself the algorithm given
+to perform_series. Every validated step it observes increases its version and starts planning the next
+recipe in a process pool on a snapshot (pickled copy) of the planner, so a planner that holds the GIL or
+takes longer than a step does not slow the series. The finished proposal is cached with the version it
+was planned from. When the series asks for a recipe, the newest finished proposal is returned at once,
+even if it was planned before the last steps were validated (those are still validated while the next
+step ramps and dwells, so the series does not wait for them either), and planning from all observed
+steps goes on for the next request. Only without any finished proposal the series waits, at most the
+deadline, for the planning in flight before it falls back to a cheap random recipe. The version every
+recipe was planned from is recorded in recipe_versions. perform_series closes the service at the end of the series; used elsewhere, close it
+or use it as a context manager.
+'''
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError
+import campaign_parameters as cp
+import algorithms
+
+
+def plan(planner, power_axes):
+    '''Runs a planner snapshot in a worker process'''
+    return planner(power_axes)
+
+
+class PlanningService:
+    # the service plans from the steps validated so far, the series does not wait for pending validations
+    waits_for_results = False
+
+    def __init__(self, planner, fallback=algorithms.generate_random_parameters, deadline: float = cp.PLANNING_DEADLINE,
+                 processes: int = cp.PLANNING_PROCESSES, start_method: str = cp.PLANNING_START_METHOD) -> None:
+        '''
+        Initialize a PlanningService object
+
+        Parameters
+        ----------
+        planner : callable
+            Picklable algorithm(power_axes) with an observe(doc) method, e.g. planner.GaussianProcessPlanner()
+        fallback : callable, optional
+            Cheap algorithm(power_axes) used when the planner misses the deadline, by default
+            algorithms.generate_random_parameters
+        deadline : float, optional
+            Seconds a request for a recipe waits for the planning in flight, by default cp.PLANNING_DEADLINE
+        processes : int, optional
+            Planner processes, by default cp.PLANNING_PROCESSES
+        start_method : str, optional
+            Start method of the processes, by default cp.PLANNING_START_METHOD ("spawn" starts clean
+            interpreters, as on Windows, instead of forking a process with eKLipse and database threads)
+        '''
+        self.planner = planner
+        self.fallback = fallback
+        self.deadline = deadline
+        self.name = getattr(planner, "name", type(planner).__name__)
+        self.executor = ProcessPoolExecutor(max(processes, 1), mp_context=multiprocessing.get_context(start_method))
+        # reentrant: a future that is already done runs its callback within _submit
+        self.lock = threading.RLock()
+        self.version = 0  # validated steps observed
+        self.power_axes = None  # from the last request, needed to plan ahead
+        self.future = None  # planning in flight
+        self.future_version = None
+        self.proposal = None  # (version, finished future) planned and not used yet
+        self.used = None  # future whose recipe was returned
+        self.recipe_versions = []  # (observed version, version planned from) per recipe, None for fallbacks
+        self.counts = {"planned": 0, "stale": 0, "waited": 0, "fallback": 0}
+
+    def __call__(self, power_axes) -> list:
+        '''
+        The next recipe: the newest finished proposal, or if there is none the planning in flight, or a
+        fallback recipe if the planner does not deliver it within the deadline
+
+        Parameters
+        ----------
+        power_axes : np.array
+            Active power axes
+
+        Returns
+        -------
+        list
+            Recipe
+        '''
+        start = time.monotonic()
+        with self.lock:
+            self.power_axes = power_axes
+            if self.proposal is not None:
+                (version, future), self.proposal = self.proposal, None
+                self.used = future
+                if version == self.version:
+                    self.counts["planned"] += 1
+                else:
+                    # planned before the last steps were validated, the planning from them goes on
+                    self.counts["stale"] += 1
+                    if not self._planning_current():
+                        self._submit()
+                self.recipe_versions.append((self.version, version))
+                return future.result()
+            if not self._planning_current():
+                self._submit()
+            future, version = self.future, self.future_version
+
+        future, version = self._wait(future, version, start + self.deadline)
+        with self.lock:
+            if future is None:
+                self.counts["fallback"] += 1
+            else:
+                # taken by this request, not cached for the next one
+                self.used = future
+                if self.proposal is not None and self.proposal[1] is future:
+                    self.proposal = None
+                self.counts["waited"] += 1
+            self.recipe_versions.append((self.version, version))
+        if future is None:
+            return self.fallback(power_axes)
+        print("Waited " + str(round(time.monotonic() - start, 1)) + " s for the planner")
+        return future.result()
+
+    def observe(self, doc: dict):
+        '''
+        Passes a validated step to the planner and starts planning from it (e.g. as listener of
+        Validator.add_listener)
+
+        Parameters
+        ----------
+        doc : dict
+            Document of a validated step
+        '''
+        self.planner.observe(doc)
+        with self.lock:
+            self.version += 1
+            if self.power_axes is not None:
+                self._submit()
+
+    def close(self):
+        '''Stops the planner processes, without waiting for planning in flight'''
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def report(self):
+        '''Prints how the recipes were obtained'''
+        print("    Recipes planned ahead: " + str(self.counts["planned"]) + ", planned before the last steps were " +
+              "validated: " + str(self.counts["stale"]) + ", waited for: " + str(self.counts["waited"]) +
+              ", fallback: " + str(self.counts["fallback"]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _planning_current(self) -> bool:
+        # planning from all observed steps is in flight or finished and not returned yet
+        return self.future is not None and self.future is not self.used and self.future_version == self.version
+
+    def _submit(self):
+        # a newer version supersedes planning that has not started yet
+        if self.future is not None:
+            self.future.cancel()
+        version = self.version
+        future = self.executor.submit(plan, self.planner, self.power_axes)
+        future.add_done_callback(lambda done: self._cache(version, done))
+        self.future, self.future_version = future, version
+
+    def _cache(self, version, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self.lock:
+            if future is not self.used and (self.proposal is None or self.proposal[0] <= version):
+                self.proposal = (version, future)
+
+    def _wait(self, future, version, until: float):
+        # (finished future, version planned from), or (None, None) if the planner missed the deadline or failed
+        while True:
+            try:
+                future.result(timeout=max(until - time.monotonic(), 0))
+                return future, version
+            except CancelledError:
+                # superseded by planning from a step observed in the meantime
+                with self.lock:
+                    future, version = self.future, self.future_version
+            except TimeoutError:
+                print("Planner missed its deadline of " + str(self.deadline) + " s, using a fallback recipe")
+                return None, None
+            except Exception as e:
+                print("Planner failed: ", type(e).__name__, e)
+                return None, None
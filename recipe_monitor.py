@@ -0,0 +1,215 @@
+'''
+Background monitor of the running eKLipse recipe.
+BeaSupervisor.wait_for_recipe used to check the stack light and the recipe step every WAIT_RECIPE_TIME
+seconds, for at most WAIT_RECIPE_ITERATIONS checks. RecipeMonitor samples the recipe state (stack light,
+recipe name and step) in a background thread at a configurable interval and publishes every change:
+listeners are called with the old and new state, and threads blocked in wait_for are woken up. A waiter
+is answered at most one sampling interval after the state it waits for appears, without an iteration cap.
+If max_failures samples in a row fail (e.g. eKLipse cannot be read), waiters are woken and the last error
+is raised from wait_for instead of waiting for a state that can no longer be observed.
+
+The GUI is only sampled while a thread is waiting. Each sample holds the UI lock, and a waiter does not
+return before a sample in progress has finished, so the monitor never uses eKLipse at the same time as
+the thread that waited for it.
+
+The clock and sleep can be replaced (e.g. by eklipse_simulator). With a sleep function, time only passes
+while the monitor sleeps, so the monitor waits until every waiter has looked at a sample before sleeping
+towards the next one, and waiters are only woken by samples. A simulated run then samples at the same
+simulated times whatever the thread scheduling.
+'''
+
+import threading
+import time
+from typing import NamedTuple
+import campaign_parameters as cp
+
+
+class RecipeState(NamedTuple):
+    stack_light: str  # system_parameters.STACK_LIGHT_* status
+    recipe_name: str  # name of the running recipe, None if not running or not read
+    step: int  # step of the running recipe, None if not running or not read
+    time: float  # clock of the monitor (time.monotonic() by default) at the sample
+
+
+class RecipeMonitor:
+    def __init__(self, sample, interval: float = cp.RECIPE_MONITOR_INTERVAL, ui_lock=None,
+                 thread_init=None, max_failures: int = cp.RECIPE_MONITOR_MAX_FAILURES,
+                 clock=time.monotonic, sleep=None) -> None:
+        '''
+        Initialize a RecipeMonitor object, usually through control_eklipse.recipe_monitor
+
+        Parameters
+        ----------
+        sample : callable
+            Returns the current RecipeState
+        interval : float, optional
+            Time between samples in seconds while a thread is waiting, by default cp.RECIPE_MONITOR_INTERVAL
+        ui_lock : lock, optional
+            Held during each sample, by default a new lock
+        thread_init : callable, optional
+            Called once in the monitor thread before sampling (e.g. COM initialisation), by default None
+        max_failures : int, optional
+            Failed samples in a row after which wait_for raises the last error, by default
+            cp.RECIPE_MONITOR_MAX_FAILURES
+        clock : callable, optional
+            Returns the current time in seconds, by default time.monotonic
+        sleep : callable, optional
+            Sleeps between samples for simulated time, by default None (wait on the real clock)
+        '''
+        self.sample = sample
+        self.interval = interval
+        self.ui_lock = ui_lock if ui_lock is not None else threading.RLock()
+        self.thread_init = thread_init
+        self.max_failures = max(max_failures, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.condition = threading.Condition()
+        self.state = None
+        self.samples = 0  # number of samples taken
+        self.waiters = 0
+        self.viewers = 0  # waiters that have not looked at the last sample yet
+        self.listeners = []
+        self.error = None  # last exception raised by sample
+        self.failures = 0  # samples failed in a row
+        self.failed = 0  # number of failed samples
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        '''Start the monitor thread (it samples only while a thread is waiting)'''
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name="RecipeMonitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''Stop the monitor thread'''
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def add_listener(self, listener):
+        '''Call listener(old_state, new_state) from the monitor thread on every state change'''
+        self.listeners.append(listener)
+
+    def wait_for(self, predicate, timeout: float = None) -> RecipeState:
+        '''
+        Block until a new sample satisfies the predicate
+
+        Parameters
+        ----------
+        predicate : callable
+            Called with a RecipeState, the wait ends when it returns True
+        timeout : float, optional
+            Maximum time to wait in seconds, by default None (no limit)
+
+        Returns
+        -------
+        RecipeState
+            First state sampled after the call that satisfies the predicate, None on timeout
+
+        Raises
+        ------
+        Exception
+            The last error of sample, after max_failures samples in a row failed during the call
+        '''
+        self.start()
+        deadline = None if timeout is None else self.clock() + timeout
+        with self.condition:
+            seen = self.samples
+            failed = self.failed
+            self.waiters += 1
+            self.condition.notify_all()
+            try:
+                while True:
+                    if self.samples > seen:
+                        seen = self.samples
+                        self._viewed()
+                        if predicate(self.state):
+                            return self.state
+                    if self.failed > failed and self.failures >= self.max_failures:
+                        raise self.error
+                    if not self.running:
+                        return None
+                    remaining = None if deadline is None else deadline - self.clock()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self.condition.wait(remaining if self.sleep is None else None)
+            finally:
+                self.waiters -= 1
+                if self.samples > seen:
+                    self._viewed()
+                self._wait_for_sample_in_progress()
+
+    def _viewed(self):
+        '''Counts a waiter as having looked at the last sample (called with the condition held)'''
+        self.viewers -= 1
+        if self.viewers <= 0:
+            self.condition.notify_all()
+
+    def _wait_for_sample_in_progress(self):
+        '''Blocks until a sample that started while this thread was waiting has finished'''
+        self.condition.release()
+        try:
+            with self.ui_lock:
+                pass
+        finally:
+            self.condition.acquire()
+
+    def _run(self):
+        '''Monitor thread: sample while threads are waiting and publish changes'''
+        if self.thread_init is not None:
+            self.thread_init()
+        while True:
+            with self.condition:
+                while self.running and self.waiters == 0:
+                    self.condition.wait()
+                if not self.running:
+                    return
+
+            started = self.clock()
+            state = None
+            with self.ui_lock:
+                # A waiter that left before the lock was taken is not sampled for
+                with self.condition:
+                    sampling = self.running and self.waiters > 0
+                if sampling:
+                    try:
+                        state = self.sample()
+                    except Exception as e:
+                        print("    Recipe monitor could not sample eKLipse: ", type(e).__name__)
+                        with self.condition:
+                            self.error = e
+                            self.failures += 1
+                            self.failed += 1
+                            self.condition.notify_all()
+            if not sampling:
+                continue
+
+            if state is not None:
+                old_state = self.state
+                if old_state is None or old_state[:3] != state[:3]:
+                    for listener in self.listeners:
+                        listener(old_state, state)
+                with self.condition:
+                    self.state = state
+                    self.samples += 1
+                    self.failures = 0
+                    self.viewers = self.waiters
+                    self.condition.notify_all()
+
+            if self.sleep is None:
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.running,
+                                            max(self.interval - (self.clock() - started), 0))
+            else:
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.running or self.viewers <= 0)
+                    if not self.running:
+                        return
+                self.sleep(max(self.interval - (self.clock() - started), 0))
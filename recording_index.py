@@ -0,0 +1,109 @@
+'''
+Index of the eKLipse RecordingData folder.
+The folder grows without bound over a campaign, so instead of listing it and calling getctime on every
+file for each validation step, the index keeps a high-water mark (modification time, file name) of the
+newest recording it has seen and only looks at directory entries above it. Directory entries are read
+with os.scandir, which on Windows returns the file times together with the listing (no extra system
+call per file), and the process working directory is never changed.
+'''
+
+import os
+import json
+import time
+
+
+class RecordingIndex:
+    def __init__(self, path: str, state_file: str = None, suffix: str = ".csv") -> None:
+        '''
+        Initialize a RecordingIndex object
+
+        Parameters
+        ----------
+        path : str
+            Folder where eKLipse writes the recording CSV files
+        state_file : str, optional
+            JSON file to persist the high-water mark in between sessions, by default None (not persisted)
+        suffix : str, optional
+            File name suffix of recordings, by default ".csv"
+        '''
+        self.path = path
+        self.state_file = state_file
+        self.suffix = suffix.lower()
+        self.high_water_mark = (0, "")
+        self.latest_path = None
+        self.mark_position = None
+
+        if state_file is not None and os.path.exists(state_file):
+            with open(state_file, 'r') as file:
+                state = json.load(file)
+            self.high_water_mark = (state["mtime_ns"], state["name"])
+            self.latest_path = state["path"]
+
+    def update(self) -> list[str]:
+        '''Look for recordings newer than the high-water mark
+
+        Returns
+        -------
+        list[str]
+            Paths of new (or updated) recordings, oldest first
+        '''
+        new_files = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(self.suffix) or not entry.is_file():
+                    continue
+                key = (entry.stat().st_mtime_ns, entry.name)
+                if key > self.high_water_mark:
+                    new_files.append((key, entry.path))
+
+        if new_files:
+            new_files.sort()
+            self.high_water_mark, self.latest_path = new_files[-1]
+            self.save()
+
+        return [file_path for _, file_path in new_files]
+
+    def save(self):
+        '''Persist the high-water mark, if a state file is used'''
+        if self.state_file is None:
+            return
+        state = {"mtime_ns": self.high_water_mark[0],
+                 "name": self.high_water_mark[1], "path": self.latest_path}
+        temp_file = self.state_file + ".tmp"
+        with open(temp_file, 'w') as file:
+            json.dump(state, file)
+        os.replace(temp_file, self.state_file)
+
+    def latest(self) -> str:
+        '''Path of the newest recording in the folder (None if there is none)'''
+        self.update()
+        return self.latest_path
+
+    def mark(self):
+        '''Remember the current high-water mark, call right before a recording is started'''
+        self.update()
+        self.mark_position = self.high_water_mark
+
+    def recording_since_mark(self, timeout: float = 0, interval: float = 0.1) -> str:
+        '''Path of the recording created after the last mark
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time to wait for the file to appear in seconds, by default 0
+        interval : float, optional
+            Time between directory checks in seconds, by default 0.1
+
+        Returns
+        -------
+        str
+            Newest recording written after mark() was called, None if there is none
+        '''
+        deadline = time.monotonic() + timeout
+        while True:
+            self.update()
+            if self.mark_position is None or self.high_water_mark > self.mark_position:
+                return self.latest_path
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
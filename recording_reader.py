@@ -0,0 +1,181 @@
+'''
+Reader for eKLipse recording CSV files.
+A recording file starts with two lines of recording information, followed by a header row with the
+"Time Stamp" column and the eKLipse signal names of the recorded parameters. The reader reads the file
+with explicit dtypes, renames the signals to our column names (campaign_parameters.RECORDING_NAMES and
+system_parameters.BASIC_PARAMETERS_TS) and converts the time stamps directly to float seconds from the
+start of the recording, giving the same frame as Validator.process_df.
+'''
+
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import system_parameters as sp
+
+HEADER_ROWS = 2  # recording information lines before the column header
+TIME_COLUMN = "Time Stamp"
+TIME_FORMAT = '%b-%d-%Y %H:%M:%S.%f %p'
+# eKLipse signal name -> our column name
+RECORDING_COLUMNS = {**cp.RECORDING_NAMES, **sp.BASIC_PARAMETERS_TS}
+
+try:
+    import pyarrow  # noqa: F401
+    ENGINE = "pyarrow"
+except ImportError:
+    ENGINE = "c"
+
+
+def recording_dtypes(dtype=np.float64) -> dict:
+    '''Dtypes of the recorded eKLipse signals
+
+    Parameters
+    ----------
+    dtype : optional
+        Dtype of the power, voltage, pressure and flow columns, by default np.float64.
+        QCM frequencies are always read as float64, since float32 cannot resolve them.
+
+    Returns
+    -------
+    dict
+        eKLipse signal name -> dtype, with the time stamps read as strings
+    '''
+    dtypes = {TIME_COLUMN: str}
+    for signal, column in RECORDING_COLUMNS.items():
+        dtypes[signal] = np.float64 if 'QCM' in column else dtype
+    return dtypes
+
+
+def _parse_fixed_width(time_stamps) -> np.ndarray:
+    '''
+    Parses time stamps of the fixed-width form "Mon-DD-YYYY HH:MM:SS.fff AM" directly from their bytes.
+    Only the distinct dates are parsed as strings, hours to fractions are decoded as digit arrays.
+
+    Returns
+    -------
+    nanoseconds: int64 array of nanoseconds since the epoch, or None if the time stamps are not fixed-width
+    '''
+    try:
+        raw = np.asarray(time_stamps, dtype='S')
+    except UnicodeEncodeError:
+        return None
+    width = raw.dtype.itemsize
+    digits_end = width - 3  # position of the space before AM/PM
+    if len(raw) == 0 or digits_end <= 21:
+        return None
+    chars = raw.view(np.uint8).reshape(len(raw), width)
+
+    # All rows must have the same length and separators
+    separators = {3: b'-', 6: b'-', 11: b' ', 14: b':', 17: b':', 20: b'.', digits_end: b' '}
+    for position, separator in separators.items():
+        if not np.all(chars[:, position] == ord(separator)):
+            return None
+    digit_positions = [12, 13, 15, 16, 18, 19] + list(range(21, digits_end))
+    digits = chars[:, digit_positions]
+    if not np.all((digits >= ord('0')) & (digits <= ord('9'))):
+        return None
+
+    def number(positions):
+        value = np.zeros(len(raw), dtype=np.int64)
+        for position in positions:
+            value = value*10 + (chars[:, position] - ord('0'))
+        return value
+
+    seconds = number([12, 13])*3600 + number([15, 16])*60 + number([18, 19])
+    fraction = number(range(21, digits_end)) * 10**(9 - (digits_end - 21))
+
+    # Midnight of each distinct date (usually there is only one)
+    if np.all(chars[:, :11] == chars[0, :11]):
+        dates, date_index = raw[:1].astype('S11'), np.zeros(len(raw), dtype=np.int64)
+    else:
+        dates, date_index = np.unique(raw.astype('S11'), return_inverse=True)
+    midnight = pd.to_datetime(pd.Series(dates).str.decode('ascii'), format='%b-%d-%Y').to_numpy(
+        dtype='datetime64[ns]').view(np.int64)
+
+    return midnight[date_index.ravel()] + seconds*1_000_000_000 + fraction
+
+
+def time_stamps_to_nanoseconds(time_stamps) -> np.ndarray:
+    '''Converts eKLipse time stamp strings to int64 nanoseconds since the epoch'''
+    nanoseconds = _parse_fixed_width(time_stamps)
+    if nanoseconds is None:
+        nanoseconds = pd.to_datetime(time_stamps, format=TIME_FORMAT).to_numpy(
+            dtype='datetime64[ns]').view(np.int64)
+    return nanoseconds
+
+
+def time_stamps_to_seconds(time_stamps) -> tuple[str, np.ndarray]:
+    '''Converts eKLipse time stamp strings to seconds from the first time stamp
+
+    Parameters
+    ----------
+    time_stamps : array-like of str
+
+    Returns
+    -------
+    date: string of experiment date (mm/dd/yy)
+    seconds: float64 array of seconds from the first time stamp
+    '''
+    nanoseconds = time_stamps_to_nanoseconds(time_stamps)
+    date = pd.Timestamp(nanoseconds[0]).date().strftime('%m/%d/%Y')
+    seconds = (nanoseconds - nanoseconds[0]) / 1e9
+    return date, seconds
+
+
+def read_recording(file_path: str, dtype=np.float64) -> tuple[str, pd.DataFrame]:
+    '''Reads and processes an eKLipse recording CSV file
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the recording CSV file
+    dtype : optional
+        Dtype of the power, voltage, pressure and flow columns, by default np.float64
+        (np.float32 halves the memory, but values then differ from process_df in float precision)
+
+    Returns
+    -------
+    date: string of experiment date (mm/dd/yy)
+    df: pandas df with time in seconds from start and 3 decimal values for all but the QCM columns
+    '''
+    df = pd.read_csv(file_path, skiprows=HEADER_ROWS,
+                     dtype=recording_dtypes(dtype), engine=ENGINE)
+    df.rename(columns=RECORDING_COLUMNS, inplace=True)
+
+    date, seconds = time_stamps_to_seconds(df[TIME_COLUMN].to_numpy())
+    df[TIME_COLUMN] = seconds
+
+    # Round all but the QCM columns to three decimals, column by column to avoid copying the frame
+    for column in df.columns:
+        if 'QCM' not in column and df[column].dtype.kind == 'f':
+            df[column] = np.round(df[column].to_numpy(), 3)
+
+    return date, df
+
+
+def write_recording(file_path: str, start: pd.Timestamp, seconds, signals: dict, interval: float = None,
+                    append: bool = False):
+    '''Writes a recording CSV file in the eKLipse RecordingData format (used for testing and simulation)
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the CSV file to write
+    start : pd.Timestamp
+        Time of the first sample
+    seconds : array-like
+        Time of each sample in seconds from start
+    signals : dict
+        eKLipse signal name -> recorded values
+    interval : float, optional
+        Recording interval in seconds written to the information lines
+    append : bool, optional
+        Append the rows to a recording written before, without information lines and header, by default False
+    '''
+    time_stamps = (start + pd.to_timedelta(np.asarray(seconds), unit='s')).strftime('%b-%d-%Y %H:%M:%S.%f')
+    time_stamps = time_stamps.str.slice(0, -3) + start.strftime(' %p')
+    df = pd.DataFrame({TIME_COLUMN: time_stamps, **signals})
+    with open(file_path, 'a' if append else 'w', newline='') as file:
+        if not append:
+            file.write("Recording started," + start.strftime('%b-%d-%Y %H:%M:%S') + "\n")
+            file.write("Recording interval [s]," + str(interval) + "\n")
+        df.to_csv(file, index=False, header=not append, float_format='%.6g')
@@ -0,0 +1,264 @@
+'''
+Background writer for validated experiment documents.
+Validator.validate hands its documents to a ResultWriter instead of inserting them itself, so the
+instrument loop never waits on database I/O. A writer thread collects the queued documents and inserts
+them in batches with insert_many. The queue is bounded: documents that do not fit, and batches that
+cannot be inserted because the database is unreachable, are appended to a local BSON journal file,
+which is replayed into the database once it is reachable again. Documents submitted after close go to
+the journal too, for the next writer to replay. The writer thread moves the journal aside before
+replaying it, so journaling never waits for the database. Documents that can never be inserted (BSON
+cannot encode them, they are too large, or the database rejects them) are moved to a separate
+rejected file, so they neither stop the writer thread nor block the journal behind them.
+'''
+
+import atexit
+import os
+import queue
+import threading
+import time
+import bson
+from bson.codec_options import CodecOptions, TypeRegistry
+from pymongo.errors import BulkWriteError, PyMongoError
+import campaign_parameters as cp
+
+DUPLICATE_KEY_ERROR = 11000
+_STOP = object()
+
+
+def _encode_rejected(value):
+    # values BSON cannot encode (e.g. NumPy scalars and arrays) are kept as Python values or strings
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+REJECTED_CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry(fallback_encoder=_encode_rejected))
+
+
+class ResultWriter:
+    def __init__(self, collection, journal_path: str = cp.DB_JOURNAL_PATH, max_queue: int = cp.DB_WRITER_QUEUE_SIZE,
+                 batch_size: int = cp.DB_WRITER_BATCH_SIZE, flush_interval: float = cp.DB_WRITER_FLUSH_INTERVAL,
+                 retry_interval: float = cp.DB_WRITER_RETRY_INTERVAL, prepare=None) -> None:
+        '''
+        Initialize a ResultWriter object and start its writer thread
+
+        Parameters
+        ----------
+        collection : pymongo Collection (or any object with insert_many)
+            Collection to insert the documents in
+        journal_path : str, optional
+            File for documents that could not be inserted, by default cp.DB_JOURNAL_PATH
+        max_queue : int, optional
+            Maximum number of documents kept in memory, by default cp.DB_WRITER_QUEUE_SIZE
+        batch_size : int, optional
+            Maximum number of documents per insert_many, by default cp.DB_WRITER_BATCH_SIZE
+        flush_interval : float, optional
+            Maximum time in seconds a document waits for its batch to fill, by default cp.DB_WRITER_FLUSH_INTERVAL
+        retry_interval : float, optional
+            Minimum time in seconds between attempts to replay the journal, by default cp.DB_WRITER_RETRY_INTERVAL
+        prepare : callable, optional
+            Called with the collection before the first insert (e.g. database_client.ensure_indexes),
+            retried until it returns True, by default None
+        '''
+        self.collection = collection
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.prepare = prepare
+        self.prepared = prepare is None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.replay_path = journal_path + ".replay"  # journal being replayed by the writer thread
+        self.rejected_path = journal_path + ".rejected"  # documents that can never be inserted
+        self.journal_lock = threading.Lock()  # held only for file operations, never during inserts
+        self.submit_lock = threading.Lock()
+        self.last_replay_attempt = 0.0
+        self.inserted = 0
+        self.journaled = 0
+        self.rejected = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, doc: dict):
+        '''Queue a document for insertion, never blocks (spills to the journal if the queue is full or the
+        writer is closed)'''
+        with self.submit_lock:
+            if not self.closed:
+                try:
+                    self.queue.put_nowait(doc)
+                    return
+                except queue.Full:
+                    pass
+        self._journal([doc])
+
+    def flush(self):
+        '''Wait until all queued documents are inserted or journaled'''
+        self.queue.join()
+
+    def close(self):
+        '''Flush the queue, try to replay the journal and stop the writer thread'''
+        with self.submit_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join()
+        atexit.unregister(self.close)
+
+    def journal_size(self) -> int:
+        '''Number of documents in the journal'''
+        with self.journal_lock:
+            size = 0
+            for path in (self.journal_path, self.replay_path):
+                if os.path.exists(path):
+                    with open(path, 'rb') as file:
+                        size += sum(1 for _ in bson.decode_file_iter(file))
+            return size
+
+    def _run(self):
+        '''Writer thread: collect batches from the queue and write them'''
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._replay_journal()
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    self.queue.task_done()
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._write(batch)
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+        self._replay_journal(force=True)
+
+    def _write(self, batch: list[dict]):
+        '''Insert a batch, older journaled documents first; journal the batch if the database is unreachable'''
+        if not self._replay_journal():
+            self._journal(batch)
+            return
+        try:
+            self._insert(batch)
+        except Exception as e:
+            print("    Could not write results to database (" + type(e).__name__ + "), saved to journal")
+            self._journal(batch)
+
+    def _insert(self, docs: list[dict]):
+        '''
+        insert_many that ignores documents already in the database (e.g. from an interrupted replay) and
+        rejects the documents that can never be inserted; raises if the database cannot be written
+        '''
+        if not self.prepared:
+            self.prepared = self.prepare(self.collection)
+        try:
+            self._insert_many(docs)
+        except PyMongoError:
+            raise
+        except Exception:
+            # e.g. bson.errors.InvalidDocument or pymongo.errors.DocumentTooLarge, which do not subclass
+            # PyMongoError: insert the documents one by one to find the ones that cannot be inserted
+            for doc in docs:
+                try:
+                    self._insert_many([doc])
+                except PyMongoError:
+                    raise
+                except Exception as e:
+                    self._reject([doc], type(e).__name__ + ": " + str(e))
+
+    def _insert_many(self, docs: list[dict]):
+        try:
+            self.collection.insert_many(docs, ordered=False)
+            self.inserted += len(docs)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            self.inserted += len(docs) - len(errors)
+            failed = [error for error in errors if error["code"] != DUPLICATE_KEY_ERROR]
+            if failed:
+                # e.g. a document validation error, the other documents were inserted (unordered insert)
+                self._reject([docs[error["index"]] for error in failed], failed[0].get("errmsg", "write error"))
+
+    def _journal(self, docs: list[dict]):
+        '''Append documents to the journal file, documents BSON cannot encode go to the rejected file'''
+        unencodable = []
+        with self.journal_lock:
+            with open(self.journal_path, 'ab') as file:
+                for doc in docs:
+                    # _id is assigned here so a replay after a partial insert cannot duplicate documents
+                    doc.setdefault("_id", bson.ObjectId())
+                    try:
+                        data = bson.encode(doc)
+                    except Exception as e:
+                        unencodable.append((doc, e))
+                        continue
+                    file.write(data)
+            self.journaled += len(docs) - len(unencodable)
+        for doc, e in unencodable:
+            self._reject([doc], type(e).__name__ + ": " + str(e))
+
+    def _reject(self, docs: list[dict], reason: str):
+        '''Append documents that can never be inserted to the rejected file, for manual inspection'''
+        with self.journal_lock:
+            with open(self.rejected_path, 'ab') as file:
+                for doc in docs:
+                    file.write(bson.encode(doc, codec_options=REJECTED_CODEC_OPTIONS))
+            self.rejected += len(docs)
+        print("    " + str(len(docs)) + " results cannot be written to database (" + reason + "), saved to " +
+              self.rejected_path)
+
+    def _replay_journal(self, force: bool = False) -> bool:
+        '''
+        Insert journaled documents into the database (writer thread only)
+
+        Returns
+        -------
+        bool
+            True if the journal is empty afterwards
+        '''
+        if not os.path.exists(self.journal_path) and not os.path.exists(self.replay_path):
+            return True
+        if not force and time.monotonic() - self.last_replay_attempt < self.retry_interval:
+            return False
+        self.last_replay_attempt = time.monotonic()
+
+        # move the journal aside, so documents journaled during the inserts go to a new journal file
+        with self.journal_lock:
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.replay_path):
+                    # left by a failed replay
+                    with open(self.journal_path, 'rb') as journal, open(self.replay_path, 'ab') as replay:
+                        replay.write(journal.read())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.replay_path)
+
+        with open(self.replay_path, 'rb') as file:
+            docs = list(bson.decode_file_iter(file))
+        try:
+            for start in range(0, len(docs), self.batch_size):
+                self._insert(docs[start:start + self.batch_size])
+        except Exception:
+            return False
+        with self.journal_lock:
+            os.remove(self.replay_path)
+            self.journaled -= len(docs)
+        print("    " + str(len(docs)) + " journaled results written to database")
+        return not os.path.exists(self.journal_path)
@@ -0,0 +1,282 @@
+'''
+Offline re-validation of archived eKLipse recordings.
+Walks a directory of recording CSV files, judges every recording with the Validator's steadiness criteria
+(optionally with other sigma_V, sigma_P, t and t_d) and writes one row per recording with its status,
+settling time and statistics to a Parquet or CSV file, or to a database collection.
+
+Recordings are parsed and judged in parallel in a process pool. Only the small result rows are sent back
+to the main process, and they are written out in chunks, so memory use does not grow with the archive.
+
+Run from the repository root, e.g.:
+
+    python revalidate.py "C:\\Program Files (x86)\\KJLC\\eKLipse\\Log\\RecordingData" --output revalidated.parquet --sigma-v 0.5
+'''
+
+import argparse
+import copy
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import campaign_parameters as cp
+import recording_reader as rr
+import settling
+import database_client as dc
+from validate import Validator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+STATUS_SETTLED = "settled"  # settles within t, stored by the Validator with "Settled": True
+STATUS_UNSETTLED = "unsettled"  # does not settle within t + t_d, stored with "Settled": False
+STATUS_RERUN = "rerun"  # settles between t and t + t_d, rerun by the Validator
+STATUS_ERROR = "error"  # could not be read
+
+INFO_COLUMNS = {"File": "string", "Date": "string", "Rows": "Int64", "Duration": "float64",
+                "Status": "string", "Settled": "boolean", "Settling time": "float64", "Error": "string"}
+
+
+def result_columns() -> dict:
+    '''Columns of the results table and their dtypes (statistics of all recorded signals of the current setup)'''
+    columns = dict(INFO_COLUMNS)
+    for column in rr.RECORDING_COLUMNS.values():
+        columns[column + ' Mean'] = "float64"
+        columns[column + ' STD'] = "float64"
+    return columns
+
+
+def find_recordings(directory: str, suffix: str = ".csv") -> list[str]:
+    '''All recording files in a directory and its subdirectories, sorted by path'''
+    recordings = []
+    for root, _, files in os.walk(directory):
+        recordings.extend(os.path.join(root, name) for name in files if name.lower().endswith(suffix))
+    return sorted(recordings)
+
+
+def campaign_criteria(sigma_v: float = None, sigma_p: float = None) -> dict:
+    '''
+    Steadiness criteria of the campaign (cp.STEADINESS_CRITERIA), with other std thresholds if given
+
+    Parameters
+    ----------
+    sigma_v : float, optional
+        Std threshold of the voltage columns [V], by default the campaign value
+    sigma_p : float, optional
+        Std threshold of the pressure column [mTorr], by default the campaign value
+
+    Returns
+    -------
+    criteria : dict
+        {column: {criterion name: threshold}}
+    '''
+    criteria = copy.deepcopy(cp.STEADINESS_CRITERIA)
+    for column, column_criteria in criteria.items():
+        if "suffix_std" not in column_criteria:
+            continue
+        if sigma_v is not None and 'Voltage' in column:
+            column_criteria["suffix_std"] = sigma_v
+        if sigma_p is not None and 'pressure' in column:
+            column_criteria["suffix_std"] = sigma_p
+    return criteria
+
+
+def revalidate_recording(file_path: str, criteria: dict, t: float, t_d: float, window: int) -> dict:
+    '''
+    Judges one recording the same way as Validator.validate, without storing it
+
+    Parameters
+    ----------
+    file_path : str
+        Recording CSV file
+    criteria : dict
+        Steadiness criteria per column
+    t : float
+        Fraction of the recording within which the experiment must settle
+    t_d : float
+        Additional fraction after t within which a settled experiment is rerun
+    window : int
+        Window length in samples for windowed criteria
+
+    Returns
+    -------
+    dict
+        Result row: file, date, status, settling time and statistics of the recording
+    '''
+    try:
+        date, df = rr.read_recording(file_path)
+    except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+        return {"File": file_path, "Status": STATUS_ERROR, "Error": type(e).__name__ + ": " + str(e)}
+
+    rows = len(df)
+    if rows < 2:
+        return {"File": file_path, "Date": date, "Rows": rows, "Status": STATUS_ERROR, "Error": "Empty recording"}
+
+    # e.g. a recording of fewer power axes than the criteria have thresholds for
+    missing = [column for column in criteria if column not in df.columns]
+    if missing:
+        return {"File": file_path, "Date": date, "Rows": rows, "Status": STATUS_ERROR,
+                "Error": "Missing columns with steadiness criteria: " + ", ".join(missing)}
+
+    time_stamps = df[rr.TIME_COLUMN].to_numpy()
+    n_t = int(t*rows)
+    n_td = int(t_d*rows)
+    steady = settling.steady_mask(df, time_stamps, criteria, window)
+    j = settling.first_steady_index(steady, n_t + n_td)
+
+    row = {"File": file_path, "Date": date, "Rows": rows, "Duration": float(time_stamps[-1])}
+    if j is None:
+        row.update({"Status": STATUS_UNSETTLED, "Settled": False})
+        j = 1  # same statistics as Validator.validate for unsettled experiments
+    else:
+        row.update({"Status": STATUS_SETTLED if j <= n_t else STATUS_RERUN,
+                    "Settled": j <= n_t, "Settling time": float(time_stamps[j])})
+
+    row.update(Validator.calculate_statistics(df, rows, index=j))
+    return row
+
+
+class ResultTable:
+    def __init__(self, output: str = None, collection=None) -> None:
+        '''
+        Initialize a ResultTable object, which writes result rows in chunks
+
+        Parameters
+        ----------
+        output : str, optional
+            Parquet (.parquet) or CSV (.csv) file to write
+        collection : pymongo Collection, optional
+            Collection to insert the result rows in
+        '''
+        if output is not None and output.endswith(".parquet") and pq is None:
+            raise ValueError("Writing Parquet files requires pyarrow, use a .csv output instead")
+        self.output = output
+        self.collection = collection
+        self.columns = result_columns()
+        self.parquet_writer = None
+        self.rows_written = 0
+
+    def write(self, rows: list[dict]):
+        '''Appends a chunk of result rows'''
+        if not rows:
+            return
+        if self.collection is not None:
+            self.collection.insert_many([{k: v for k, v in row.items() if v is not None} for row in rows])
+
+        if self.output is not None:
+            frame = pd.DataFrame(rows).reindex(columns=list(self.columns)).astype(self.columns)
+            if self.output.endswith(".parquet"):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if self.parquet_writer is None:
+                    self.parquet_writer = pq.ParquetWriter(self.output, table.schema)
+                self.parquet_writer.write_table(table)
+            else:
+                frame.to_csv(self.output, mode='w' if self.rows_written == 0 else 'a',
+                             header=self.rows_written == 0, index=False)
+        self.rows_written += len(rows)
+
+    def close(self):
+        '''Finishes the output file'''
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+
+def revalidate(recordings: list[str], table: ResultTable, criteria: dict, t: float = cp.STEADY_TIME_FRACTION,
+               t_d: float = cp.DRAG_TIME_FRACTION, window: int = cp.STEADINESS_WINDOW, workers: int = None,
+               chunk_size: int = 200) -> dict:
+    '''
+    Re-validates recordings in a process pool and writes the results to a table
+
+    Parameters
+    ----------
+    recordings : list[str]
+        Recording CSV files
+    table : ResultTable
+        Where to write the result rows
+    criteria : dict
+        Steadiness criteria per column
+    t, t_d : float, optional
+        Time fractions as in the Validator, by default the campaign values
+    window : int, optional
+        Window length in samples for windowed criteria, by default cp.STEADINESS_WINDOW
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs (1 runs in this process)
+    chunk_size : int, optional
+        Number of result rows written at a time, by default 200
+
+    Returns
+    -------
+    counts : dict
+        Number of recordings per status
+    '''
+    judge = functools.partial(revalidate_recording, criteria=criteria, t=t, t_d=t_d, window=window)
+    workers = workers or os.cpu_count() or 1
+    counts = {}
+    chunk = []
+    start = time.perf_counter()
+
+    def report(done):
+        elapsed = time.perf_counter() - start
+        print("    " + str(done) + "/" + str(len(recordings)) + " recordings, "
+              + str(round(done/max(elapsed, 1e-9), 1)) + " per second")
+
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor is None:
+            results = map(judge, recordings)
+        else:
+            results = executor.map(judge, recordings, chunksize=max(1, min(16, len(recordings) // (4*workers))))
+        for done, row in enumerate(results, start=1):
+            counts[row["Status"]] = counts.get(row["Status"], 0) + 1
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                table.write(chunk)
+                chunk = []
+                report(done)
+        if chunk or not recordings:
+            table.write(chunk)
+            report(len(recordings))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        table.close()
+
+    return counts
+
+
+def main(argv: list[str] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory with recording CSV files (searched recursively)")
+    parser.add_argument("--output", help="results file, .parquet or .csv")
+    parser.add_argument("--collection", help="also insert the results in this collection of cp.DB_NAME")
+    parser.add_argument("--sigma-v", type=float, help="std threshold of the voltages [V]")
+    parser.add_argument("--sigma-p", type=float, help="std threshold of the pressure [mTorr]")
+    parser.add_argument("--t", type=float, default=cp.STEADY_TIME_FRACTION, help="steady time fraction")
+    parser.add_argument("--t-d", type=float, default=cp.DRAG_TIME_FRACTION, help="drag time fraction")
+    parser.add_argument("--window", type=int, default=cp.STEADINESS_WINDOW, help="window of windowed criteria [samples]")
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="result rows written at a time")
+    args = parser.parse_args(argv)
+
+    if args.output is None and args.collection is None:
+        parser.error("give an --output file and/or a --collection")
+    collection = dc.get_collection(cp.DB_NAME, args.collection) if args.collection else None
+    try:
+        table = ResultTable(args.output, collection)
+    except ValueError as e:
+        parser.error(str(e))
+
+    recordings = find_recordings(args.directory)
+    print("Re-validating " + str(len(recordings)) + " recordings in " + args.directory)
+    counts = revalidate(recordings, table, campaign_criteria(args.sigma_v, args.sigma_p), args.t, args.t_d,
+                        args.window, args.workers, args.chunk_size)
+    print("Done: " + ", ".join(str(n) + " " + status for status, n in sorted(counts.items())))
+    return counts
+
+
+if __name__ == "__main__":
+    main()
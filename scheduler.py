@@ -0,0 +1,131 @@
+'''
+Ordering of the steps of a recipe to shorten the ramps between them.
+The steps of a recipe without samples are independent measurements, so they can be run in any order, and
+the time spent ramping between them (setpoints.ramp_time, the wait of BeaSupervisor.apply_new_parameters)
+depends on that order. order_steps treats the steps as an open travelling salesman path that starts at
+the setpoints before the recipe (the presputter setpoints): a nearest-neighbour tour improved by 2-opt
+segment reversals over the matrix of ramp times. The ramp times are asymmetric (only pressure drops
+wait for the pressure), so every reversal is evaluated with the reversed edges of its segment, and
+Or-opt moves of short segments (which keep their direction) complete the local search.
+'''
+
+import numpy as np
+import setpoints
+
+
+def path_time(times: np.ndarray, path: list) -> float:
+    '''Sum of the ramp times along a path of node indices'''
+    return float(sum(times[a, b] for a, b in zip(path[:-1], path[1:])))
+
+
+def nearest_neighbour(times: np.ndarray) -> list:
+    '''Path from node 0 always going to the closest node not visited yet'''
+    path = [0]
+    unvisited = set(range(1, len(times)))
+    while unvisited:
+        # ties go to the step that came first in the recipe
+        following = min(unvisited, key=lambda node: (times[path[-1], node], node))
+        path.append(following)
+        unvisited.remove(following)
+    return path
+
+
+def two_opt(times: np.ndarray, path: list, tolerance: float = 1e-9) -> list:
+    '''Reverses segments of a path starting at node 0 as long as that makes it shorter'''
+    path = list(path)
+    improved = True
+    while improved:
+        improved = False
+        # ramp times of the edges along the path and of the same edges reversed, as cumulative sums
+        forward = np.concatenate([[0], np.cumsum(times[path[:-1], path[1:]])])
+        backward = np.concatenate([[0], np.cumsum(times[path[1:], path[:-1]])])
+        for i in range(1, len(path) - 1):
+            for j in range(i + 1, len(path)):
+                # path[i..j] reversed: the edges into and out of the segment change, the edges inside turn around
+                change = times[path[i - 1], path[j]] - times[path[i - 1], path[i]]
+                change += (backward[j] - backward[i]) - (forward[j] - forward[i])
+                if j + 1 < len(path):
+                    change += times[path[i], path[j + 1]] - times[path[j], path[j + 1]]
+                if change < -tolerance:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+                    break
+            if improved:
+                break
+    return path
+
+
+def or_opt(times: np.ndarray, path: list, segment_lengths=(1, 2, 3), tolerance: float = 1e-9) -> list:
+    '''Moves short segments of a path starting at node 0 elsewhere in it as long as that makes it shorter'''
+    path = list(path)
+    improved = True
+    while improved:
+        improved = False
+        for length in segment_lengths:
+            for i in range(1, len(path) - length + 1):
+                first, last = path[i], path[i + length - 1]
+                rest = np.array(path[:i] + path[i + length:])
+                # time saved by taking the segment out, and added by inserting it after each node of the rest
+                removed = times[path[i - 1], first]
+                if i + length < len(path):
+                    removed += times[last, path[i + length]] - times[path[i - 1], path[i + length]]
+                added = times[rest, first]
+                added[:-1] += times[last, rest[1:]] - times[rest[:-1], rest[1:]]
+                added[i - 1] = np.inf  # where it was taken from
+                k = int(np.argmin(added))
+                if added[k] - removed < -tolerance:
+                    path = list(rest[:k + 1]) + path[i:i + length] + list(rest[k + 1:])
+                    path = [int(node) for node in path]
+                    improved = True
+                    break
+            if improved:
+                break
+    return path
+
+
+def local_search(times: np.ndarray, path: list) -> list:
+    '''2-opt and Or-opt moves until neither shortens the path'''
+    while True:
+        shorter = or_opt(times, two_opt(times, path))
+        if shorter == path:
+            return path
+        path = shorter
+
+
+def order_steps(recipe: list, start: list, power_axes, power_pad: bool) -> list:
+    '''
+    Orders the steps of a recipe to shorten the total ramp time from the start setpoints through all steps
+
+    Parameters
+    ----------
+    recipe : list
+        Steps [power1, power2, power3, pressure, dwell time]
+    start : list
+        Setpoints before the first step (e.g. the presputter setpoints), they stay first
+    power_axes : list[bool]
+        Active power axes
+    power_pad : bool
+        If the powers are padded while ramping (see setpoints.ramp_time)
+
+    Returns
+    -------
+    list
+        The same steps, in the order given by the algorithm unless another order ramps for less time
+    '''
+    if len(recipe) < 2:
+        return list(recipe)
+    nodes = [list(start)[:4]] + [list(step)[:4] for step in recipe]
+    times = setpoints.ramp_times(nodes, nodes, power_axes, power_pad)
+
+    given = list(range(len(nodes)))
+    path = local_search(times, nearest_neighbour(times))
+    if path_time(times, path) >= path_time(times, given):
+        return list(recipe)
+    return [recipe[node - 1] for node in path[1:]]
+
+
+def total_ramp_time(recipe: list, start: list, power_axes, power_pad: bool) -> float:
+    '''Ramp time in seconds from the start setpoints through the steps of a recipe in their order'''
+    nodes = [list(start)[:4]] + [list(step)[:4] for step in recipe]
+    times = setpoints.ramp_times(nodes, nodes, power_axes, power_pad)
+    return path_time(times, list(range(len(nodes))))
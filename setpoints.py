@@ -0,0 +1,192 @@
+'''
+Setpoint transactions for moving the process between recipe steps.
+The signals and values of a power or pressure setpoint are planned here (power_setpoint, pressure_setpoints),
+and a SetpointTransaction applies a group of them back to back through one write function, so all axes
+are changed before the single wait for the combined ramp (ramp_time). If a write fails, every setpoint
+written by the transaction that has a rollback value (the power outputs) is set back to it, so a failed
+step never leaves some targets at the new powers.
+'''
+
+import numpy as np
+import campaign_parameters as cp
+import system_parameters as sp
+
+
+def power_setpoint(new_value: float, power_axis: int) -> tuple:
+    '''
+    Signal and value that set the power of a power axis
+
+    Parameters
+    ----------
+    new_value : float
+        New power in W (up to cp.MAX_POWERS plus at most 10 W of power padding)
+    power_axis : int
+        Power axis (1-3)
+
+    Returns
+    -------
+    tuple
+        (signal name, value), None if the power is out of range
+    '''
+    # up to 10W extra is allowed to accomodate power padding
+    power_padding = min(cp.POWER_PADDING, 10)
+    if new_value > cp.MAX_POWERS[power_axis-1] + power_padding:
+        return None
+    power_supply_index = cp.POWER_SUPPLIES[power_axis-1]-1
+    return (sp.PS_SET_OUTPUT_SIGNALS[power_supply_index], new_value)
+
+
+def pressure_setpoints(new_value: float) -> list[tuple]:
+    '''
+    Signals and values that set the capman pressure: the high vacuum valve position for the pressure range,
+    then the pressure
+
+    Parameters
+    ----------
+    new_value : float
+        New pressure in mTorr
+
+    Returns
+    -------
+    list[tuple]
+        [(signal name, value), ...], None if the pressure is out of range
+    '''
+    ranges = [(sp.pressure_lower_1, sp.pressure_upper_1, sp.valve_position_1),
+              (sp.pressure_lower_2, sp.pressure_upper_2, sp.valve_position_2),
+              (sp.pressure_lower_3, sp.pressure_upper_3, sp.valve_position_3)]
+    for lower, upper, valve_position in ranges:
+        if lower <= new_value <= upper:
+            return [(sp.SET_VALVE_POS, valve_position), (sp.SET_SPUTTER_PRESSURE, new_value)]
+    return None
+
+
+def ramp_time(old_parameters, new_parameters, power_axes, power_pad: bool) -> float:
+    '''
+    Time for the slowest target (or the pressure) to reach the new setpoints
+
+    Parameters
+    ----------
+    old_parameters : list
+        Previous setpoints (3 powers, pressure)
+    new_parameters : list
+        New setpoints (3 powers, pressure)
+    power_axes : list[bool]
+        Active power axes
+    power_pad : bool
+        If the powers are first set cp.POWER_PADDING above the new setpoints
+
+    Returns
+    -------
+    float
+        Ramp time in seconds (at most 10 s)
+    '''
+    pad = cp.POWER_PADDING if power_pad else 0
+    power_ramp_times = [0]
+    for n in range(3):
+        if power_axes[n]:
+            diff = abs(old_parameters[n]-(new_parameters[n]+pad))
+            power_ramp_times.append(float(diff)/float(cp.RAMP_RATES[n]))
+    power_ramp_time = max(power_ramp_times)
+
+    pressure_ramp_time = 0
+    if new_parameters[3] < old_parameters[3]:
+        pressure_ramp_time = 5
+        if new_parameters[3] < (old_parameters[3]-15):
+            pressure_ramp_time = 10
+
+    return min(max(power_ramp_time, pressure_ramp_time), 10)
+
+
+def ramp_times(old_parameters, new_parameters, power_axes, power_pad: bool) -> np.ndarray:
+    '''
+    ramp_time between every pair of old and new setpoints, in one pass
+
+    Parameters
+    ----------
+    old_parameters : array_like
+        Previous setpoints, one row per step (3 powers, pressure, ...)
+    new_parameters : array_like
+        New setpoints, one row per step (3 powers, pressure, ...)
+    power_axes : list[bool]
+        Active power axes
+    power_pad : bool
+        If the powers are first set cp.POWER_PADDING above the new setpoints
+
+    Returns
+    -------
+    np.ndarray
+        Ramp times in seconds, [i, j] from old step i to new step j
+    '''
+    old = np.asarray(old_parameters, dtype=float)[:, :4]
+    new = np.asarray(new_parameters, dtype=float)[:, :4]
+    pad = cp.POWER_PADDING if power_pad else 0
+    power_ramp_times = np.abs(old[:, None, :3] - (new[None, :, :3] + pad)) / np.asarray(cp.RAMP_RATES, dtype=float)
+    power_ramp_times = np.where(np.asarray(power_axes, dtype=bool)[:3], power_ramp_times, 0).max(axis=-1)
+
+    pressure_drop = old[:, None, 3] - new[None, :, 3]
+    pressure_ramp_times = np.where(pressure_drop > 15, 10, np.where(pressure_drop > 0, 5, 0))
+
+    return np.minimum(np.maximum(power_ramp_times, pressure_ramp_times), 10)
+
+
+class SetpointTransaction:
+    def __init__(self, write) -> None:
+        '''
+        Initialize a SetpointTransaction object
+
+        Parameters
+        ----------
+        write : callable
+            write(signal name, value) applies and verifies one setpoint, returns True on success
+            (e.g. control_eklipse.set_parameter without its own reset to zero)
+        '''
+        self.write = write
+        self.staged = []  # (signal, value, rollback value) not written yet
+        self.applied = []  # (signal, value, rollback value) written by commit
+
+    def stage(self, signal: str, value, rollback_value=0):
+        '''
+        Add a setpoint to the next commit
+
+        Parameters
+        ----------
+        signal : str
+            Signal name
+        value : number
+            New value
+        rollback_value : number, optional
+            Value the signal is set to if the transaction fails, None to leave it, by default 0
+        '''
+        self.staged.append((signal, value, rollback_value))
+
+    def commit(self) -> bool:
+        '''
+        Write all staged setpoints back to back, rolling back the transaction if one fails
+
+        Returns
+        -------
+        bool
+            All setpoints written and verified
+        '''
+        staged, self.staged = self.staged, []
+        for signal, value, rollback_value in staged:
+            if isinstance(value, np.generic):
+                value = value.item()
+            if not self.write(signal, value):
+                print("    Setpoint " + signal + " = " + str(value) + " could not be applied, rolling back")
+                self.applied.append((signal, value, rollback_value))
+                self.rollback()
+                return False
+            self.applied.append((signal, value, rollback_value))
+        return True
+
+    def rollback(self):
+        '''Set all written signals that have a rollback value back to it (latest first)'''
+        rolled_back = set()
+        for signal, _, rollback_value in reversed(self.applied):
+            if rollback_value is None or signal in rolled_back:
+                continue
+            rolled_back.add(signal)
+            if not self.write(signal, rollback_value):
+                print("    Rollback of " + signal + " to " + str(rollback_value) + " failed - check system!")
+        self.applied = []
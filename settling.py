@@ -0,0 +1,259 @@
+'''
+Vectorized settling detection for magnetron sputter recordings.
+Instead of recomputing the standard deviation of every tail of the recording (one pandas call per
+start index), the suffix statistics for all start indices are computed in a single pass using
+reverse cumulative sums on NumPy arrays.
+
+Steadiness is judged by criteria registered in CRITERIA. A criterion takes a 2-D array (rows x columns),
+one threshold per column, the time stamps and a window length in samples, and returns a boolean array
+of the same shape which is True where the column is steady from that row until the end of the recording.
+New criteria are added with the @criterion decorator and selected per column in
+campaign_parameters.STEADINESS_CRITERIA.
+'''
+
+import numpy as np
+
+CRITERIA = {}
+
+# relative band around a threshold in which the cumulative-sum result is re-checked with an exact two-pass std
+_TOLERANCE = 1e-9
+
+
+def _reverse_cumsum(values: np.ndarray) -> np.ndarray:
+    '''Cumulative sum from the last row towards the first row (along axis 0)'''
+    return np.cumsum(values[::-1], axis=0)[::-1]
+
+
+def _two_pass_std(column: np.ndarray) -> float:
+    '''Sample standard deviation (ddof=1, NaN skipped), computed the same way as pandas Series.std'''
+    column = column[~np.isnan(column)]
+    if len(column) < 2:
+        return np.nan
+    return float(np.sqrt(np.sum((column - column.mean())**2) / (len(column) - 1)))
+
+
+def suffix_std(values) -> np.ndarray:
+    '''
+    Calculates the sample standard deviation (ddof=1) of values[j:] for every start index j
+
+    Parameters
+    ----------
+    values: 1-D or 2-D array (rows x columns) of recorded values, NaN values are skipped like in pandas
+
+    Returns
+    -------
+    std: array with the same shape as values, where std[j] is the std of values[j:]
+    (NaN where fewer than two values remain)
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    finite = ~np.isnan(values)
+    count = _reverse_cumsum(finite.astype(np.float64))
+
+    # Center on the column mean to keep the sum of squares well conditioned
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centre = np.sum(np.where(finite, values, 0.0), axis=0) / np.sum(finite, axis=0)
+    deviations = np.where(finite, values - centre, 0.0)
+
+    s1 = _reverse_cumsum(deviations)
+    s2 = _reverse_cumsum(deviations**2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (s2 - s1*s1/count) / (count - 1)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    std[count < 2] = np.nan
+
+    return std
+
+
+def column_statistics(values) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Mean and sample standard deviation (ddof=1, NaN skipped) of every column, in one pass over a 2-D array.
+    Gives the same results as pandas DataFrame.mean() and DataFrame.std() on the same values.
+
+    Parameters
+    ----------
+    values: 2-D array (rows x columns), e.g. the steady region of a recording
+
+    Returns
+    -------
+    mean, std: arrays with one value per column (NaN where too few values)
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    finite = ~np.isnan(values)
+    count = np.sum(finite, axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.sum(np.where(finite, values, 0.0), axis=0) / count
+        deviations = np.where(finite, values - mean, 0.0)
+        std = np.sqrt(np.sum(deviations**2, axis=0) / (count - 1))
+    std[count < 2] = np.nan
+
+    return mean, std
+
+
+def _suffix_max(statistic: np.ndarray, rows: int) -> np.ndarray:
+    '''
+    Maximum of a per-window statistic over all windows starting at or after each row.
+    Rows without any complete window get +inf, so they are never judged steady.
+    '''
+    suffix_max = np.full((rows,) + statistic.shape[1:], np.inf)
+    suffix_max[:len(statistic)] = np.maximum.accumulate(statistic[::-1], axis=0)[::-1]
+    return suffix_max
+
+
+def _sliding_sum(values: np.ndarray, window: int) -> np.ndarray:
+    '''Sum over every window of length window (along axis 0), NaN values count as zero'''
+    values = np.nan_to_num(values)
+    kernel = np.ones(window)
+    return np.column_stack([np.convolve(values[:, k], kernel, 'valid') for k in range(values.shape[1])])
+
+
+def criterion(name: str):
+    '''Decorator registering a steadiness criterion in CRITERIA under the given name'''
+    def register(function):
+        CRITERIA[name] = function
+        return function
+    return register
+
+
+@criterion("suffix_std")
+def suffix_std_criterion(values, thresholds, time, window):
+    '''Steady from row j if the std of values[j:] is below the threshold [column unit]'''
+    std = suffix_std(values)
+    steady = std <= thresholds
+
+    # Re-check values within rounding distance of a threshold so decisions match the pandas loop exactly
+    near = np.abs(std - thresholds) <= _TOLERANCE * np.maximum(thresholds, 1.0)
+    for j, k in zip(*np.nonzero(near)):
+        steady[j, k] = _two_pass_std(values[j:, k]) <= thresholds[k]
+
+    return steady
+
+
+@criterion("slope")
+def slope_criterion(values, thresholds, time, window):
+    '''Steady from row j if the least-squares slope of every window after j is below the threshold [column unit/s]'''
+    rows = len(values)
+    if rows < window or window < 2:
+        return np.zeros(values.shape, dtype=bool)
+
+    # The slope of a window is its correlation with a centred ramp (uniform sampling assumed)
+    ramp = np.arange(window) - (window - 1) / 2
+    interval = np.median(np.diff(time)) if len(time) > 1 else 1.0
+    slopes = np.column_stack([np.convolve(values[:, k], ramp[::-1], 'valid') for k in range(values.shape[1])])
+    slopes = np.abs(slopes) / (np.sum(ramp**2) * interval)
+
+    return _suffix_max(slopes, rows) <= thresholds
+
+
+@criterion("drift")
+def drift_criterion(values, thresholds, time, window):
+    '''Steady from row j if the means of the two halves of values[j:] differ by less than the threshold [fraction of the mean]'''
+    rows = len(values)
+    finite = ~np.isnan(values)
+    zero = np.zeros((1, values.shape[1]))
+    total = np.concatenate([zero, np.cumsum(np.where(finite, values, 0.0), axis=0)])
+    count = np.concatenate([zero, np.cumsum(finite, axis=0)])
+
+    start = np.arange(rows)
+    middle = (start + rows + 1) // 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        first_half = (total[middle] - total[start]) / (count[middle] - count[start])
+        second_half = (total[rows] - total[middle]) / (count[rows] - count[middle])
+        mean = (total[rows] - total[start]) / (count[rows] - count[start])
+        drift = np.abs(second_half - first_half) / np.abs(mean)
+
+    return drift <= thresholds
+
+
+@criterion("change_point")
+def change_point_criterion(values, thresholds, time, window):
+    '''Steady from row j if no mean shift is detected between adjacent windows after j [z-score of the shift]'''
+    rows = len(values)
+    if rows < 2 * window or window < 2:
+        return np.zeros(values.shape, dtype=bool)
+
+    # Window means and variances from sliding sums of values centred on the column mean
+    centred = values - np.nanmean(values, axis=0)
+    s1 = _sliding_sum(centred, window)
+    s2 = _sliding_sum(centred**2, window)
+    mean = s1 / window
+    variance = np.maximum(s2 - s1*s1/window, 0.0) / (window - 1)
+
+    # Compare each window with the window directly after it
+    shift = np.abs(mean[window:] - mean[:-window])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = shift / np.sqrt((variance[window:] + variance[:-window]) / window)
+    z[shift == 0] = 0.0
+
+    return _suffix_max(z, rows) <= thresholds
+
+
+def steady_mask(columns, time, criteria: dict, window: int) -> np.ndarray:
+    '''
+    Evaluates all steadiness criteria of a campaign. Each criterion is called once on a 2-D array of
+    all columns it applies to.
+
+    Parameters
+    ----------
+    columns: mapping of column name to recorded values (e.g. a processed dataframe)
+    time: time stamps in seconds
+    criteria: {column name: {criterion name: threshold}}, see campaign_parameters.STEADINESS_CRITERIA
+    window: window length in samples for the windowed criteria
+
+    Returns
+    -------
+    steady: boolean array, True for every row from which all criteria hold until the end of the recording
+    '''
+    time = np.asarray(time, dtype=np.float64)
+    steady = np.ones(len(time), dtype=bool)
+
+    # Group columns by criterion
+    groups = {}
+    for column, column_criteria in criteria.items():
+        for name, threshold in column_criteria.items():
+            if name not in CRITERIA:
+                raise ValueError("Unknown steadiness criterion: " + name)
+            groups.setdefault(name, []).append((column, threshold))
+
+    for name, group in groups.items():
+        values = np.column_stack([np.asarray(columns[column], dtype=np.float64) for column, _ in group])
+        thresholds = np.array([threshold for _, threshold in group], dtype=np.float64)
+        steady &= np.all(CRITERIA[name](values, thresholds, time, window), axis=1)
+
+    return steady
+
+
+def first_steady_index(steady: np.ndarray, n_candidates: int):
+    '''
+    Returns the first index below n_candidates from which the recording is steady, or None
+    '''
+    steady = steady[:max(n_candidates, 0)]
+    if not steady.any():
+        return None
+    return int(np.argmax(steady))
+
+
+def find_settle_index(values, thresholds, n_candidates: int):
+    '''
+    Finds the first start index from which all columns stay below their std thresholds.
+    Equivalent to looping j over range(n_candidates) and checking df[p].tail(rows-j).std() <= threshold
+    for all columns p, but done in one vectorized pass.
+
+    Parameters
+    ----------
+    values: 2-D array (rows x columns) of the thresholded columns
+    thresholds: std threshold for each column
+    n_candidates: number of start indices to check (n_t + n_td in the Validator)
+
+    Returns
+    -------
+    index: first settled start index, or None if the experiment does not settle within n_candidates
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    steady = np.all(suffix_std_criterion(values, thresholds, None, None), axis=1)
+    return first_steady_index(steady, n_candidates)
@@ -0,0 +1,108 @@
+'''
+Cache of signal values read from eKLipse.
+Reading a signal through the GUI takes a tab click, a combo box selection and PWA_READ_WAIT_TIME, so
+control_eklipse.read_parameter keeps the values it reads in a SignalCache and reuses them while they are
+younger than the maximum age of the signal (campaign_parameters.SIGNAL_CACHE_MAX_AGE). Writes through
+control_eklipse.set_parameter invalidate the cache, and failed reads are never cached.
+'''
+
+import threading
+import time
+import campaign_parameters as cp
+
+
+class SignalCache:
+    def __init__(self, max_ages: dict = None, default_max_age: float = cp.SIGNAL_CACHE_DEFAULT_MAX_AGE,
+                 clock=time.monotonic) -> None:
+        '''
+        Initialize a SignalCache object
+
+        Parameters
+        ----------
+        max_ages : dict, optional
+            Maximum age in seconds per signal name, by default cp.SIGNAL_CACHE_MAX_AGE
+        default_max_age : float, optional
+            Maximum age in seconds of signals not in max_ages, by default cp.SIGNAL_CACHE_DEFAULT_MAX_AGE
+        clock : callable, optional
+            Monotonic clock in seconds, by default time.monotonic
+        '''
+        self.max_ages = dict(cp.SIGNAL_CACHE_MAX_AGE if max_ages is None else max_ages)
+        self.default_max_age = default_max_age
+        self.clock = clock
+        self.values = {}  # signal name -> (read time, value)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def max_age(self, signal: str) -> float:
+        '''Maximum age in seconds of a cached value of the signal'''
+        return self.max_ages.get(signal, self.default_max_age)
+
+    def get(self, signal: str, max_age: float = None):
+        '''Cached value of a signal, None if it is not cached or too old (counted as hit or miss)
+
+        Parameters
+        ----------
+        signal : str
+            Signal name
+        max_age : float, optional
+            Maximum age in seconds for this read, by default the policy of the signal
+        '''
+        if max_age is None:
+            max_age = self.max_age(signal)
+        with self.lock:
+            entry = self.values.get(signal)
+            if entry is not None and max_age > 0 and self.clock() - entry[0] <= max_age:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, signal: str, value, read_time: float = None):
+        '''Stores a value read at read_time (by default now)'''
+        with self.lock:
+            self.values[signal] = (self.clock() if read_time is None else read_time, value)
+
+    def read(self, signal: str, read_function, max_age: float = None, failed=None):
+        '''Cached value of a signal, or the value from read_function(signal) which is then cached
+
+        Parameters
+        ----------
+        signal : str
+            Signal name
+        read_function : callable
+            Reads the signal from eKLipse
+        max_age : float, optional
+            Maximum age in seconds for this read, by default the policy of the signal
+        failed : optional
+            Value returned by read_function for a failed read, which is not cached
+        '''
+        value = self.get(signal, max_age)
+        if value is not None:
+            return value
+        read_time = self.clock()
+        value = read_function(signal)
+        if value != failed:
+            self.put(signal, value, read_time)
+        return value
+
+    def invalidate(self, signal: str = None):
+        '''Drops the cached value of a signal, or of all signals'''
+        with self.lock:
+            if signal is None:
+                self.values.clear()
+            else:
+                self.values.pop(signal, None)
+
+    def stats(self) -> dict:
+        '''Hit and miss counters since the last reset'''
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit rate": self.hits/lookups if lookups else 0.0, "cached": len(self.values)}
+
+    def reset_stats(self):
+        '''Resets the hit and miss counters'''
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
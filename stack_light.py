@@ -0,0 +1,123 @@
+'''
+Detection of the blue stack light state (off, steady on or flashing) from consecutive samples.
+check_stack_light_status used to sample the blue light BLUE_FLASH_REPEATS times and count the changes.
+BlueLightDetector stops sampling as soon as the samples decide the state: enough changes prove flashing,
+and enough equal samples after the last change prove a steady light. The state found by the previous
+check is used as a prior: a light that was flashing is confirmed by a single change, and a steady light
+that still shows the same value is confirmed by fewer equal samples. Both numbers of equal samples follow
+from cp.BLUE_FLASH_PERIOD, so that they always span more than one phase of a flash.
+'''
+
+import campaign_parameters as cp
+
+BLUE_OFF = "off"
+BLUE_ON = "on"
+BLUE_FLASHING = "flashing"
+
+
+class BlueLightDetector:
+    def __init__(self, max_samples: int = cp.BLUE_FLASH_REPEATS, steady_samples: int = cp.BLUE_STEADY_SAMPLES,
+                 prior_steady_samples: int = cp.BLUE_STEADY_SAMPLES_PRIOR, flash_changes: int = 2) -> None:
+        '''
+        Initialize a BlueLightDetector object
+
+        Parameters
+        ----------
+        max_samples : int, optional
+            Maximum number of samples per detection, by default cp.BLUE_FLASH_REPEATS
+        steady_samples : int, optional
+            Equal samples that prove a steady light, by default cp.BLUE_STEADY_SAMPLES
+        prior_steady_samples : int, optional
+            Equal samples that confirm the steady light of the previous detection, by default cp.BLUE_STEADY_SAMPLES_PRIOR
+        flash_changes : int, optional
+            Changes between samples that prove flashing (one if it was flashing before), by default 2
+        '''
+        self.max_samples = max_samples
+        self.steady_samples = steady_samples
+        self.prior_steady_samples = prior_steady_samples
+        self.flash_changes = flash_changes
+        self.prior = None  # state found by the previous detection, None if unknown
+        self.samples = []
+        self.changes = 0
+        self.run = 0  # equal samples since the last change
+
+    def reset(self):
+        '''Forget the prior, e.g. when the stack light is not green'''
+        self.prior = None
+
+    def start(self):
+        '''Start a new detection'''
+        self.samples = []
+        self.changes = 0
+        self.run = 0
+
+    def add(self, sample: int) -> str:
+        '''
+        Add a sample of the blue light
+
+        Parameters
+        ----------
+        sample : int
+            1 if the blue light is on, 0 if off
+
+        Returns
+        -------
+        str
+            Detected state (BLUE_OFF, BLUE_ON or BLUE_FLASHING), None if more samples are needed
+        '''
+        if self.samples and sample != self.samples[-1]:
+            self.changes += 1
+            self.run = 1
+        else:
+            self.run += 1
+        self.samples.append(sample)
+
+        state = None
+        if self.changes >= (1 if self.prior == BLUE_FLASHING else self.flash_changes):
+            state = BLUE_FLASHING
+        elif self.run >= self._steady_samples_needed(sample):
+            state = BLUE_ON if sample == 1 else BLUE_OFF
+        elif len(self.samples) >= self.max_samples:
+            # Same rule as the fixed number of samples: flashing if more than one change
+            state = BLUE_FLASHING if self.changes > 1 else (BLUE_ON if sample == 1 else BLUE_OFF)
+
+        if state is not None:
+            self.prior = state
+        return state
+
+    def detect(self, read_sample, wait) -> str:
+        '''
+        Sample the blue light until its state is decided
+
+        Parameters
+        ----------
+        read_sample : callable
+            Returns the current value of the blue light (0 or 1)
+        wait : callable
+            Waits between samples (e.g. sleeps cp.BLUE_FLASH_WAIT)
+
+        Returns
+        -------
+        str
+            BLUE_OFF, BLUE_ON or BLUE_FLASHING
+        '''
+        self.start()
+        while True:
+            state = self.add(read_sample())
+            if state is not None:
+                return state
+            wait()
+
+    def unchanged(self, sample: int) -> bool:
+        '''Cheap check with a single sample: True if it is consistent with the previously detected state'''
+        if self.prior == BLUE_FLASHING:
+            return True  # a single sample cannot tell a flashing light apart from a steady one
+        if self.prior is None:
+            return False
+        return sample == (1 if self.prior == BLUE_ON else 0)
+
+    def _steady_samples_needed(self, sample: int) -> int:
+        prior_value = {BLUE_ON: 1, BLUE_OFF: 0}.get(self.prior)
+        if self.changes == 0 and sample == prior_value:
+            return self.prior_steady_samples
+        return self.steady_samples
@@ -0,0 +1,158 @@
+'''
+Streaming validation of a recording while eKLipse is still writing it.
+RecordingTail follows the growing recording CSV and only parses the lines added since the last read.
+SteadinessMonitor evaluates the Validator's steadiness criteria on the rows received so far and reports
+the settle time as soon as the recording, if stopped now, would be judged settled by Validator.validate.
+This allows control_eklipse.record_data to stop the dwell early once the plasma is steady.
+'''
+
+import io
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import recording_reader as rr
+import settling
+
+
+class RecordingTail:
+    def __init__(self, file_path: str, dtype=np.float64) -> None:
+        '''
+        Initialize a RecordingTail object
+
+        Parameters
+        ----------
+        file_path : str
+            Recording CSV file that is being written
+        dtype : optional
+            Dtype of the measured columns, by default np.float64
+        '''
+        self.file_path = file_path
+        self.dtype = dtype
+        self.offset = 0
+        self.partial_line = b""
+        self.info_lines = 0
+        self.signals = None  # eKLipse names from the header row
+        self.first_time_stamp = None
+        self.chunks = []
+        self.data = {}
+
+    def read(self) -> int:
+        '''Reads the lines appended to the file since the last call
+
+        Returns
+        -------
+        int
+            Number of new rows
+        '''
+        with open(self.file_path, 'rb') as file:
+            file.seek(self.offset)
+            new_bytes = file.read()
+        self.offset += len(new_bytes)
+
+        lines = (self.partial_line + new_bytes).split(b"\n")
+        self.partial_line = lines.pop()  # incomplete last line, completed by a later read
+        lines = [line.rstrip(b"\r") for line in lines if line.strip()]
+
+        # Recording information lines and column header
+        while lines and self.signals is None:
+            line = lines.pop(0)
+            if self.info_lines < rr.HEADER_ROWS:
+                self.info_lines += 1
+            else:
+                self.signals = line.decode().split(",")
+
+        if not lines:
+            return 0
+
+        chunk = pd.read_csv(io.BytesIO(b"\n".join(lines)), header=None, names=self.signals,
+                            dtype=rr.recording_dtypes(self.dtype))
+        chunk.rename(columns=rr.RECORDING_COLUMNS, inplace=True)
+
+        nanoseconds = rr.time_stamps_to_nanoseconds(chunk[rr.TIME_COLUMN].to_numpy())
+        if self.first_time_stamp is None:
+            self.first_time_stamp = nanoseconds[0]
+        chunk[rr.TIME_COLUMN] = (nanoseconds - self.first_time_stamp) / 1e9
+
+        # Same rounding as recording_reader.read_recording, so the criteria see the validated values
+        for column in chunk.columns:
+            if 'QCM' not in column and chunk[column].dtype.kind == 'f':
+                chunk[column] = np.round(chunk[column].to_numpy(), 3)
+
+        self.chunks.append(chunk)
+        self.data = {}
+        return len(chunk)
+
+    def columns(self) -> dict:
+        '''All rows received so far, as a dict of column name -> array'''
+        if not self.data and self.chunks:
+            self.data = {column: np.concatenate([chunk[column].to_numpy() for chunk in self.chunks])
+                         for column in self.chunks[0].columns}
+        return self.data
+
+    def latest_values(self) -> dict:
+        '''Values of the last received row, by eKLipse signal name'''
+        if not self.chunks:
+            return {}
+        names = {column: signal for signal, column in rr.RECORDING_COLUMNS.items()}
+        row = self.chunks[-1].iloc[-1]
+        return {names.get(column, column): row[column] for column in row.index}
+
+
+class SteadinessMonitor:
+    def __init__(self, criteria: dict, t: float, window: int, min_time: float = cp.STREAMING_MIN_TIME) -> None:
+        '''
+        Initialize a SteadinessMonitor object, usually through Validator.steadiness_monitor
+
+        Parameters
+        ----------
+        criteria : dict
+            Steadiness criteria per column, {column: {criterion name: threshold}}
+        t : float
+            Fraction of the recording within which the experiment must settle
+        window : int
+            Window length in samples for windowed criteria
+        min_time : float, optional
+            Minimum recorded time in seconds before steadiness is judged, by default cp.STREAMING_MIN_TIME
+        '''
+        self.criteria = criteria
+        self.t = t
+        self.window = window
+        self.min_time = min_time
+        self.tail = None
+        self.settle_index = None
+        self.settle_time = None
+
+    def follow(self, file_path: str):
+        '''Start following a recording file'''
+        self.tail = RecordingTail(file_path)
+        self.settle_index = None
+        self.settle_time = None
+
+    def poll(self) -> float:
+        '''Reads new rows and checks the steadiness criteria
+
+        Returns
+        -------
+        float
+            Settle time in seconds from the start of the recording, None if not (yet) settled
+        '''
+        if self.tail is None or self.tail.read() == 0:
+            return self.settle_time
+
+        columns = self.tail.columns()
+        time = columns[rr.TIME_COLUMN]
+        rows = len(time)
+        if time[-1] < self.min_time:
+            return None
+
+        # Settled if Validator.validate would accept the recording stopped now (settle index <= int(t*rows))
+        steady = settling.steady_mask(columns, time, self.criteria, self.window)
+        j = settling.first_steady_index(steady, int(self.t*rows) + 1)
+        if j is None:
+            self.settle_index = None
+            self.settle_time = None
+        else:
+            self.settle_index = j
+            self.settle_time = float(time[j])
+
+        return self.settle_time
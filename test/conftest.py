@@ -0,0 +1,9 @@
+import pytest
+import workflow_control as wc
+
+
+@pytest.fixture(autouse=True)
+def series_id_folder(monkeypatch, tmp_path):
+    # series IDs are allocated in a temporary folder instead of the lab computer's workflow folder
+    monkeypatch.setattr(wc, "path", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import algorithms
+
+ALL_AXES = np.array([True, True, True])
+AXES_2_3 = np.array([False, True, True])
+
+
+def unshifted_sobol(n, dimensions):
+    # the digital shift is a XOR with the same integers for every point
+    points = algorithms.sobol(n, dimensions, np.random.default_rng(0))
+    shift = algorithms.sobol(1, dimensions, np.random.default_rng(0))
+    return (points * 2 ** algorithms.SOBOL_BITS).astype(np.int64) ^ \
+        (shift * 2 ** algorithms.SOBOL_BITS).astype(np.int64)
+
+
+def test_sobol_starts_like_the_reference_sequence():
+    points = unshifted_sobol(8, 3) / 2 ** algorithms.SOBOL_BITS
+
+    assert points[:, 0].tolist() == [0, 0.5, 0.75, 0.25, 0.375, 0.875, 0.625, 0.125]
+    assert points[:, 1].tolist() == [0, 0.5, 0.25, 0.75, 0.375, 0.875, 0.125, 0.625]
+    assert points[:, 2].tolist() == [0, 0.5, 0.25, 0.75, 0.625, 0.125, 0.875, 0.375]
+
+
+@pytest.mark.parametrize("method", [algorithms.LATIN_HYPERCUBE, algorithms.SOBOL])
+def test_designs_fill_every_stratum(method):
+    n = 64
+    design = {
+        algorithms.LATIN_HYPERCUBE: algorithms.latin_hypercube,
+        algorithms.SOBOL: algorithms.sobol,
+    }[method](n, 12, np.random.default_rng(1))
+
+    assert design.shape == (n, 12)
+    assert ((design >= 0) & (design < 1)).all()
+    for column in design.T:
+        assert sorted(np.floor(column * n).astype(int)) == list(range(n))
+
+
+@pytest.mark.parametrize("method", [algorithms.RANDOM, algorithms.LATIN_HYPERCUBE, algorithms.SOBOL])
+def test_candidates_respect_limits_and_axes(method):
+    candidates = algorithms.sample_candidates(256, AXES_2_3, steps=3, method=method,
+                                              rng=np.random.default_rng(2))
+    lower, upper = algorithms.parameter_limits(AXES_2_3)
+
+    assert candidates.shape == (256, 3, 5)
+    assert candidates.dtype.kind == "i"
+    assert (candidates[:, :, 0] == 0).all()
+    assert ((candidates[:, :, :4] >= lower) & (candidates[:, :, :4] <= upper)).all()
+    assert (candidates[:, :, 4] == algorithms.recording_time).all()
+    # the limits themselves are reached
+    assert candidates[:, :, 1].min() == algorithms.power_min
+    assert candidates[:, :, 1].max() == algorithms.power2_max
+    assert candidates[:, :, 2].max() == algorithms.power3_max
+
+
+def test_same_seed_gives_same_candidates():
+    first = algorithms.sample_candidates(10, ALL_AXES, method=algorithms.SOBOL, rng=np.random.default_rng(3))
+    second = algorithms.sample_candidates(10, ALL_AXES, method=algorithms.SOBOL, rng=np.random.default_rng(3))
+
+    assert (first == second).all()
+
+
+def test_candidate_is_a_recipe_of_python_ints():
+    recipe = algorithms.sample_candidates(1, AXES_2_3, rng=np.random.default_rng(4))[0].tolist()
+
+    assert len(recipe) == 1 and len(recipe[0]) == 5
+    assert all(type(value) is int for value in recipe[0])
+
+
+def test_unknown_design_raises():
+    with pytest.raises(ValueError):
+        algorithms.sample_candidates(1, ALL_AXES, method="grid")
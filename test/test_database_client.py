@@ -0,0 +1,31 @@
+import database_client as dc
+
+
+class FakeCollection:
+    def __init__(self, database):
+        self.database = database
+        self.name = "Working Data"
+        self.index_calls = 0
+
+    def create_indexes(self, indexes):
+        self.index_calls += 1
+
+
+def test_clients_are_shared():
+    assert dc.get_client() is dc.get_client()
+    assert dc.get_client(maxPoolSize=2) is not dc.get_client()
+
+
+def test_collection_handle_does_not_connect():
+    collection = dc.get_collection("BERTHA-Test", "Working Data")
+
+    assert collection.full_name == "BERTHA-Test.Working Data"
+    assert collection.database.client is dc.get_client()
+
+
+def test_indexes_are_created_once():
+    collection = FakeCollection(dc.get_client()["BERTHA-Test"])
+
+    assert dc.ensure_indexes(collection)
+    assert dc.ensure_indexes(collection)
+    assert collection.index_calls == 1
@@ -0,0 +1,58 @@
+import pytest
+import bson
+import numpy as np
+import pandas as pd
+import document_format as dfmt
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    rows = 1000
+    return pd.DataFrame({
+        "Time Stamp": np.round(np.arange(rows) * 0.1, 3),
+        "Voltage_Ax1_[V]": np.round(300 + rng.normal(0, 1, rows), 3),
+        "QCM_1_frequency_[Hz]": 5e6 + rng.normal(0, 1, rows)
+    })
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_columnar_round_trip(df, compression):
+    doc = bson.decode(bson.encode(dfmt.pack_time_series(df, np.float64, compression)))
+
+    arrays = dfmt.load_time_series(doc)
+
+    for column in df.columns:
+        np.testing.assert_array_equal(arrays[column], df[column].to_numpy())
+
+
+def test_float32_keeps_time_and_qcm_in_float64(df):
+    arrays = dfmt.load_time_series(dfmt.pack_time_series(df, np.float32))
+
+    assert arrays["Voltage_Ax1_[V]"].dtype == np.float32
+    np.testing.assert_array_equal(arrays["QCM_1_frequency_[Hz]"], df["QCM_1_frequency_[Hz]"].to_numpy())
+    np.testing.assert_array_equal(arrays["Time Stamp"], df["Time Stamp"].to_numpy())
+
+
+def test_uncompressed_load_is_zero_copy(df):
+    doc = dfmt.pack_time_series(df)
+
+    array = dfmt.load_time_series(doc, ["Voltage_Ax1_[V]"])["Voltage_Ax1_[V]"]
+
+    assert not array.flags.writeable
+    assert array.base is not None
+
+
+def test_columnar_document_is_smaller_than_lists(df):
+    lists = bson.encode(dfmt.time_series_fields(df, dfmt.FORMAT_LISTS))
+    columnar = bson.encode(dfmt.time_series_fields(df, dfmt.FORMAT_COLUMNAR))
+
+    assert len(columnar) * 1.5 < len(lists)
+
+
+def test_load_lists_document(df):
+    doc = {"Settled": True, **dfmt.time_series_fields(df, dfmt.FORMAT_LISTS)}
+
+    arrays = dfmt.load_time_series(doc)
+
+    assert set(arrays) == set(df.columns)
@@ -0,0 +1,214 @@
+import asyncio
+import importlib
+import types
+import numpy as np
+import pytest
+import campaign_parameters as cp
+import system_parameters as sp
+import database_client as dc
+import recording_reader as rr
+import workflow_control as wc
+import control_eklipse
+import eklipse_simulator as sim
+from recording_index import RecordingIndex
+from recipe_monitor import RecipeMonitor
+
+AXIS_2_SUPPLY = cp.POWER_SUPPLIES[1] - 1
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.name = "test"
+        self.database = types.SimpleNamespace(client=object(), name="test")
+
+    def create_indexes(self, indexes):
+        pass
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+@pytest.fixture
+def eklipse(monkeypatch):
+    monkeypatch.setattr(sim, "instance", None)
+    return sim.start_eklipse()
+
+
+def ignite(eklipse):
+    for recipe in [sp.RECIPE_PREPARE, sp.PS_IGNITION_RECIPES[AXIS_2_SUPPLY]]:
+        assert eklipse.start_recipe(recipe)
+        monitor = sim.recipe_monitor(eklipse)
+        assert monitor.wait_for(lambda state: state.stack_light == sp.STACK_LIGHT_GREEN) is not None
+    sim.set_pressure(eklipse, cp.PRESPUTT_PARAMS[3])
+    sim.sleep(30)
+
+
+def test_clock_without_speed_only_advances_when_sleeping():
+    clock = sim.SimulatedClock()
+    clock.sleep(10)
+    clock.sleep_until(25)
+    clock.sleep_until(5)
+
+    assert clock.time() == 25
+
+
+def test_power_ramps_at_ramp_rate(eklipse):
+    ignite(eklipse)
+    signal = sp.PS_READ_POWER_SIGNALS[AXIS_2_SUPPLY]
+    assert float(sim.read_parameter(eklipse, signal)) == pytest.approx(cp.PRESPUTT_PARAMS[1], abs=1)
+
+    sim.set_power(eklipse, 100, 2)
+    written = eklipse.clock.time()
+    sim.sleep(1)
+
+    # the read includes the wait for the Actual field to show the signal
+    power = float(sim.read_parameter(eklipse, signal))
+    assert power == pytest.approx(cp.PRESPUTT_PARAMS[1] + cp.RAMP_RATES[1] * (eklipse.clock.time() - written), abs=1)
+
+
+def test_voltage_settles_to_presputter_voltage(eklipse):
+    ignite(eklipse)
+
+    voltage = float(sim.read_parameter(eklipse, sp.PS_READ_VOLTAGE_SIGNALS[AXIS_2_SUPPLY]))
+
+    assert voltage == pytest.approx(cp.PRESPUTT_VS[1], rel=0.01)
+
+
+def test_recipe_steps_and_stack_light(eklipse):
+    assert sim.check_stack_light_status(eklipse) == sp.STACK_LIGHT_GREEN
+    sim.start_recipe(eklipse, sp.RECIPE_SPUTTER_NO_SAMPLE)
+    monitor = sim.recipe_monitor(eklipse)
+
+    state = monitor.wait_for(lambda state: state.step >= sp.MAIN_RECIPE_DWELL_STEP_NO_SAMPLE)
+
+    assert state.stack_light == sp.STACK_LIGHT_GREEN_STEADY_BLUE
+    assert sp.MAIN_RECIPE_NAME_NO_SAMPLE in sim.check_running_recipe_name(eklipse)
+    eklipse.pause_recipe()
+    assert sim.check_stack_light_status(eklipse) == sp.STACK_LIGHT_GREEN_FLASH_BLUE
+    assert sim.resume_paused_recipe(eklipse)
+    assert sim.skip_recipe_step(eklipse)
+    assert monitor.wait_for(lambda state: state.stack_light == sp.STACK_LIGHT_GREEN, timeout=60) is not None
+    assert monitor.wait_for(lambda state: state.stack_light != sp.STACK_LIGHT_GREEN, timeout=5) is None
+
+
+def test_record_data_writes_readable_recording(eklipse, monkeypatch, tmp_path):
+    monkeypatch.setattr(sim, "RECORDING_PATH", str(tmp_path))
+    ignite(eklipse)
+    recordings = RecordingIndex(str(tmp_path))
+    start = eklipse.clock.time()
+
+    file_path = sim.record_data(eklipse, 10, recordings)
+
+    assert file_path is not None and file_path.startswith(str(tmp_path))
+    assert eklipse.clock.time() == pytest.approx(start + 10)
+    _, df = rr.read_recording(file_path)
+    assert len(df) == int(10 / cp.RECORDING_INTERVAL_NO_SAMPLE)
+    assert set(rr.RECORDING_COLUMNS.values()) <= set(df.columns)
+    assert df["Voltage_Ax2_[V]"].mean() == pytest.approx(cp.PRESPUTT_VS[1], rel=0.01)
+
+
+def test_control_eklipse_runs_on_the_simulated_gui(eklipse):
+    ignite(eklipse)
+    signal = sp.PS_READ_VOLTAGE_SIGNALS[AXIS_2_SUPPLY]
+
+    first = sim.read_parameter(eklipse, signal)
+
+    assert isinstance(sim.recipe_monitor(eklipse), RecipeMonitor)
+    assert eklipse.selections[sp.CHOOSE_SIGNAL_BOX_ID] == signal
+    assert control_eklipse.navigator(eklipse).selected_signal == signal
+    # the second read comes from the signal cache
+    hits = control_eklipse.signal_cache.stats()["hits"]
+    assert sim.read_parameter(eklipse, signal) == first
+    assert control_eklipse.signal_cache.stats()["hits"] == hits + 1
+
+
+def test_recording_setup_sets_signals_and_interval(eklipse, monkeypatch, tmp_path):
+    monkeypatch.setattr(sim, "RECORDING_PATH", str(tmp_path))
+
+    sim.setup_data_recording(eklipse, samples=True)
+    file_path = sim.record_data(eklipse, 2, RecordingIndex(str(tmp_path)))
+
+    _, df = rr.read_recording(file_path)
+    assert len(df) == round(2 / cp.RECORDING_INTERVAL_SAMPLE)
+    assert set(df.columns) == {rr.TIME_COLUMN, *rr.RECORDING_COLUMNS.values()}
+
+
+def test_same_seed_gives_same_recording(monkeypatch, tmp_path):
+    frames = []
+    for run in range(2):
+        monkeypatch.setattr(sim, "instance", None)
+        eklipse = sim.start_eklipse()
+        ignite(eklipse)
+        folder = tmp_path / str(run)
+        folder.mkdir()
+        monkeypatch.setattr(sim, "RECORDING_PATH", str(folder))
+        frames.append(rr.read_recording(sim.record_data(eklipse, 5, RecordingIndex(str(folder))))[1])
+
+    assert frames[0].equals(frames[1])
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+@pytest.fixture
+def bea_supervisor(monkeypatch, tmp_path, collection):
+    monkeypatch.setattr(cp, "EKLIPSE_BACKEND", "simulator")
+    module = importlib.import_module("bea_supervisor")
+    assert module.ce is sim
+    monkeypatch.setattr(sim, "instance", None)
+    monkeypatch.setattr(sim, "RECORDING_PATH", str(tmp_path))
+    monkeypatch.setattr(wc, "get_next_series_id", lambda: "001")
+    monkeypatch.setattr("builtins.input", lambda prompt="": "simulated series")
+    monkeypatch.setattr(dc, "get_collection", lambda database, name: collection)
+    return module
+
+
+@pytest.mark.parametrize("max_pending", [0, 2])
+def test_series_runs_on_simulator(bea_supervisor, collection, tmp_path, max_pending):
+    metadata = dict(cp.CAMPAIGN_METADATA)
+
+    asyncio.run(bea_supervisor.perform_series_async(
+        do_presputter=True, samples=False, power_axes=np.array([False, True, True]), max_runs=3,
+        power_pad=True, metadata=metadata, algorithm=lambda power_axes: [[0, 40, 30, 5, 10]],
+        max_pending=max_pending))
+
+    recordings = sorted(tmp_path.glob("*.csv"))
+    assert len(recordings) == 3
+    assert len(collection.docs) == 3
+    assert all(doc["Series ID"] == cp.CAMP_CODE + "_001" for doc in collection.docs)
+    # the process was ended
+    assert sim.check_stack_light_status(sim.instance) == sp.STACK_LIGHT_GREEN
+    assert not any(sim.instance.ignited)
+
+
+class ClosingAlgorithm:
+    def __init__(self):
+        self.closed = False
+        self.reported = False
+
+    def __call__(self, power_axes):
+        assert not self.closed
+        return [[0, 40, 30, 5, 10]]
+
+    def report(self):
+        self.reported = True
+
+    def close(self):
+        self.closed = True
+
+
+def test_series_closes_the_algorithm(bea_supervisor, collection):
+    algorithm = ClosingAlgorithm()
+
+    asyncio.run(bea_supervisor.perform_series_async(
+        do_presputter=False, samples=False, power_axes=np.array([False, True, True]), max_runs=2,
+        power_pad=True, metadata=dict(cp.CAMPAIGN_METADATA), algorithm=algorithm, max_pending=2))
+
+    assert len(collection.docs) == 2
+    assert algorithm.closed and algorithm.reported
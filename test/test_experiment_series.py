@@ -38,3 +38,9 @@ def test_update_run_metadata_appended_dict_correctly(series, metadata):
 def test_update_step_metadata_appended_dict_correctly(metadata):
     es.update_step_metadata(metadata, 3, [0, 0, 0, 0, 0])
     assert "Power_Ax2_setpoint_[W]", "Step_number" in metadata.keys()
+
+def test_allocated_series_id_is_not_allocated_again(mock_input, series_id_folder):
+    series = es.ExperimentSeries(False, '0', False, series_ID='007')
+
+    assert series.create_series_metadata()["Series ID"].endswith("_007")
+    assert not (series_id_folder / "BEA_SeriesID_tracker.txt").exists()
@@ -0,0 +1,233 @@
+import asyncio
+import threading
+import time
+import pytest
+from orchestration import SeriesPipeline, UI, VALIDATION
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class Instrument:
+    '''Records which threads use it and whether two calls ever overlap'''
+
+    def __init__(self, duration=0.02):
+        self.duration = duration
+        self.threads = set()
+        self.active = 0
+        self.overlaps = 0
+        self.lock = threading.Lock()
+
+    def step(self, n):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+            self.active += 1
+            self.overlaps += self.active > 1
+        time.sleep(self.duration)
+        with self.lock:
+            self.active -= 1
+        return "recording " + str(n)
+
+
+async def run_steps(pipeline, instrument, steps, validate, results):
+    for n in range(steps):
+        recording = await pipeline.ui(instrument.step, n)
+        await pipeline.validate(validate, recording, report=results.append)
+    await pipeline.drain()
+
+
+def test_ui_calls_run_on_one_thread_in_order():
+    instrument = Instrument(duration=0.001)
+
+    async def series():
+        pipeline = SeriesPipeline(workers=2)
+        try:
+            return await asyncio.gather(*(pipeline.ui(instrument.step, n) for n in range(10)))
+        finally:
+            await pipeline.close()
+
+    recordings = run(series())
+
+    assert recordings == ["recording " + str(n) for n in range(10)]
+    assert len(instrument.threads) == 1
+    assert threading.get_ident() not in instrument.threads
+    assert instrument.overlaps == 0
+
+
+def test_validation_overlaps_the_next_step():
+    instrument = Instrument(duration=0.05)
+    results = []
+
+    def validate(recording):
+        time.sleep(0.05)
+        return recording
+
+    async def series():
+        pipeline = SeriesPipeline(max_pending=2)
+        start = time.monotonic()
+        await run_steps(pipeline, instrument, 4, validate, results)
+        elapsed = time.monotonic() - start
+        await pipeline.close()
+        return elapsed, pipeline.stats()
+
+    elapsed, stats = run(series())
+
+    assert results == ["recording " + str(n) for n in range(4)]
+    # sequential: 4 * (0.05 + 0.05) s
+    assert elapsed < 0.35
+    assert stats[UI] >= 0.2 and stats[VALIDATION] >= 0.2
+
+
+def test_sequential_without_pending_validations():
+    instrument = Instrument(duration=0.001)
+    events = []
+
+    def validate(recording):
+        events.append(("validated", recording))
+        return True
+
+    async def series():
+        pipeline = SeriesPipeline(max_pending=0)
+        for n in range(3):
+            recording = await pipeline.ui(instrument.step, n)
+            events.append(("recorded", recording))
+            await pipeline.validate(validate, recording)
+        await pipeline.close()
+
+    run(series())
+
+    assert events == [(kind, "recording " + str(n)) for n in range(3) for kind in ("recorded", "validated")]
+
+
+def test_pending_validations_are_bounded():
+    instrument = Instrument(duration=0.001)
+    release = threading.Event()
+    running = []
+    most_running = []
+
+    def validate(recording):
+        running.append(recording)
+        most_running.append(len(running))
+        release.wait(5)
+        running.remove(recording)
+        return True
+
+    async def series():
+        pipeline = SeriesPipeline(workers=4, max_pending=2)
+        threading.Timer(0.1, release.set).start()
+        await run_steps(pipeline, instrument, 5, validate, [])
+        await pipeline.close()
+
+    run(series())
+
+    assert max(most_running) == 2
+
+
+def test_failed_validation_is_reported_as_none():
+    results = []
+
+    def validate(recording):
+        raise ValueError("unreadable recording")
+
+    async def series():
+        pipeline = SeriesPipeline()
+        await run_steps(pipeline, Instrument(duration=0.001), 2, validate, results)
+        await pipeline.close()
+
+    run(series())
+
+    assert results == [None, None]
+
+
+class LearningAlgorithm:
+    def __init__(self, validated):
+        self.validated = validated
+
+    def __call__(self, power_axes):
+        return [len(self.validated), power_axes]
+
+    def observe(self, doc):
+        pass
+
+
+def test_learning_algorithm_waits_for_pending_validations():
+    validated = []
+
+    def validate(recording):
+        time.sleep(0.05)
+        validated.append(recording)
+        return True
+
+    algorithm = LearningAlgorithm(validated)
+
+    async def series():
+        pipeline = SeriesPipeline(max_pending=2)
+        for n in range(2):
+            await pipeline.validate(validate, n)
+        pipeline.plan_ahead(algorithm, "axes")
+        recipe = await pipeline.next_recipe(algorithm, "not used")
+        await pipeline.close()
+        return recipe
+
+    assert run(series()) == [2, "axes"]
+
+
+def test_one_step_recipes_overlap_validation():
+    # one-step recipes of an algorithm that does not learn: the last step of a run is validated while
+    # the next recipe is planned and recorded
+    instrument = Instrument(duration=0.05)
+    results = []
+
+    def validate(recording):
+        time.sleep(0.05)
+        return recording
+
+    async def series():
+        pipeline = SeriesPipeline(max_pending=2)
+        start = time.monotonic()
+        for run_number in range(4):
+            recipe = await pipeline.next_recipe(lambda n: [n], run_number)
+            for step in recipe:
+                recording = await pipeline.ui(instrument.step, step)
+                await pipeline.validate(validate, recording, report=results.append)
+            pipeline.plan_ahead(lambda n: [n], run_number + 1)
+        await pipeline.drain()
+        elapsed = time.monotonic() - start
+        await pipeline.close()
+        return elapsed
+
+    elapsed = run(series())
+
+    assert results == ["recording " + str(n) for n in range(4)]
+    # sequential: 4 * (0.05 + 0.05) s
+    assert elapsed < 0.35
+
+
+def test_planning_service_does_not_wait_for_pending_validations():
+    release = threading.Event()
+    algorithm = LearningAlgorithm([])
+    algorithm.waits_for_results = False
+
+    async def series():
+        pipeline = SeriesPipeline(max_pending=2)
+        await pipeline.validate(lambda: release.wait(5))
+        pipeline.plan_ahead(algorithm, "axes")
+        recipe = await asyncio.wait_for(pipeline.next_recipe(algorithm, "not used"), 1)
+        release.set()
+        await pipeline.close()
+        return recipe
+
+    assert run(series()) == [0, "axes"]
+
+
+@pytest.mark.parametrize("max_pending", [0, 2])
+def test_recipe_computed_when_not_planned_ahead(max_pending):
+    async def series():
+        pipeline = SeriesPipeline(max_pending=max_pending)
+        pipeline.plan_ahead(lambda: "planned")
+        recipe = await pipeline.next_recipe(lambda: "computed")
+        await pipeline.close()
+        return recipe
+
+    assert run(series()) == ("planned" if max_pending else "computed")
@@ -0,0 +1,121 @@
+import pickle
+import time
+import numpy as np
+import pytest
+import algorithms
+import planner
+
+AXES_2_3 = np.array([False, True, True])
+
+
+def step_document(setpoints, settling_time):
+    doc = dict(zip(planner.SETPOINT_FIELDS, setpoints))
+    doc.update({"Settled": True, "Settling time": settling_time, "Dwell_time_[s]": 10})
+    return doc
+
+
+def test_incremental_update_matches_full_factorization():
+    rng = np.random.default_rng(0)
+    X = rng.random((30, 4))
+    y = np.sin(3 * X).sum(axis=1)
+    gp = planner.GaussianProcess(length_scale=0.3, noise=0.01)
+    for x, value in zip(X, y):
+        gp.add(x, value)
+    X_test = rng.random((20, 4))
+
+    mean, std = gp.predict(X_test)
+
+    scale = y.std()
+    K = gp.kernel(X, X) + 0.01 * np.eye(30)
+    K_test = gp.kernel(X_test, X)
+    expected_mean = y.mean() + scale * K_test @ np.linalg.solve(K, (y - y.mean()) / scale)
+    expected_var = 1 - np.einsum("ij,ji->i", K_test, np.linalg.solve(K, K_test.T))
+    assert mean == pytest.approx(expected_mean, abs=1e-6)
+    assert std == pytest.approx(scale * np.sqrt(expected_var), abs=1e-6)
+
+
+def test_prediction_is_uncertain_away_from_observations():
+    gp = planner.GaussianProcess(length_scale=0.2, noise=0.01)
+    gp.add(np.zeros(4), 1.0)
+    gp.add(np.full(4, 0.1), 2.0)
+
+    _, std = gp.predict(np.array([np.full(4, 0.05), np.ones(4)]))
+
+    assert std[0] < std[1]
+
+
+def test_initial_recipes_are_within_limits():
+    gp_planner = planner.GaussianProcessPlanner(steps=3, seed=0)
+
+    recipe = gp_planner(AXES_2_3)
+
+    lower, upper = algorithms.parameter_limits(AXES_2_3)
+    assert len(recipe) == 3
+    for step in recipe:
+        assert all(type(value) is int for value in step)
+        assert (np.array(step[:4]) >= lower).all() and (np.array(step[:4]) <= upper).all()
+
+
+def test_initial_recipes_are_the_rows_of_one_sobol_design():
+    gp_planner = planner.GaussianProcessPlanner(steps=2, initial_runs=8, seed=3)
+    design = gp_planner.initial_design(AXES_2_3)
+    steps = []
+    for _ in range(4):
+        recipe = gp_planner(AXES_2_3)
+        # a snapshot planning in another process hands out the same rows
+        assert pickle.loads(pickle.dumps(gp_planner))(AXES_2_3) == recipe
+        for step in recipe:
+            steps.append(step)
+            gp_planner.observe(step_document(step[:4], 1))
+
+    assert steps == design[:8].tolist()
+    # the unit design behind the rows: every eighth of every setpoint range is visited once
+    unit = algorithms.sobol(len(design), 3, np.random.default_rng(gp_planner.design_seed))[:8]
+    for column in unit.T:
+        assert sorted(np.floor(column * 8).astype(int)) == list(range(8))
+
+
+def test_planner_approaches_best_setpoints():
+    gp_planner = planner.GaussianProcessPlanner(seed=1, candidates=512)
+    best = gp_planner.scale(np.array([0, 60, 30, 20]))
+
+    def settling_time(setpoints):
+        return float(((gp_planner.scale(setpoints) - best) ** 2).sum())
+
+    distances = []
+    for _ in range(25):
+        step = gp_planner(AXES_2_3)[0]
+        distances.append(settling_time(step))
+        gp_planner.observe(step_document(step[:4], settling_time(step)))
+
+    assert len(gp_planner.gp) == 25
+    initial = min(distances[:gp_planner.initial_runs])
+    assert min(distances[gp_planner.initial_runs:]) < initial / 4
+
+
+def test_incomplete_documents_are_ignored():
+    gp_planner = planner.GaussianProcessPlanner()
+
+    gp_planner.load([{"Settled": True, "Settling time": 2}, step_document([0, 40, 30, 5], None),
+                     step_document([0, 40, 30, 5], 2)])
+
+    assert len(gp_planner.gp) == 1
+
+
+def test_unsettled_step_scores_the_dwell_time():
+    doc = step_document([0, 40, 30, 5], 2)
+    doc["Settled"] = False
+
+    assert planner.settling_objective(doc) == -10
+
+
+def test_planning_stays_fast_as_observations_grow():
+    gp_planner = planner.GaussianProcessPlanner(seed=2)
+    rng = np.random.default_rng(2)
+    for step in algorithms.sample_candidates(300, AXES_2_3, rng=rng)[:, 0]:
+        gp_planner.observe(step_document(step[:4], rng.random()))
+
+    start = time.perf_counter()
+    gp_planner(AXES_2_3)
+
+    assert time.perf_counter() - start < 2
@@ -0,0 +1,104 @@
+import time
+import numpy as np
+import pytest
+import planner
+from planning_service import PlanningService
+
+AXES = np.array([False, True, True])
+
+
+class CountingPlanner:
+    '''Plans a recipe telling how many steps it had observed, after a delay'''
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.observed = 0
+
+    def __call__(self, power_axes):
+        time.sleep(self.delay)
+        return [[0, 20 + self.observed, 20, 5, 10]]
+
+    def observe(self, doc):
+        self.observed += 1
+
+
+def fallback(power_axes):
+    return [[0, 15, 15, 5, 10]]
+
+
+@pytest.fixture
+def service(request):
+    service = PlanningService(CountingPlanner(**getattr(request, "param", {})), fallback=fallback, deadline=30)
+    yield service
+    service.close()
+
+
+def wait_for_proposal(service, timeout=30):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        with service.lock:
+            if service.proposal is not None and service.proposal[0] == service.version:
+                return
+        time.sleep(0.01)
+    raise AssertionError("no proposal planned")
+
+
+def test_recipe_planned_from_the_latest_step(service):
+    assert service(AXES) == [[0, 20, 20, 5, 10]]
+    service.observe({})
+    service.observe({})
+    wait_for_proposal(service)
+
+    assert service(AXES) == [[0, 22, 20, 5, 10]]
+    assert service.counts == {"planned": 1, "stale": 0, "waited": 1, "fallback": 0}
+    assert service.recipe_versions == [(0, 0), (2, 2)]
+
+
+def test_proposal_is_used_once(service):
+    service(AXES)
+    service.observe({})
+    wait_for_proposal(service)
+
+    assert service(AXES) == service(AXES) == [[0, 21, 20, 5, 10]]
+    assert service.counts["planned"] == 1 and service.counts["waited"] == 2
+
+
+@pytest.mark.parametrize("service", [{"delay": 0.5}], indirect=True)
+def test_older_proposal_returned_without_waiting(service):
+    service(AXES)
+    service.observe({})
+    wait_for_proposal(service)
+    # the last step is observed while its recipe is requested, planning from it takes 0.5 s
+    service.observe({})
+
+    start = time.monotonic()
+    assert service(AXES) == [[0, 21, 20, 5, 10]]
+    assert time.monotonic() - start < 0.3
+    assert service.recipe_versions[-1] == (2, 1)
+
+    wait_for_proposal(service)
+    assert service(AXES) == [[0, 22, 20, 5, 10]]
+    assert service.counts == {"planned": 1, "stale": 1, "waited": 1, "fallback": 0}
+
+
+@pytest.mark.parametrize("service", [{"delay": 2}], indirect=True)
+def test_fallback_when_planner_misses_deadline(service):
+    service.deadline = 0.1
+
+    assert service(AXES) == fallback(AXES)
+    assert service.counts["fallback"] == 1
+
+
+def test_gaussian_process_planner_plans_in_a_process():
+    gp_planner = planner.GaussianProcessPlanner(seed=0, initial_runs=2, candidates=256)
+    with PlanningService(gp_planner, deadline=30) as service:
+        service(AXES)
+        for power in (20, 60, 100):
+            doc = dict(zip(planner.SETPOINT_FIELDS, [0, power, 30, 10]))
+            service.observe({**doc, "Settled": True, "Settling time": power / 20})
+        wait_for_proposal(service)
+
+        recipe = service(AXES)
+
+    assert len(gp_planner.gp) == 3
+    assert recipe[0][0] == 0 and 15 <= recipe[0][1] <= 70
@@ -0,0 +1,128 @@
+import threading
+import time
+import pytest
+from recipe_monitor import RecipeMonitor, RecipeState
+
+RUNNING = "running"
+DONE = "done"
+
+
+class FakeRecipe:
+    '''Recipe state changed by the test, sampled by the monitor'''
+
+    def __init__(self):
+        self.stack_light = RUNNING
+        self.step = 1
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def sample(self):
+        with self.lock:
+            self.samples += 1
+            return RecipeState(self.stack_light, "recipe", self.step, time.monotonic())
+
+
+@pytest.fixture
+def recipe():
+    return FakeRecipe()
+
+
+@pytest.fixture
+def monitor(recipe):
+    monitor = RecipeMonitor(recipe.sample, interval=0.01)
+    yield monitor
+    monitor.stop()
+
+
+def test_wait_returns_on_change(recipe, monitor):
+    threading.Timer(0.05, lambda: setattr(recipe, "stack_light", DONE)).start()
+
+    state = monitor.wait_for(lambda state: state.stack_light == DONE, timeout=5)
+
+    assert state is not None and state.stack_light == DONE
+
+
+def test_wait_needs_sample_taken_after_call(recipe, monitor):
+    monitor.wait_for(lambda state: True, timeout=5)
+    recipe.step = 5
+
+    state = monitor.wait_for(lambda state: True, timeout=5)
+
+    assert state.step == 5
+
+
+def test_wait_times_out(monitor):
+    start = time.monotonic()
+
+    assert monitor.wait_for(lambda state: state.stack_light == DONE, timeout=0.05) is None
+    assert time.monotonic() - start < 1
+
+
+def test_no_sampling_without_waiters(recipe, monitor):
+    monitor.wait_for(lambda state: True, timeout=5)
+    samples = recipe.samples
+    time.sleep(0.1)
+
+    assert recipe.samples == samples
+
+
+def test_listeners_called_on_changes_only(recipe, monitor):
+    changes = []
+    monitor.add_listener(lambda old, new: changes.append((old and old.step, new.step)))
+    threading.Timer(0.05, lambda: setattr(recipe, "step", 2)).start()
+
+    monitor.wait_for(lambda state: state.step == 2, timeout=5)
+
+    assert changes == [(None, 1), (1, 2)]
+
+
+def test_sample_errors_do_not_stop_monitor(recipe, monitor):
+    failures = [RuntimeError("stale")]
+    sample = recipe.sample
+
+    def failing_sample():
+        if failures:
+            raise failures.pop()
+        return sample()
+
+    monitor.sample = failing_sample
+
+    assert monitor.wait_for(lambda state: True, timeout=5) is not None
+    assert isinstance(monitor.error, RuntimeError)
+
+
+def test_wait_raises_when_samples_keep_failing(recipe):
+    def failing_sample():
+        raise ValueError("invalid literal for int() with base 10: 'Failed to read value'")
+
+    monitor = RecipeMonitor(failing_sample, interval=0.01, max_failures=3)
+    start = time.monotonic()
+    try:
+        with pytest.raises(ValueError):
+            monitor.wait_for(lambda state: True)
+    finally:
+        monitor.stop()
+
+    assert monitor.failures >= 3
+    assert time.monotonic() - start < 1
+
+
+def test_wait_holds_until_sample_in_progress_finished(recipe):
+    ui_lock = threading.RLock()
+    sampling = threading.Event()
+    release = threading.Event()
+
+    def slow_sample():
+        sampling.set()
+        release.wait(5)
+        return recipe.sample()
+
+    monitor = RecipeMonitor(slow_sample, interval=0.01, ui_lock=ui_lock)
+    threading.Timer(0.1, release.set).start()
+    try:
+        assert monitor.wait_for(lambda state: False, timeout=0.05) is None
+        assert sampling.is_set() and release.is_set()
+        assert ui_lock.acquire(blocking=False)
+        ui_lock.release()
+    finally:
+        monitor.stop()
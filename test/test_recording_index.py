@@ -0,0 +1,61 @@
+import os
+import pytest
+from recording_index import RecordingIndex
+
+
+def write_recording(folder, name, mtime):
+    file_path = os.path.join(folder, name)
+    with open(file_path, 'w') as file:
+        file.write("Time Stamp\n")
+    os.utime(file_path, ns=(mtime, mtime))
+    return file_path
+
+
+@pytest.fixture
+def folder(tmp_path):
+    write_recording(tmp_path, "old_1.csv", 1_000)
+    write_recording(tmp_path, "old_2.csv", 2_000)
+    write_recording(tmp_path, "notes.txt", 5_000)
+    return str(tmp_path)
+
+
+def test_latest_returns_newest_csv(folder):
+    index = RecordingIndex(folder)
+
+    assert index.latest() == os.path.join(folder, "old_2.csv")
+
+
+def test_update_only_returns_new_files(folder):
+    index = RecordingIndex(folder)
+    index.update()
+    new_file = write_recording(folder, "new.csv", 3_000)
+
+    assert index.update() == [new_file]
+    assert index.update() == []
+
+
+def test_recording_since_mark(folder):
+    index = RecordingIndex(folder)
+    index.mark()
+
+    assert index.recording_since_mark() is None
+
+    new_file = write_recording(folder, "new.csv", 3_000)
+    assert index.recording_since_mark() == new_file
+
+
+def test_high_water_mark_is_persisted(folder, tmp_path_factory):
+    state_file = str(tmp_path_factory.mktemp("state") / "index.json")
+    RecordingIndex(folder, state_file=state_file).update()
+
+    index = RecordingIndex(folder, state_file=state_file)
+
+    assert index.update() == []
+    assert index.latest() == os.path.join(folder, "old_2.csv")
+
+
+def test_does_not_change_working_directory(folder):
+    cwd = os.getcwd()
+    RecordingIndex(folder).latest()
+
+    assert os.getcwd() == cwd
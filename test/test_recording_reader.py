@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import system_parameters as sp
+import recording_reader as rr
+import validate as vd
+
+
+@pytest.fixture
+def recording(tmp_path):
+    rows = 500
+    rng = np.random.default_rng(0)
+    signals = {}
+    for signal, column in rr.RECORDING_COLUMNS.items():
+        if 'QCM' in column:
+            signals[signal] = 5e6 + rng.normal(0, 1, rows)
+        else:
+            signals[signal] = 100 + rng.normal(0, 5, rows)
+    file_path = str(tmp_path / "recording.csv")
+    rr.write_recording(file_path, pd.Timestamp("2024-03-14 10:15:32.100"),
+                       np.arange(rows) * 0.1, signals, interval=0.1)
+    return file_path
+
+
+def read_legacy(file_path):
+    df = pd.read_csv(file_path, skiprows=[0, 1])
+    df.rename(columns=cp.RECORDING_NAMES, inplace=True)
+    df.rename(columns=sp.BASIC_PARAMETERS_TS, inplace=True)
+    return vd.Validator.process_df(None, df)
+
+
+def test_read_recording_matches_process_df(recording):
+    date, df = rr.read_recording(recording)
+    legacy_date, legacy_df = read_legacy(recording)
+
+    assert date == legacy_date == "03/14/2024"
+    pd.testing.assert_frame_equal(df, legacy_df)
+
+
+def test_read_recording_float32(recording):
+    _, df = rr.read_recording(recording, dtype=np.float32)
+
+    assert df["Voltage_Ax1_[V]"].dtype == np.float32
+    assert df["QCM_1_frequency_[Hz]"].dtype == np.float64
+    assert df["Time Stamp"].iloc[-1] == pytest.approx(49.9)
+
+
+def test_time_stamps_across_midnight():
+    time_stamps = ["Mar-14-2024 23:59:59.900 PM", "Mar-15-2024 00:00:00.000 AM",
+                   "Mar-15-2024 00:00:00.150 AM"]
+
+    date, seconds = rr.time_stamps_to_seconds(np.array(time_stamps, dtype=object))
+
+    assert date == "03/14/2024"
+    np.testing.assert_allclose(seconds, [0, 0.1, 0.25])
+
+
+def test_time_stamps_fall_back_for_variable_width():
+    time_stamps = ["Mar-14-2024 10:00:00.1 AM", "Mar-14-2024 10:00:00.25 AM"]
+
+    _, seconds = rr.time_stamps_to_seconds(np.array(time_stamps, dtype=object))
+
+    np.testing.assert_allclose(seconds, [0, 0.15])
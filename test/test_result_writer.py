@@ -0,0 +1,179 @@
+import itertools
+import threading
+import time
+import bson
+import numpy as np
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+from result_writer import ResultWriter
+
+
+class FakeCollection:
+    '''In-process stand-in for a MongoDB collection'''
+
+    def __init__(self):
+        self.docs = {}
+        self.reachable = True
+        self.insert_calls = 0
+        self.ids = itertools.count()
+
+    def insert_many(self, docs, ordered=True):
+        self.insert_calls += 1
+        if not self.reachable:
+            raise AutoReconnect("database unreachable")
+        errors = []
+        for doc in docs:
+            doc.setdefault("_id", next(self.ids))
+            # raises bson.errors.InvalidDocument, as pymongo does before sending the documents
+            bson.encode(doc)
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000})
+            elif "Invalid" in doc:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "journal.bson")
+
+
+def test_documents_are_inserted_in_batches(collection, journal_path):
+    writer = ResultWriter(collection, journal_path, batch_size=10, flush_interval=0.5)
+    for k in range(25):
+        writer.submit({"Step_number": k})
+    writer.close()
+
+    assert len(collection.docs) == 25
+    assert collection.insert_calls <= 5
+
+
+def test_unreachable_database_spills_to_journal_and_replays(collection, journal_path):
+    collection.reachable = False
+    writer = ResultWriter(collection, journal_path, batch_size=5, flush_interval=0.05, retry_interval=0)
+    for k in range(7):
+        writer.submit({"Step_number": k})
+    writer.flush()
+
+    assert writer.journal_size() == 7
+    assert collection.docs == {}
+
+    collection.reachable = True
+    writer.submit({"Step_number": 7})
+    writer.close()
+
+    assert sorted(doc["Step_number"] for doc in collection.docs.values()) == list(range(8))
+    assert writer.journal_size() == 0
+
+
+def test_full_queue_never_blocks(collection, journal_path):
+    collection.reachable = False
+    writer = ResultWriter(collection, journal_path, max_queue=2, batch_size=1, flush_interval=1, retry_interval=60)
+    for k in range(20):
+        writer.submit({"Step_number": k})
+    writer.flush()
+
+    assert writer.journal_size() == 20
+    collection.reachable = True
+    writer.close()
+    assert len(collection.docs) == 20
+
+
+def test_replay_skips_documents_already_inserted(collection, journal_path):
+    writer = ResultWriter(collection, journal_path, retry_interval=0)
+    doc = {"Step_number": 1}
+    collection.insert_many([doc])
+    writer._journal([doc])
+    writer.close()
+
+    assert len(collection.docs) == 1
+    assert writer.journal_size() == 0
+
+
+def test_documents_submitted_after_close_are_journaled(collection, journal_path):
+    writer = ResultWriter(collection, journal_path)
+    writer.close()
+    writer.submit({"Step_number": 1})
+
+    assert writer.journal_size() == 1
+    ResultWriter(collection, journal_path, retry_interval=0).close()
+    assert [doc["Step_number"] for doc in collection.docs.values()] == [1]
+
+
+def test_journaling_does_not_wait_for_a_replay(collection, journal_path):
+    # the writer thread stays idle, the replay is run by the test
+    writer = ResultWriter(collection, journal_path, flush_interval=30, retry_interval=60)
+    writer._journal([{"Step_number": 0}])
+    release = threading.Event()
+    inserting = threading.Event()
+    insert_many = collection.insert_many
+
+    def slow_insert_many(docs, ordered=True):
+        inserting.set()
+        release.wait(5)
+        return insert_many(docs, ordered)
+
+    collection.insert_many = slow_insert_many
+    replay = threading.Thread(target=writer._replay_journal, kwargs={"force": True})
+    replay.start()
+    assert inserting.wait(5)
+
+    start = time.monotonic()
+    writer._journal([{"Step_number": 1}])
+    assert time.monotonic() - start < 1
+
+    release.set()
+    replay.join()
+    assert [doc["Step_number"] for doc in collection.docs.values()] == [0]
+    assert writer.journal_size() == 1
+    writer.close()
+    assert sorted(doc["Step_number"] for doc in collection.docs.values()) == [0, 1]
+
+
+def test_unencodable_document_is_rejected_and_writer_goes_on(collection, journal_path):
+    writer = ResultWriter(collection, journal_path, batch_size=5, flush_interval=0.05)
+    writer.submit({"Step_number": 0})
+    writer.submit({"Step_number": np.int64(1)})
+    writer.submit({"Step_number": 2})
+    writer.flush()
+    writer.submit({"Step_number": 3})
+    writer.close()
+
+    assert sorted(doc["Step_number"] for doc in collection.docs.values()) == [0, 2, 3]
+    assert writer.rejected == 1
+    with open(journal_path + ".rejected", 'rb') as file:
+        assert [doc["Step_number"] for doc in bson.decode_file_iter(file)] == [1]
+
+
+def test_unencodable_document_is_rejected_when_journaled(collection, journal_path):
+    collection.reachable = False
+    writer = ResultWriter(collection, journal_path, batch_size=5, flush_interval=0.05, retry_interval=60)
+    writer.submit({"Step_number": np.int64(0)})
+    writer.submit({"Step_number": 1})
+    writer.flush()
+
+    assert writer.journal_size() == 1
+    assert writer.rejected == 1
+    collection.reachable = True
+    writer.close()
+    assert [doc["Step_number"] for doc in collection.docs.values()] == [1]
+
+
+def test_rejected_documents_do_not_block_the_journal(collection, journal_path):
+    writer = ResultWriter(collection, journal_path, batch_size=5, flush_interval=0.05, retry_interval=0)
+    writer._journal([{"Step_number": 0, "Invalid": True}, {"Step_number": 1}])
+    writer.submit({"Step_number": 2})
+    writer.close()
+
+    assert sorted(doc["Step_number"] for doc in collection.docs.values()) == [1, 2]
+    assert writer.journal_size() == 0
+    assert writer.rejected == 1
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import recording_reader as rr
+import revalidate
+
+
+def write_recordings(directory, settle_rows, rows=200, missing=()):
+    rng = np.random.default_rng(0)
+    for n, settle_row in enumerate(settle_rows):
+        ramp = np.clip(1 - np.arange(rows)/max(settle_row, 1), 0, None)
+        signals = {}
+        for signal, column in rr.RECORDING_COLUMNS.items():
+            if column in missing:
+                continue
+            noise = 1 if 'QCM' in column else (0.01 if 'pressure' in column else 0.2)
+            signals[signal] = 100 + 30*ramp + rng.normal(0, noise, rows)
+        rr.write_recording(str(directory / ("recording_" + str(n) + ".csv")), pd.Timestamp("2024-03-14 10:15:32.100"),
+                           np.arange(rows) * 0.1, signals, interval=0.1)
+
+
+def test_revalidate_writes_status_per_recording(tmp_path):
+    archive = tmp_path / "RecordingData"
+    (archive / "old").mkdir(parents=True)
+    write_recordings(archive, [20, 130])
+    write_recordings(archive / "old", [180])
+    (archive / "broken.csv").write_text("not a recording\n")
+    output = tmp_path / "results.csv"
+
+    counts = revalidate.main([str(archive), "--output", str(output), "--workers", "2", "--chunk-size", "2"])
+
+    results = pd.read_csv(output)
+    assert counts == {"settled": 1, "rerun": 1, "unsettled": 1, "error": 1}
+    assert list(results["Status"]) == ["error", "unsettled", "settled", "rerun"]
+    assert results["Settling time"].iloc[2] <= 5
+    assert list(results.columns) == list(revalidate.result_columns())
+
+
+def test_thresholds_can_be_changed(tmp_path):
+    write_recordings(tmp_path, [20])
+    table = revalidate.ResultTable(str(tmp_path / "results.csv"))
+    criteria = revalidate.campaign_criteria(sigma_v=0.01)
+
+    counts = revalidate.revalidate(revalidate.find_recordings(str(tmp_path)), table, criteria, workers=1)
+
+    assert criteria["Voltage_Ax1_[V]"]["suffix_std"] == 0.01
+    assert counts == {"unsettled": 1}
+
+
+def test_recording_missing_a_thresholded_column_is_an_error(tmp_path):
+    archive = tmp_path / "RecordingData"
+    (archive / "two_axes").mkdir(parents=True)
+    write_recordings(archive, [20])
+    write_recordings(archive / "two_axes", [20], missing=["Voltage_Ax3_[V]"])
+    output = tmp_path / "results.csv"
+
+    counts = revalidate.main([str(archive), "--output", str(output), "--workers", "1"])
+
+    results = pd.read_csv(output)
+    assert counts == {"settled": 1, "error": 1}
+    error = results[results["Status"] == "error"].iloc[0]
+    assert "two_axes" in error["File"] and "Voltage_Ax3_[V]" in error["Error"]
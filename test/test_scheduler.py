@@ -0,0 +1,69 @@
+import itertools
+import numpy as np
+import campaign_parameters as cp
+import setpoints
+import scheduler
+import algorithms
+
+AXES = [False, True, True]
+START = cp.PRESPUTT_PARAMS + [cp.PRESPUTT_TIME]
+
+
+def test_two_opt_untangles_a_crossing_path():
+    points = np.array([[0, 0], [1, 0], [2, 1], [2, 0], [1, 1]], dtype=float)
+    times = np.abs(points[:, None] - points[None]).sum(axis=-1)
+
+    path = scheduler.two_opt(times, [0, 1, 2, 3, 4])
+
+    assert path[0] == 0
+    assert scheduler.path_time(times, path) == 4
+
+
+def test_reversal_accounts_for_asymmetric_ramps():
+    # going up is free, going down costs 1 per step
+    times = np.array([[max(a - b, 0) for b in range(4)] for a in range(4)], dtype=float)
+
+    path = scheduler.two_opt(times, [0, 3, 2, 1])
+
+    assert path == [0, 1, 2, 3]
+
+
+def test_order_is_close_to_optimal_for_small_recipes():
+    rng = np.random.default_rng(1)
+    ratios = []
+    for _ in range(20):
+        recipe = algorithms.sample_candidates(6, np.array(AXES), rng=rng)[:, 0].tolist()
+
+        ordered = scheduler.order_steps(recipe, START, AXES, power_pad=True)
+
+        best = min(scheduler.total_ramp_time(list(order), START, AXES, True)
+                   for order in itertools.permutations(recipe))
+        assert sorted(ordered) == sorted(recipe)
+        ratios.append(scheduler.total_ramp_time(ordered, START, AXES, True) / best)
+    assert np.mean(ratios) < 1.02
+
+
+def test_order_never_ramps_longer_than_given_order():
+    rng = np.random.default_rng(2)
+    recipe = algorithms.sample_candidates(40, np.array(AXES), rng=rng)[:, 0].tolist()
+
+    ordered = scheduler.order_steps(recipe, START, AXES, power_pad=False)
+
+    assert sorted(ordered) == sorted(recipe)
+    assert scheduler.total_ramp_time(ordered, START, AXES, False) < \
+        scheduler.total_ramp_time(recipe, START, AXES, False)
+
+
+def test_recipe_kept_when_nothing_is_gained():
+    recipe = [[0, 40, 30, 5, 10], [0, 40, 30, 5, 20]]
+
+    assert scheduler.order_steps(recipe, START, AXES, power_pad=True) == recipe
+    assert scheduler.order_steps(recipe[:1], START, AXES, power_pad=True) == recipe[:1]
+
+
+def test_total_ramp_time_sums_ramp_time():
+    recipe = [[0, 40, 30, 5, 10], [0, 100, 20, 30, 10], [0, 20, 50, 3, 10]]
+    previous = [START] + recipe[:-1]
+
+    assert scheduler.total_ramp_time(recipe, START, AXES, True) == sum(
+        setpoints.ramp_time(old, new, AXES, True) for old, new in zip(previous, recipe))
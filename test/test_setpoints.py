@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+import campaign_parameters as cp
+import system_parameters as sp
+import setpoints
+
+
+class FakeEklipse:
+    def __init__(self, failing=()):
+        self.values = {}
+        self.writes = []
+        self.failing = failing
+
+    def write(self, signal, value):
+        self.writes.append((signal, value))
+        if (signal, value) in self.failing:
+            return False
+        self.values[signal] = value
+        return True
+
+
+def test_power_and_pressure_setpoints():
+    signal, value = setpoints.power_setpoint(50, 2)
+
+    assert signal == sp.PS_SET_OUTPUT_SIGNALS[cp.POWER_SUPPLIES[1]-1] and value == 50
+    assert setpoints.power_setpoint(cp.MAX_POWERS[0] + 11, 1) is None
+    assert setpoints.pressure_setpoints(5) == [(sp.SET_VALVE_POS, sp.valve_position_2), (sp.SET_SPUTTER_PRESSURE, 5)]
+    assert setpoints.pressure_setpoints(100) is None
+
+
+def test_ramp_time_is_limited_by_slowest_axis():
+    old, new = [0, 0, 0, 10], [50, 100, 0, 5]
+
+    assert setpoints.ramp_time(old, new, [True, True, False], power_pad=False) == 10
+    assert setpoints.ramp_time(old, new, [True, False, False], power_pad=False) == 10
+    assert setpoints.ramp_time([0, 0, 0, 5], [20, 0, 0, 5], [True, False, False], power_pad=True) == 5
+
+
+@pytest.mark.parametrize("power_pad", [False, True])
+def test_ramp_times_match_ramp_time(power_pad):
+    rng = np.random.default_rng(0)
+    steps = np.column_stack([rng.integers(0, 120, (30, 3)), rng.integers(1, 50, 30)])
+    axes = [False, True, True]
+
+    times = setpoints.ramp_times(steps, steps, axes, power_pad)
+
+    assert times.tolist() == [[setpoints.ramp_time(old, new, axes, power_pad) for new in steps] for old in steps]
+
+
+def test_transaction_writes_all_setpoints():
+    eklipse = FakeEklipse()
+    transaction = setpoints.SetpointTransaction(eklipse.write)
+    transaction.stage("pressure", 5, rollback_value=None)
+    transaction.stage("PS1", np.int64(50))
+    transaction.stage("PS3", 40)
+
+    assert transaction.commit()
+    assert eklipse.values == {"pressure": 5, "PS1": 50, "PS3": 40}
+    assert type(eklipse.values["PS1"]) is int
+
+
+def test_failed_setpoint_rolls_back_powers():
+    eklipse = FakeEklipse(failing=[("PS3", 40)])
+    transaction = setpoints.SetpointTransaction(eklipse.write)
+    transaction.stage("pressure", 5, rollback_value=None)
+    transaction.stage("PS1", 55)
+    assert transaction.commit()
+    transaction.stage("PS1", 50)
+    transaction.stage("PS3", 40)
+
+    assert not transaction.commit()
+    assert eklipse.writes[-2:] == [("PS3", 0), ("PS1", 0)]
+    assert eklipse.values == {"pressure": 5, "PS1": 0, "PS3": 0}
@@ -0,0 +1,107 @@
+import pytest
+import numpy as np
+import pandas as pd
+import settling
+
+
+def legacy_settle_index(df, thresholds, n_candidates):
+    rows = len(df)
+    for j in range(0, n_candidates):
+        if all(df[p].tail(rows-j).std() <= thresholds[p] for p in thresholds.keys()):
+            return j
+    return None
+
+
+def make_recording(rows, settle_row, noise, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows)
+    ramp = np.clip(1 - t/max(settle_row, 1), 0, None)
+    df = pd.DataFrame({
+        "Actual_pressure_[mTorr]": np.round(5 + 3*ramp + rng.normal(0, 0.01, rows), 3),
+        "Voltage_Ax1_[V]": np.round(300 - 80*ramp + rng.normal(0, noise, rows), 3),
+        "Voltage_Ax2_[V]": np.round(240 + 40*ramp + rng.normal(0, noise, rows), 3)
+    })
+    return df
+
+
+@pytest.fixture
+def thresholds():
+    return {"Actual_pressure_[mTorr]": 0.1, "Voltage_Ax1_[V]": 1, "Voltage_Ax2_[V]": 1}
+
+
+@pytest.mark.parametrize("settle_row, noise", [(0, 0.2), (30, 0.2), (120, 0.2), (150, 0.5), (50, 3)])
+def test_find_settle_index_matches_pandas_loop(thresholds, settle_row, noise):
+    df = make_recording(200, settle_row, noise)
+    values = df[list(thresholds)].to_numpy()
+
+    index = settling.find_settle_index(values, list(thresholds.values()), 160)
+
+    assert index == legacy_settle_index(df, thresholds, 160)
+
+
+def test_suffix_std_matches_pandas_tail_std():
+    df = make_recording(100, 40, 0.3)
+    df.iloc[[5, 60], 1] = np.nan
+
+    std = settling.suffix_std(df.to_numpy())
+
+    for j in [0, 5, 50, 98, 99]:
+        expected = df.tail(len(df)-j).std().to_numpy()
+        np.testing.assert_allclose(std[j], expected, rtol=1e-9, equal_nan=True)
+
+
+def test_constant_column_settles_at_threshold_zero():
+    values = np.column_stack([np.r_[np.arange(5.0), np.full(20, 7.0)]])
+
+    assert settling.find_settle_index(values, [0.0], 20) == 5
+
+
+@pytest.fixture
+def time():
+    return np.arange(200) * 0.1
+
+
+def test_slope_criterion_rejects_ramp_and_accepts_plateau(time):
+    values = np.column_stack([np.r_[np.linspace(0, 50, 100), np.full(100, 50.0)]])
+
+    steady = settling.CRITERIA["slope"](values, np.array([0.5]), time, 10)
+
+    assert not steady[:90].any()
+    assert steady[100:191].all()
+
+
+def test_change_point_criterion_detects_mean_shift(time):
+    rng = np.random.default_rng(1)
+    values = np.column_stack([rng.normal(0, 0.1, 200) + np.r_[np.zeros(100), np.ones(100)]])
+
+    steady = settling.CRITERIA["change_point"](values, np.array([6.0]), time, 20)
+
+    assert not steady[:80].any()
+    assert steady[100:160].all()
+
+
+def test_drift_criterion_is_relative_to_mean(time):
+    values = np.column_stack([np.linspace(100, 101, 200), np.linspace(100, 200, 200)])
+
+    steady = settling.CRITERIA["drift"](values, np.array([0.01, 0.01]), time, 20)
+
+    assert steady[0, 0] and not steady[0, 1]
+
+
+def test_steady_mask_combines_criteria_per_column(time):
+    df = make_recording(200, 60, 0.2)
+    criteria = {
+        "Actual_pressure_[mTorr]": {"suffix_std": 0.1},
+        "Voltage_Ax1_[V]": {"suffix_std": 1, "slope": 2},
+        "Voltage_Ax2_[V]": {"suffix_std": 1}
+    }
+
+    steady = settling.steady_mask(df, time, criteria, 20)
+    std_only = settling.find_settle_index(df.to_numpy(), [0.1, 1, 1], 200)
+
+    assert settling.first_steady_index(steady, 200) >= std_only
+
+
+def test_steady_mask_rejects_unknown_criterion(time):
+    with pytest.raises(ValueError):
+        settling.steady_mask({"x": np.zeros(200)}, time, {"x": {"unknown": 1}}, 20)
@@ -0,0 +1,69 @@
+import pytest
+from signal_cache import SignalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEklipse:
+    def __init__(self, values):
+        self.values = values
+        self.reads = 0
+
+    def read(self, signal):
+        self.reads += 1
+        return self.values.get(signal, "Failed to read value")
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return SignalCache({"StackLightBlue": 0, "StackLightRed": 0.5}, default_max_age=2, clock=clock)
+
+
+def test_repeated_reads_use_cache_until_max_age(cache, clock):
+    eklipse = FakeEklipse({"Power Supply 1 Enabled": "0", "StackLightRed": "1"})
+
+    for _ in range(3):
+        assert cache.read("Power Supply 1 Enabled", eklipse.read) == "0"
+        assert cache.read("StackLightRed", eklipse.read) == "1"
+    clock.now = 1
+    cache.read("Power Supply 1 Enabled", eklipse.read)
+    cache.read("StackLightRed", eklipse.read)
+
+    assert eklipse.reads == 3
+    assert cache.stats()["hits"] == 5 and cache.stats()["misses"] == 3
+
+
+def test_zero_max_age_and_failed_reads_are_not_cached(cache):
+    eklipse = FakeEklipse({"StackLightBlue": "1"})
+
+    cache.read("StackLightBlue", eklipse.read)
+    cache.read("StackLightBlue", eklipse.read)
+    cache.read("Unknown", eklipse.read, failed="Failed to read value")
+    cache.read("Unknown", eklipse.read, failed="Failed to read value")
+
+    assert eklipse.reads == 4
+
+
+def test_invalidate(cache):
+    eklipse = FakeEklipse({"a": "1", "b": "2"})
+    cache.read("a", eklipse.read)
+    cache.read("b", eklipse.read)
+
+    cache.invalidate("a")
+    cache.read("a", eklipse.read)
+    cache.read("b", eklipse.read)
+    cache.invalidate()
+    cache.read("b", eklipse.read, max_age=10)
+
+    assert eklipse.reads == 4
@@ -0,0 +1,61 @@
+import pytest
+import campaign_parameters as cp
+import stack_light
+
+
+def legacy_state(samples):
+    flashes = sum(1 for a, b in zip(samples, samples[1:]) if a != b)
+    if flashes > 1:
+        return stack_light.BLUE_FLASHING
+    return stack_light.BLUE_ON if samples[-1] == 1 else stack_light.BLUE_OFF
+
+
+def detect(detector, samples):
+    samples = iter(samples)
+    reads = []
+
+    def read():
+        reads.append(next(samples))
+        return reads[-1]
+
+    return detector.detect(read, lambda: None), len(reads)
+
+
+@pytest.fixture
+def detector():
+    return stack_light.BlueLightDetector(max_samples=10, steady_samples=6, prior_steady_samples=3)
+
+
+@pytest.mark.parametrize("samples, expected_samples", [
+    ([1]*10, 6), ([0]*10, 6), ([1, 0, 1, 0, 1, 0, 1, 0, 1, 0], 3),
+    ([1, 1, 0, 0, 1, 1, 0, 0, 1, 1], 5), ([0, 0, 0, 1, 1, 1, 1, 1, 1, 1], 9)])
+def test_detection_matches_fixed_sampling_with_fewer_samples(detector, samples, expected_samples):
+    state, n_samples = detect(detector, samples)
+
+    assert state == legacy_state(samples)
+    assert n_samples == expected_samples
+
+
+def test_prior_shortens_detection(detector):
+    assert detect(detector, [1]*10) == (stack_light.BLUE_ON, 6)
+    assert detect(detector, [1]*10) == (stack_light.BLUE_ON, 3)
+    assert detect(detector, [1, 0, 1, 0, 1, 0]) == (stack_light.BLUE_FLASHING, 3)
+    assert detect(detector, [0, 1, 0, 1]) == (stack_light.BLUE_FLASHING, 2)
+
+
+def test_unchanged_check(detector):
+    assert not detector.unchanged(1)
+    detect(detector, [1]*10)
+
+    assert detector.unchanged(1) and not detector.unchanged(0)
+
+
+def test_paused_recipe_is_not_confirmed_as_steady():
+    # defaults from campaign_parameters: the light was steady, then the recipe is paused and the light
+    # flashes with the longest phase the flash period allows
+    detector = stack_light.BlueLightDetector()
+    detect(detector, [1] * 10)
+    phase = int(cp.BLUE_FLASH_PERIOD / 2 / cp.BLUE_FLASH_WAIT)
+    flashing = ([1] * phase + [0] * phase) * 3
+
+    assert detect(detector, flashing)[0] == stack_light.BLUE_FLASHING
@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+import pandas as pd
+import campaign_parameters as cp
+import recording_reader as rr
+import settling
+import streaming
+
+
+def recording_bytes(tmp_path, rows, settle_row, seed=0):
+    rng = np.random.default_rng(seed)
+    ramp = np.clip(1 - np.arange(rows)/settle_row, 0, None)
+    signals = {}
+    for signal, column in rr.RECORDING_COLUMNS.items():
+        noise = 0.01 if 'pressure' in column else 0.2
+        signals[signal] = 100 + 30*ramp + rng.normal(0, noise, rows)
+    file_path = tmp_path / "full.csv"
+    rr.write_recording(str(file_path), pd.Timestamp("2024-03-14 10:15:32.100"),
+                       np.arange(rows) * 0.1, signals, interval=0.1)
+    return file_path.read_bytes()
+
+
+@pytest.fixture
+def growing_file(tmp_path):
+    return tmp_path / "growing.csv"
+
+
+def test_tail_reads_only_complete_lines(tmp_path, growing_file):
+    content = recording_bytes(tmp_path, 50, 10)
+    tail = streaming.RecordingTail(str(growing_file))
+
+    growing_file.write_bytes(content[:len(content)//2])
+    first = tail.read()
+    growing_file.write_bytes(content)
+    second = tail.read()
+
+    assert first + second == 50
+    _, df = rr.read_recording(str(tmp_path / "full.csv"))
+    for column, values in tail.columns().items():
+        np.testing.assert_array_equal(values, df[column].to_numpy())
+
+
+def test_monitor_reports_settle_time_while_recording(tmp_path, growing_file):
+    content = recording_bytes(tmp_path, 300, 40)
+    monitor = streaming.SteadinessMonitor(cp.STEADINESS_CRITERIA, 0.5, 20, min_time=3)
+    growing_file.write_bytes(b"")
+    monitor.follow(str(growing_file))
+
+    settle_time = None
+    for end in range(0, len(content) + 1000, 1000):
+        growing_file.write_bytes(content[:end])
+        settle_time = monitor.poll()
+        if settle_time is not None:
+            break
+
+    assert settle_time is not None and settle_time <= 5
+    # The recording stopped here would pass the Validator's check
+    columns = monitor.tail.columns()
+    rows = len(columns["Time Stamp"])
+    steady = settling.steady_mask(columns, columns["Time Stamp"], cp.STEADINESS_CRITERIA, 20)
+    assert settling.first_steady_index(steady, int(0.5*rows) + 1) is not None
+    assert rows < 300
+
+
+def test_monitor_waits_for_min_time(tmp_path, growing_file):
+    growing_file.write_bytes(recording_bytes(tmp_path, 20, 1))
+    monitor = streaming.SteadinessMonitor(cp.STEADINESS_CRITERIA, 0.5, 20, min_time=3)
+    monitor.follow(str(growing_file))
+
+    assert monitor.poll() is None
@@ -0,0 +1,51 @@
+from ui_handles import HandleRegistry
+
+
+class StaleError(Exception):
+    pass
+
+
+class FakeControl:
+    def __init__(self, text):
+        self.text = text
+        self.stale = False
+
+    def wrapper_object(self):
+        return self
+
+    def window_text(self):
+        if self.stale:
+            raise StaleError()
+        return self.text
+
+
+class FakeWindow:
+    def __init__(self):
+        self.searches = 0
+        self.controls = {"Actual": FakeControl("1")}
+
+    def child_window(self, auto_id):
+        self.searches += 1
+        return self.controls[auto_id]
+
+
+def test_controls_are_resolved_once():
+    window = FakeWindow()
+    registry = HandleRegistry(window, (StaleError,))
+
+    values = [registry["Actual"].window_text() for _ in range(5)]
+
+    assert values == ["1"] * 5
+    assert window.searches == 1 and registry.resolutions == 1
+
+
+def test_stale_handle_is_resolved_again():
+    window = FakeWindow()
+    registry = HandleRegistry(window, (StaleError,))
+    registry["Actual"].window_text()
+
+    window.controls["Actual"].stale = True
+    window.controls["Actual"] = FakeControl("0")
+
+    assert registry["Actual"].window_text() == "0"
+    assert window.searches == 2 and registry.stale == 1
@@ -0,0 +1,114 @@
+import time
+import pytest
+import system_parameters as sp
+from ui_navigator import UINavigator
+
+
+class FakeElement:
+    def __init__(self, gui, auto_id):
+        self.gui = gui
+        self.auto_id = auto_id
+
+    def wrapper_object(self):
+        return self
+
+    def set_focus(self):
+        self.gui.calls.append("focus")
+
+    def click(self):
+        self.gui.calls.append("click " + self.auto_id)
+        if self.auto_id in ("Automation", "IO Item Editor", "Recording Setup"):
+            self.gui.tab = self.auto_id
+        if self.auto_id == "Monitor":
+            self.gui.monitor_open = True
+
+    def select(self, signal):
+        self.gui.calls.append("select " + signal)
+        self.gui.selected = signal
+
+    def selected_text(self):
+        return self.gui.selected
+
+    def is_visible(self):
+        return self.gui.tab == "IO Item Editor"
+
+    def exists(self, timeout=None):
+        return self.gui.monitor_open
+
+
+class FakeGui:
+    def __init__(self):
+        self.calls = []
+        self.tab = None
+        self.selected = None
+        self.monitor_open = False
+
+    def wrapper_object(self):
+        return FakeElement(self, "main")
+
+    def child_window(self, auto_id, title=None):
+        return FakeElement(self, auto_id)
+
+    def window(self, auto_id):
+        return FakeElement(self, auto_id)
+
+
+@pytest.fixture
+def gui():
+    return FakeGui()
+
+
+@pytest.fixture
+def navigator(gui):
+    return UINavigator(gui, desktop=gui)
+
+
+def test_repeated_reads_skip_navigation(gui, navigator):
+    for _ in range(3):
+        navigator.select_signal("StackLightRed", 0)
+    navigator.select_signal("StackLightGreen", 0)
+
+    assert gui.calls == ["focus", "click Automation", "click IO Item Editor",
+                         "select StackLightRed", "select StackLightGreen"]
+
+
+def test_drift_is_detected_and_resynced(gui, navigator):
+    navigator.select_signal(sp.Check_StackLight_Red, 0)
+    gui.tab = "Recording Setup"
+    navigator.select_signal(sp.Check_StackLight_Red, 0)
+    gui.selected = "Other"
+    navigator.select_signal(sp.Check_StackLight_Red, 0)
+
+    assert gui.calls.count("click IO Item Editor") == 2
+    assert gui.calls.count("select " + sp.Check_StackLight_Red) == 3
+    assert navigator.stats()["resyncs"] == 2
+
+
+def test_recipe_monitor_is_opened_once(gui, navigator):
+    first = navigator.recipe_monitor()
+    second = navigator.recipe_monitor()
+    gui.monitor_open = False
+    navigator.recipe_monitor()
+
+    assert first is second
+    assert gui.calls.count("click Monitor") == 2
+
+
+def test_batch_selection_navigates_once(gui, navigator):
+    navigator.go_to_io_item_editor()
+    for signal in ["StackLightGreen", "StackLightRed", "StackLightYellow"]:
+        navigator.select_signal(signal, 0, navigate=False)
+
+    assert gui.calls.count("click IO Item Editor") == 1
+    assert navigator.stats()["skipped"] == 0
+
+
+def test_changed_field_waits_for_the_minimum_settle_time(gui, navigator):
+    values = iter(range(1000))
+    # the Actual field of the previous signal changes on every read
+    live_value = lambda: str(next(values))
+    start = time.monotonic()
+
+    navigator.select_signal("VoltageAx2", 1, watch=live_value, min_wait=0.05)
+
+    assert 0.05 <= time.monotonic() - start < 0.5
@@ -0,0 +1,116 @@
+import pytest
+import numpy as np
+import pandas as pd
+import validate as vd
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+def make_processed_df(rows, settle_row, noise=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    ramp = np.clip(1 - np.arange(rows)/max(settle_row, 1), 0, None)
+    df = pd.DataFrame({"Time Stamp": np.round(np.arange(rows) * 0.1, 3)})
+    df["Actual_pressure_[mTorr]"] = np.round(5 + 2*ramp + rng.normal(0, 0.01, rows), 3)
+    for k in range(1, 4):
+        df["Voltage_Ax" + str(k) + "_[V]"] = np.round(
+            200 + 50*ramp + rng.normal(0, noise, rows), 3)
+    df["QCM_1_frequency_[Hz]"] = 5e6 + rng.normal(0, 1, rows)
+    return df
+
+
+@pytest.fixture
+def validator():
+    validator = vd.Validator(background_writes=False)
+    validator.collection = FakeCollection()
+    validator.indexed = True
+    return validator
+
+
+def use_recording(monkeypatch, validator, df):
+    monkeypatch.setattr(validator, "getLastExperiment", lambda file_path=None: ("01/01/2024", df))
+
+
+def test_validate_stores_settled_experiment(monkeypatch, validator):
+    use_recording(monkeypatch, validator, make_processed_df(100, 20))
+
+    assert validator.validate({"Series ID": "test"})
+
+    doc = validator.collection.docs[0]
+    assert doc["Settled"] is True
+    assert 0 < doc["Settling time"] <= 5
+    assert "Voltage_Ax1_[V] Mean" in doc and "QCM_1_frequency_[Hz] STD" in doc
+
+
+def test_validate_rejects_late_settling_experiment(monkeypatch, validator):
+    use_recording(monkeypatch, validator, make_processed_df(100, 65))
+
+    assert not validator.validate({})
+    assert validator.collection.docs == []
+
+
+def test_validate_stores_unsettled_experiment(monkeypatch, validator):
+    use_recording(monkeypatch, validator, make_processed_df(100, 20, noise=5))
+
+    assert validator.validate({})
+    assert validator.collection.docs[0]["Settled"] is False
+
+
+def test_validate_uses_configured_criteria(monkeypatch, validator):
+    use_recording(monkeypatch, validator, make_processed_df(100, 20))
+    validator.criteria["Voltage_Ax1_[V]"] = {"suffix_std": 1, "drift": 0}
+
+    assert validator.validate({})
+    assert validator.collection.docs[0]["Settled"] is False
+
+
+def test_listeners_see_stored_documents(monkeypatch, validator):
+    use_recording(monkeypatch, validator, make_processed_df(100, 20))
+    observed = []
+    validator.add_listener(observed.append)
+
+    validator.validate({"Power_Ax2_setpoint_[W]": 40})
+
+    assert observed == validator.collection.docs
+    assert observed[0]["Power_Ax2_setpoint_[W]"] == 40
+
+
+def test_failing_listener_does_not_lose_the_document(monkeypatch, validator):
+    use_recording(monkeypatch, validator, make_processed_df(100, 20))
+    observed = []
+
+    def failing_listener(doc):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+
+    validator.add_listener(failing_listener)
+    validator.add_listener(observed.append)
+
+    assert validator.validate({})
+    assert len(validator.collection.docs) == 1
+    assert observed == validator.collection.docs
+
+
+@pytest.mark.parametrize("index", [1, 37])
+def test_calculate_statistics_matches_pandas_tail(validator, index):
+    df = make_processed_df(100, 20)
+    df.iloc[50, 2] = np.nan
+    rows = len(df)
+
+    calc_dict = validator.calculate_statistics(df, rows, index=index)
+
+    assert list(calc_dict) == [k + suffix for k in df.columns[1:] for suffix in (" Mean", " STD")]
+    for k in df.columns[1:]:
+        mean = df[k].tail(rows-index).mean()
+        std = df[k].tail(rows-index).std()
+        if 'QCM' not in k:
+            assert calc_dict[k + " Mean"] == np.round(mean, 3)
+            assert calc_dict[k + " STD"] == np.round(std, 3)
+        else:
+            assert calc_dict[k + " Mean"] == pytest.approx(mean, rel=1e-12)
+            assert calc_dict[k + " STD"] == pytest.approx(std, rel=1e-9)
+        assert type(calc_dict[k + " Mean"]) is float
@@ -0,0 +1,56 @@
+import math
+import pytest
+import waiting
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_wait_returns_as_soon_as_condition_holds(clock):
+    result = waiting.wait_until(lambda: clock.now >= 0.05 and "ready", 1, interval=0.02,
+                                operation="test ready", clock=clock, sleep=clock.sleep)
+
+    assert result == "ready"
+    assert clock.now == pytest.approx(0.06)
+    assert waiting.histogram("test ready").summary()["timeouts"] == 0
+
+
+def test_wait_times_out(clock):
+    result = waiting.wait_until(lambda: False, 0.5, interval=0.2, operation="test timeout",
+                                clock=clock, sleep=clock.sleep)
+
+    assert not result
+    assert clock.now == pytest.approx(0.5)
+    assert waiting.histogram("test timeout").summary()["timeouts"] == 1
+
+
+def test_ignored_errors_count_as_not_ready(clock):
+    values = iter(["", "", "5"])
+
+    result = waiting.wait_until(lambda: int(next(values)) == 5, 1, ignore=(ValueError,),
+                                clock=clock, sleep=clock.sleep)
+
+    assert result
+
+
+def test_histogram_percentiles():
+    histogram = waiting.LatencyHistogram()
+    for seconds in [0.004] * 90 + [0.3] * 10:
+        histogram.record(seconds)
+
+    assert histogram.percentile(0.5) == 0.01
+    assert histogram.percentile(0.95) == 0.3
+    assert math.isclose(histogram.summary()["mean"], 0.0336)
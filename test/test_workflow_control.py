@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import workflow_control as wc
+
+
+def test_ids_follow_the_tracker_file(series_id_folder):
+    (series_id_folder / "BEA_SeriesID_tracker.txt").write_text("41")
+
+    assert [wc.get_next_series_id() for _ in range(3)] == ["042", "043", "044"]
+    assert (series_id_folder / "BEA_SeriesID_tracker.txt").read_text() == "44"
+
+
+def test_first_id_and_reset(series_id_folder):
+    assert wc.get_next_series_id() == "001"
+    wc.reset_series_id()
+
+    assert wc.get_next_series_id() == "001"
+    # only the tracker and its lock file remain, no temporary files
+    assert sorted(os.listdir(series_id_folder)) == ["BEA_SeriesID_tracker.txt", "BEA_SeriesID_tracker.txt.lock"]
+
+
+def test_working_directory_is_not_changed():
+    cwd = os.getcwd()
+
+    wc.get_next_series_id()
+
+    assert os.getcwd() == cwd
+
+
+def test_concurrent_threads_get_unique_ids():
+    with ThreadPoolExecutor(8) as executor:
+        ids = list(executor.map(lambda _: wc.get_next_series_id(), range(200)))
+
+    assert sorted(ids) == ["{:03d}".format(n) for n in range(1, 201)]
+
+
+def test_concurrent_processes_get_unique_ids(series_id_folder):
+    script = (
+        "import sys, workflow_control as wc\n"
+        "wc.path = sys.argv[1]\n"
+        "print(' '.join(wc.get_next_series_id() for _ in range(50)))\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processes = [subprocess.Popen([sys.executable, "-c", script, str(series_id_folder)], cwd=root,
+                                  stdout=subprocess.PIPE, text=True) for _ in range(4)]
+    ids = [series_id for process in processes for series_id in process.communicate()[0].split()]
+
+    assert sorted(ids) == ["{:03d}".format(n) for n in range(1, 201)]
@@ -0,0 +1,85 @@
+'''
+Cached handles to the controls of the eKLipse GUI.
+Looking up a control with child_window(...) searches the UI Automation tree every time it is used.
+HandleRegistry resolves each control once and keeps its wrapper object, so later operations go straight
+to the control. A handle goes stale when eKLipse recreates the control (e.g. after a tab switch or a
+restart); calls on a stale wrapper raise one of the registry's stale errors, after which the handle is
+resolved again and the call retried once.
+'''
+
+
+class Handle:
+    def __init__(self, registry, criteria: dict) -> None:
+        '''
+        Initialize a Handle object, usually through HandleRegistry.get
+
+        Parameters
+        ----------
+        registry : HandleRegistry
+            Registry the handle belongs to
+        criteria : dict
+            child_window search criteria of the control, e.g. {"auto_id": "Actual"}
+        '''
+        self.registry = registry
+        self.criteria = criteria
+        self.wrapper = None
+
+    def resolve(self):
+        '''Wrapper object of the control, searched in the UI tree only if not resolved yet'''
+        if self.wrapper is None:
+            self.wrapper = self.registry.parent.child_window(**self.criteria).wrapper_object()
+            self.registry.resolutions += 1
+        return self.wrapper
+
+    def invalidate(self):
+        '''Forget the wrapper object, the next call resolves the control again'''
+        self.wrapper = None
+
+    def __getattr__(self, name):
+        '''Methods of the wrapper object, retried once on a fresh wrapper if the handle is stale'''
+        if not callable(getattr(self.resolve(), name)):
+            return getattr(self.resolve(), name)
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self.resolve(), name)(*args, **kwargs)
+            except self.registry.stale_errors:
+                self.invalidate()
+                self.registry.stale += 1
+                return getattr(self.resolve(), name)(*args, **kwargs)
+        return call
+
+
+class HandleRegistry:
+    def __init__(self, parent, stale_errors: tuple = (Exception,)) -> None:
+        '''
+        Initialize a HandleRegistry object
+
+        Parameters
+        ----------
+        parent : WindowSpecification
+            Window containing the controls
+        stale_errors : tuple, optional
+            Exceptions raised by calls on a stale wrapper, by default (Exception,)
+        '''
+        self.parent = parent
+        self.stale_errors = stale_errors
+        self.handles = {}
+        self.resolutions = 0  # UI tree searches
+        self.stale = 0  # stale handles resolved again
+
+    def get(self, **criteria) -> Handle:
+        '''Handle of the control matching the child_window criteria (created once, resolved lazily)'''
+        key = tuple(sorted(criteria.items()))
+        if key not in self.handles:
+            self.handles[key] = Handle(self, criteria)
+        return self.handles[key]
+
+    def __getitem__(self, auto_id: str) -> Handle:
+        '''Handle of the control with the given auto_id'''
+        return self.get(auto_id=auto_id)
+
+    def invalidate(self):
+        '''Forget all wrapper objects, e.g. after reconnecting to eKLipse'''
+        for handle in self.handles.values():
+            handle.invalidate()
@@ -0,0 +1,187 @@
+'''
+Navigation state of the eKLipse GUI.
+Reading or setting a signal needs the IO Item Editor tab of the Automation tab with the signal selected in
+the signal combo box, and the recipe functions need the Recipe Monitor window. Every GUI round trip is slow,
+so UINavigator remembers which tab is active, which signal is selected and the Recipe Monitor window, and
+only performs the focus changes, tab clicks and selections that are needed. Before relying on the remembered
+state it checks it with a single query (is the signal combo box visible, which signal does it show) and
+navigates again if the GUI has drifted, e.g. because an operator clicked another tab.
+Controls are used through cached handles (see ui_handles.py).
+'''
+
+import time
+import campaign_parameters as cp
+import system_parameters as sp
+from waiting import wait_until
+from ui_handles import HandleRegistry
+
+AUTOMATION_TAB = "Automation"
+IO_ITEM_EDITOR_TAB = "IO Item Editor"
+RECIPE_MONITOR_ID = "RecipeMonitor"
+
+
+class UINavigator:
+    def __init__(self, eklipse_window, desktop=None, stale_errors: tuple = (Exception,), clock=time.monotonic,
+                 sleep=time.sleep) -> None:
+        '''
+        Initialize a UINavigator object, usually through control_eklipse.navigator
+
+        Parameters
+        ----------
+        eklipse_window : WindowSpecification
+            Application window in connected state
+        desktop : Desktop, optional
+            Desktop used to find the Recipe Monitor window, by default None (no recipe monitor)
+        stale_errors : tuple, optional
+            Exceptions raised by calls on stale control handles, by default (Exception,)
+        clock, sleep : optional
+            Clock and sleep function of the waits after a selection, by default time.monotonic and time.sleep
+        '''
+        self.eklipse_window = eklipse_window
+        self.desktop = desktop
+        self.stale_errors = stale_errors
+        self.clock = clock
+        self.sleep = sleep
+        self.handles = HandleRegistry(eklipse_window, stale_errors)  # controls of the main window
+        self.recipe_monitor_handles = None  # controls of the Recipe Monitor window
+        self.tab = None  # active tab, None if unknown
+        self.selected_signal = None  # signal selected in the signal combo box, None if unknown
+        self.recipe_monitor_window = None
+        self.transitions = 0  # focus changes, clicks and selections performed
+        self.skipped = 0  # transitions skipped because the GUI was already in the wanted state
+        self.resyncs = 0  # times the remembered state did not match the GUI
+
+    def invalidate(self):
+        '''Forget the remembered state, e.g. after clicks made outside the navigator'''
+        self.tab = None
+        self.selected_signal = None
+
+    def focus(self):
+        '''Bring the eKLipse window to the foreground'''
+        self.eklipse_window.wrapper_object().set_focus()
+        self.transitions += 1
+
+    def go_to_io_item_editor(self):
+        '''Go to the IO Item Editor tab of the Automation tab, unless it is already active'''
+        if self.tab == IO_ITEM_EDITOR_TAB:
+            if self._signal_box_visible():
+                self.skipped += 1
+                return
+            self.resyncs += 1
+            self.invalidate()
+
+        self.focus()
+        self.handles.get(title=AUTOMATION_TAB, auto_id=AUTOMATION_TAB).click()
+        self.handles.get(title=IO_ITEM_EDITOR_TAB, auto_id=IO_ITEM_EDITOR_TAB).click()
+        self.transitions += 2
+        self.tab = IO_ITEM_EDITOR_TAB
+
+    def leave_io_item_editor(self, tab: str = None):
+        '''Record that another tab or panel was opened outside the navigator'''
+        self.tab = tab
+        self.selected_signal = None
+
+    def select_signal(self, signal_name: str, wait_time: float = cp.PWA_READ_WAIT_TIME, navigate: bool = True,
+                      watch=None, min_wait: float = cp.PWA_SELECT_MIN_WAIT) -> bool:
+        '''
+        Select a signal in the IO Item Editor, unless it is already selected
+
+        Parameters
+        ----------
+        signal_name : str
+            Signal to select
+        wait_time : float, optional
+            Maximum time for the IO Item Editor to show the signal after selecting it, by default cp.PWA_READ_WAIT_TIME
+        navigate : bool, optional
+            Check that the IO Item Editor is active first, False if the caller just did, by default True
+        watch : callable, optional
+            Returns the text of a field that shows the selected signal (e.g. Actual), the wait ends when it
+            changes, but not before min_wait; if the new signal shows the same text, the wait takes the full
+            wait_time
+        min_wait : float, optional
+            Minimum wait after selecting, by default cp.PWA_SELECT_MIN_WAIT (at most wait_time). The field
+            does not tell which signal it shows, so a change of the field can also be the previous signal
+            updating its own live value (e.g. back-to-back voltage reads) before the field has switched;
+            the minimum wait gives eKLipse time to switch first. A longer min_wait makes a stale value less
+            likely but every selection slower, min_wait = wait_time is the fixed wait without watch
+
+        Returns
+        -------
+        bool
+            True if the signal was selected, False if it already was
+        '''
+        if navigate:
+            self.go_to_io_item_editor()
+        signal_box = self.handles[sp.CHOOSE_SIGNAL_BOX_ID]
+        if self.selected_signal == signal_name:
+            if self._selected_text(signal_box) == signal_name:
+                self.skipped += 1
+                return False
+            self.resyncs += 1
+
+        # Forget the selection first, so a failed select is not remembered as selected
+        self.selected_signal = None
+        before = watch() if watch is not None else None
+        signal_box.select(signal_name)
+        selected = self.clock()
+        min_wait = min(min_wait, wait_time)
+        self.transitions += 1
+        wait_until(lambda: self.clock() - selected >= min_wait
+                   and self._selected_text(signal_box) == signal_name
+                   and (watch is None or watch() != before), wait_time, operation="select signal",
+                   clock=self.clock, sleep=self.sleep)
+        self.selected_signal = signal_name
+        return True
+
+    def recipe_monitor(self):
+        '''
+        The Recipe Monitor window, opened with the Monitor button if it is not open
+
+        Returns
+        -------
+        WindowSpecification
+            Recipe Monitor window, None if it could not be opened
+        '''
+        if self.recipe_monitor_window is not None and self._exists(self.recipe_monitor_window):
+            self.skipped += 1
+            return self.recipe_monitor_window
+        if self.recipe_monitor_window is not None:
+            self.resyncs += 1
+
+        self.focus()
+        self.handles["Monitor"].click()
+        self.transitions += 1
+        self.recipe_monitor_window = None
+        self.recipe_monitor_handles = None
+        if self.desktop is not None:
+            recipe_monitor = self.desktop.window(auto_id=RECIPE_MONITOR_ID)
+            if self._exists(recipe_monitor):
+                self.recipe_monitor_window = recipe_monitor
+                self.recipe_monitor_handles = HandleRegistry(recipe_monitor, self.stale_errors)
+        return self.recipe_monitor_window
+
+    def stats(self) -> dict:
+        '''Transitions performed and skipped, and detected drifts'''
+        return {"transitions": self.transitions, "skipped": self.skipped, "resyncs": self.resyncs}
+
+    def _signal_box_visible(self) -> bool:
+        '''Drift check: the signal combo box is only visible in the IO Item Editor'''
+        try:
+            return self.handles[sp.CHOOSE_SIGNAL_BOX_ID].is_visible()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _selected_text(signal_box) -> str:
+        '''Drift check: the signal shown in the combo box'''
+        try:
+            return signal_box.selected_text()
+        except Exception:
+            return None
+
+    @staticmethod
+    def _exists(window) -> bool:
+        try:
+            return window.exists(timeout=0)
+        except Exception:
+            return False
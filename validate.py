@@ -1,14 +1,19 @@
 import pandas as pd
 import numpy as np
-import glob
-import os
-from pymongo import MongoClient
+import copy
 import campaign_parameters as cp
-import system_parameters as sp
+import settling
+import recording_reader
+import streaming
+import document_format
+from result_writer import ResultWriter
+import database_client as dc
+from recording_index import RecordingIndex
 
 '''
 The Validator class validates the steadiness of magnetron sputter experiments based on their CSV outputs.
-Steadiness is judged by a set of parameters settling below a given standard deviation before a given time limit.
+Steadiness is judged by a set of parameters meeting steadiness criteria (by default a standard deviation threshold,
+see settling.py and campaign_parameters.STEADINESS_CRITERIA) before a given time limit.
 Steady and completely unsteady experiments are evaluated to "True" by the validate function and stored in a MongoDB database. 
 Experiments which settle after the given time limit are evaluated to "False" by the validate function and are not stored in 
 the database. The False signal indicates that the experiment should be rerun.
@@ -18,7 +23,7 @@ the database. The False signal indicates that the experiment should be rerun.
 class Validator:
 
     # TODO: check that default filepath works on lab computer
-    def __init__(self, database="BERTHA-Data", collection="Working Data", path_CSV=r"C:\\Program Files (x86)\\KJLC\\eKLipse\\Log\\RecordingData"):
+    def __init__(self, database=cp.DB_NAME, collection=cp.DB_COLLECTION, path_CSV=r"C:\\Program Files (x86)\\KJLC\\eKLipse\\Log\\RecordingData", background_writes=cp.DB_BACKGROUND_WRITES):
         '''
         Initializer for the DatabaseLoader class
 
@@ -27,31 +32,45 @@ class Validator:
         database: which mongodb database to use 
         collection: which collection of given database to enter experiment data in
         path_CSV: file path for experiment CSV files (defaults to Log/RecordingData)
+        background_writes: insert documents through a background ResultWriter instead of blocking on insert_one
 
         Class variables
         ---------------
-        sigma_V: 
-        sigma_P: 
-        t:
-        t_d:
-        steady_params: 
+        t: fraction of the recording within which the experiment must settle
+        t_d: additional fraction after t within which a settled experiment is rerun
+        window: window length in samples for windowed steadiness criteria
+        criteria: steadiness criteria per column, {column: {criterion name: threshold}} (see settling.py)
+        storage_format: how time series are stored in the database, "lists" (default) or "columnar" (see document_format.py)
         '''
 
-        client = MongoClient()
-        self.db = client[database]
-        self.collection = self.db[collection]
+        # Shared, lazily connected client (see database_client.py)
+        self.collection = dc.get_collection(database, collection)
+        self.db = self.collection.database
+        self.indexed = False
         self.path_CSV = path_CSV
+        self.recordings = RecordingIndex(path_CSV)
+        self.writer = None
+        self.listeners = []
+        if background_writes:
+            self.writer = ResultWriter(self.collection, prepare=dc.ensure_indexes)
+
+        self.t = cp.STEADY_TIME_FRACTION
+        self.t_d = cp.DRAG_TIME_FRACTION
+        self.window = cp.STEADINESS_WINDOW
+        self.criteria = copy.deepcopy(cp.STEADINESS_CRITERIA)
+        self.storage_format = cp.DB_STORAGE_FORMAT
+        self.storage_dtype = cp.DB_STORAGE_DTYPE
+        self.storage_compression = cp.DB_STORAGE_COMPRESSION
+
+    def steadiness_monitor(self):
+        '''
+        Creates a SteadinessMonitor with the criteria of this validator, to follow a recording while it is written
 
-        self.sigma_V = 1
-        self.sigma_P = 0.1
-        self.t = 0.5
-        self.t_d = 0.3
-        self.thresholds = {
-            'Actual_pressure_[mTorr]': self.sigma_P,
-            "Voltage_Ax1_[V]": self.sigma_V,
-            "Voltage_Ax2_[V]": self.sigma_V,
-            "Voltage_Ax3_[V]": self.sigma_V
-        }
+        Returns
+        -------
+        monitor: streaming.SteadinessMonitor
+        '''
+        return streaming.SteadinessMonitor(self.criteria, self.t, self.window)
 
     def process_df(self, df):
         '''
@@ -92,18 +111,24 @@ class Validator:
 
         return date, df
 
-    def validate(self, metadata):
+    def validate(self, metadata, file_path=None):
         '''
-        The validate function is the core function of the Validator class. The function (1) retrieves the latest 
-        sputtering experiment CSV file from a given filepath, (2) calculates if the experiment has settled
+        The validate function is the core function of the Validator class. The function (1) retrieves the given 
+        (or latest) sputtering experiment CSV file, (2) calculates if the experiment has settled
         according to given (time and std) thresholds, (3) stores settled and fully unsettled experiments in 
         the database, and returns a True bool, since these have clear results; alternatively, does not store
         the experiment if the experiment settles too late within given thresholds and returns False, indicating
         that the experiment controller should retry the experiment.
+
+        Parameters
+        ----------
+        metadata: dict of metadata to store with the experiment
+        file_path: recording CSV to validate, e.g. as returned by control_eklipse.record_data 
+        (defaults to the newest file in path_CSV)
         '''
 
         # Get date of latest experiment and its CSV as dataframe
-        date, df = self.getLastExperiment()
+        date, df = self.getLastExperiment(file_path)
 
         # Create date dictionary
         date_dict = {'Date': date}
@@ -115,31 +140,34 @@ class Validator:
         n_t = int(self.t*rows)
         n_td = int(self.t_d*rows)
 
-        for j in range(0, n_t + n_td):
+        # Find the first index from which all steadiness criteria hold (one vectorized pass per criterion)
+        steady = settling.steady_mask(
+            df, df["Time Stamp"].to_numpy(), self.criteria, self.window)
+        j = settling.first_steady_index(steady, n_t + n_td)
 
-            if all(df[p].tail(rows-j).std() <= self.thresholds[p] for p in self.thresholds.keys()):
-                if (j <= n_t):
-                    # Get settling time
-                    settle_time_dict = {
-                        'Settling time': df["Time Stamp"].iloc[j]}
+        if j is not None:
+            if (j <= n_t):
+                # Get settling time
+                settle_time_dict = {
+                    'Settling time': df["Time Stamp"].iloc[j]}
 
-                    # Create settled status entry (True)
-                    status_dict = {"Settled": True}
+                # Create settled status entry (True)
+                status_dict = {"Settled": True}
 
-                    # Get mean and stds for all columns
-                    calc_dict = self.calculate_statistics(df, rows, index=j)
+                # Get mean and stds for all columns
+                calc_dict = self.calculate_statistics(df, rows, index=j)
 
-                    # Merge all dictionaries into a doc
-                    doc = {**date_dict, **metadata, **status_dict, **
-                           settle_time_dict, **df.to_dict('list'), **calc_dict}
+                # Merge all dictionaries into a doc
+                doc = {**date_dict, **metadata, **status_dict, **
+                       settle_time_dict, **self.time_series_fields(df), **calc_dict}
 
-                    # Insert doc into database collection
-                    self.collection.insert_one(doc)
+                # Insert doc into database collection
+                self.store(doc)
 
-                    return True
-                else:
-                    # Return False if experiment settles between time t and t_d, indicating that the experiment should be rerun
-                    return False
+                return True
+            else:
+                # Return False if experiment settles between time t and t_d, indicating that the experiment should be rerun
+                return False
 
         '''Return True for fully unstable experiments, indicating that we have stored the result to database'''
 
@@ -151,16 +179,75 @@ class Validator:
 
         # Merge all dictionaries into a doc
         doc = {**date_dict, **metadata, **status_dict,
-               **df.to_dict('list'), **calc_dict}
+               **self.time_series_fields(df), **calc_dict}
 
         # Insert doc into database collection
-        self.collection.insert_one(doc)
+        self.store(doc)
 
         return True
 
-    def calculate_statistics(self, df, rows, index=1):
+    def add_listener(self, listener):
+        '''
+        Adds a function called with every document once it is stored (or queued for the background writer),
+        e.g. GaussianProcessPlanner.observe (called on the thread that validates the experiment). Errors of a
+        listener are printed, they do not affect the stored document or the other listeners
+
+        Parameters
+        ----------
+        listener: function taking the document
+        '''
+        self.listeners.append(listener)
+
+    def store(self, doc):
+        '''
+        Stores a document in the database collection, through the background writer if one is used
+
+        Parameters
+        ----------
+        doc: document to store
+        '''
+        if self.writer is None:
+            if not self.indexed:
+                self.indexed = dc.ensure_indexes(self.collection)
+            self.collection.insert_one(doc)
+        else:
+            # the writer thread adds the _id to the queued document, the listeners get a copy
+            observed = dict(doc)
+            self.writer.submit(doc)
+            doc = observed
+        for listener in self.listeners:
+            try:
+                listener(doc)
+            except Exception as e:
+                print("Listener of the validated results failed: ", type(e).__name__, e)
+
+    def close(self):
+        '''
+        Waits for queued documents to be written and stops the background writer
+        '''
+        if self.writer is not None:
+            self.writer.close()
+
+    def time_series_fields(self, df):
+        '''
+        Time series fields of the database document, in the storage format of the validator
+
+        Parameters
+        ----------
+        df: processed dataframe with experiment data
+
+        Returns
+        -------
+        fields: dict to merge into the document (one list per column, or packed binary arrays)
+        '''
+        return document_format.time_series_fields(
+            df, self.storage_format, self.storage_dtype, self.storage_compression)
+
+    @staticmethod
+    def calculate_statistics(df, rows, index=1):
         '''
         Calculates mean and std for all fields (except time) in the dataframe
+        (static, so offline tools such as revalidate.py can use it without a database connection)
 
         Parameters
         ----------
@@ -175,33 +262,31 @@ class Validator:
 
         '''
 
-        # Prepare calculation dictionary
-        calc_keys = []
-        calc_vals = []
+        # One float view of the steady region for all columns (except time)
+        columns = df.columns[1:]
+        mean, std = settling.column_statistics(
+            df.iloc[index:rows, 1:].to_numpy(dtype=np.float64))
 
-        # Calculate settled mean and std for all columns
-        for k in df.columns[1:]:
-            mean_key = k + ' Mean'
-            std_key = k + ' STD'
-            mean = df[k].tail(rows-index).mean()
-            std = df[k].tail(rows-index).std()
+        # Round off values that are not PC Source
+        rounded = np.array(['QCM' not in k for k in columns], dtype=bool)
+        mean = np.where(rounded, np.round(mean, 3), mean)
+        std = np.where(rounded, np.round(std, 3), std)
 
-            # Round off values that are not PC Source
-            if 'QCM' not in k:
-                mean = np.round(mean, 3)
-                std = np.round(std, 3)
-
-            calc_keys.extend([mean_key, std_key])
-            calc_vals.extend([mean, std])
-
-        # Create calculation dictionary
-        calc_dict = dict(zip(calc_keys, calc_vals))
+        # Create calculation dictionary (mean and std per column, as Python floats for the database)
+        calc_dict = {}
+        for k, m, s in zip(columns, mean.tolist(), std.tolist()):
+            calc_dict[k + ' Mean'] = m
+            calc_dict[k + ' STD'] = s
 
         return calc_dict
 
-    def getLastExperiment(self):
+    def getLastExperiment(self, file_path=None):
         '''
-        Retrieves the latest modified file from the CSV filepath and processes it.    
+        Retrieves the given file, or the latest modified file from the CSV filepath, and processes it.    
+
+        Parameters
+        ----------
+        file_path: recording CSV to read (defaults to the newest file in path_CSV, found through the recording index)
 
         Returns
         -------
@@ -209,20 +294,14 @@ class Validator:
         df: A dataframe of the experiment CSV (Experiment parameters + time series measurements)
         '''
 
-        os.chdir(self.path_CSV)
+        if file_path is None:
+            latest_file = self.recordings.latest()
+        else:
+            latest_file = file_path
 
-        files = os.listdir()
-
-        latest_file = max(files, key=os.path.getctime)
-
-        # Read csv
-        df = pd.read_csv(latest_file, skiprows=[0, 1])
-
-        # rename columns accoridng to current setup and our formats
-        df.rename(columns=cp.RECORDING_NAMES, inplace=True)
-        df.rename(columns=sp.BASIC_PARAMETERS_TS, inplace=True)
+        # Read csv with typed columns, renamed according to current setup and our formats, and processed
+        date, df = recording_reader.read_recording(latest_file)
 
         print(df)
 
-        # Retrieve date and processed df
-        return self.process_df(df)
+        return date, df
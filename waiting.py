@@ -0,0 +1,114 @@
+'''
+Polling waits for the eKLipse control path.
+Instead of sleeping for the worst case (e.g. PWA_READ_WAIT_TIME after every signal selection, 20 s after
+starting eKLipse), wait_until polls a condition at a short interval and returns as soon as it holds, or
+when the timeout has passed. The time every wait took is recorded per operation in a LatencyHistogram,
+so the timeouts can be tuned from the waits actually observed (see report()).
+'''
+
+import bisect
+import math
+import threading
+import time
+import campaign_parameters as cp
+
+# upper bounds of the histogram buckets in seconds
+BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 60, math.inf)
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        '''Initialize a LatencyHistogram object with the bucket bounds in BUCKETS'''
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.timeouts = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False):
+        '''Adds the duration of one wait'''
+        with self.lock:
+            self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.maximum = max(self.maximum, seconds)
+            self.timeouts += timed_out
+
+    def percentile(self, q: float) -> float:
+        '''Upper bucket bound below which a fraction q of the waits fall'''
+        with self.lock:
+            if self.count == 0:
+                return math.nan
+            rank = q * self.count
+            cumulative = 0
+            for bound, count in zip(BUCKETS, self.counts):
+                cumulative += count
+                if cumulative >= rank:
+                    return min(bound, self.maximum)
+            return self.maximum
+
+    def summary(self) -> dict:
+        '''Count, mean, median, 95th percentile, maximum and number of timeouts'''
+        return {"count": self.count, "mean": self.total/self.count if self.count else math.nan,
+                "p50": self.percentile(0.5), "p95": self.percentile(0.95), "max": self.maximum,
+                "timeouts": self.timeouts}
+
+
+histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(operation: str) -> LatencyHistogram:
+    '''Latency histogram of an operation, created on first use'''
+    with _histograms_lock:
+        if operation not in histograms:
+            histograms[operation] = LatencyHistogram()
+        return histograms[operation]
+
+
+def wait_until(condition, timeout: float, interval: float = cp.WAIT_POLL_INTERVAL, operation: str = None,
+               ignore: tuple = (), clock=time.monotonic, sleep=time.sleep):
+    '''
+    Polls a condition until it holds or the timeout has passed
+
+    Parameters
+    ----------
+    condition : callable
+        Called without arguments, the wait ends when it returns a truthy value
+    timeout : float
+        Maximum time to wait in seconds
+    interval : float, optional
+        Time between polls in seconds, by default cp.WAIT_POLL_INTERVAL
+    operation : str, optional
+        Name under which the duration of the wait is recorded, by default not recorded
+    ignore : tuple, optional
+        Exceptions raised by condition that count as "not yet", by default ()
+    clock, sleep : optional
+        Monotonic clock and sleep function, by default time.monotonic and time.sleep
+
+    Returns
+    -------
+    The last value returned by condition (falsy if the wait timed out)
+    '''
+    start = clock()
+    while True:
+        try:
+            result = condition()
+        except ignore:
+            result = None
+        elapsed = clock() - start
+        if result or elapsed >= timeout:
+            if operation is not None:
+                histogram(operation).record(elapsed, timed_out=not result)
+            return result
+        sleep(min(interval, timeout - elapsed))
+
+
+def report():
+    '''Prints the latency histogram summaries of all operations'''
+    for operation, operation_histogram in sorted(histograms.items()):
+        summary = operation_histogram.summary()
+        print("    " + operation + ": " + str(summary["count"]) + " waits, mean "
+              + str(round(summary["mean"], 3)) + " s, p95 " + str(round(summary["p95"], 3)) + " s, max "
+              + str(round(summary["max"], 3)) + " s, " + str(summary["timeouts"]) + " timeouts")
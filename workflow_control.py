@@ -1,39 +1,92 @@
 import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 path = r"C:\\Users\\BERTHA\\Documents\\AutomateEklipse\\Workflow"
 
+_lock = threading.Lock()
+
+
+@contextmanager
+def _locked(file_path: str):
+    '''Exclusive lock on file_path + ".lock", shared by all processes using the tracker file'''
+    with _lock, open(file_path + ".lock", "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_atomically(file_path: str, text: str):
+    '''Replaces the file in one rename, so readers see either the old or the new content'''
+    folder = os.path.dirname(file_path) or "."
+    descriptor, temporary_path = tempfile.mkstemp(dir=folder, prefix=".series_id_")
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
 
 def get_next_series_id(file_path='BEA_SeriesID_tracker.txt') -> str:
     '''Get next series ID
 
+    The tracker file is read and replaced under an exclusive file lock, so concurrent supervisor and
+    analysis processes never get the same ID, and the working directory is not changed.
+
     Parameters
     ----------
     file_path : str, optional
-        From where to get the ID, by default 'BEA_SeriesID_tracker.txt'
+        From where to get the ID, relative to path, by default 'BEA_SeriesID_tracker.txt'
 
     Returns
     -------
     str
         Series ID
     '''
+    file_path = os.path.join(path, file_path)
 
-    os.chdir(path)
-
-    # Check if the file that stores the last seriesID exists
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as file:
-            # Read the last seriesID and convert it to an integer
-            last_series_id = int(file.read().strip())
-    else:
-        # If the file does not exist, assume starting with seriesID 0
-        last_series_id = 0
+    with _locked(file_path):
+        # Check if the file that stores the last seriesID exists
+        if os.path.exists(file_path):
+            with open(file_path, 'r') as file:
+                # Read the last seriesID and convert it to an integer
+                last_series_id = int(file.read().strip() or 0)
+        else:
+            # If the file does not exist, assume starting with seriesID 0
+            last_series_id = 0
 
-    # The next seriesID is one more than the last seriesID
-    next_series_id = last_series_id + 1
+        # The next seriesID is one more than the last seriesID
+        next_series_id = last_series_id + 1
 
-    # Update the file with the next seriesID for future seriess
-    with open(file_path, 'w') as file:
-        file.write(str(next_series_id))
+        # Update the file with the next seriesID for future seriess
+        _write_atomically(file_path, str(next_series_id))
 
     formatted_ID = "{:03d}".format(next_series_id)
     return formatted_ID
@@ -45,12 +98,12 @@ def reset_series_id(file_path='BEA_SeriesID_tracker.txt'):
     Parameters
     ----------
     file_path : str, optional
-        Where to reset it, by default 'BEA_SeriesID_tracker.txt'
+        Where to reset it, relative to path, by default 'BEA_SeriesID_tracker.txt'
     '''
-    os.chdir(path)
+    file_path = os.path.join(path, file_path)
 
-    with open(file_path, 'w') as file:
-        file.write('0')
+    with _locked(file_path):
+        _write_atomically(file_path, '0')
 
 
 # Example usage